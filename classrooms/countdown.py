@@ -0,0 +1,39 @@
+"""
+Start and end times of quizzes, cached for the countdown endpoints.
+
+During a live quiz every student polls (or listens to) the countdown of
+the same quiz, so the times are read from the database only once and
+kept in the cache until the quiz is saved again.
+"""
+import hashlib
+from django.core.cache import cache
+from .models import Quiz
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(quiz_pk) -> str:
+    return f"quiz-times-{quiz_pk}"
+
+
+def get_quiz_times(quiz_pk):
+    """
+    Start and end times of a quiz (UTC aware datetimes) and an etag
+    that changes whenever those times change.
+    :return: dict with 'start', 'end', 'etag' keys or None if quiz does not exist
+    """
+    times = cache.get(_cache_key(quiz_pk))
+    if times is None:
+        quiz = Quiz.objects.filter(pk=quiz_pk).only('_start', '_end').first()
+        if quiz is None:
+            return None
+
+        start, end = quiz._start, quiz._end
+        etag = hashlib.md5(f"{quiz_pk}:{start.isoformat()}:{end.isoformat()}".encode()).hexdigest()
+        times = {'start': start, 'end': end, 'etag': etag}
+        cache.set(_cache_key(quiz_pk), times, CACHE_TIMEOUT)
+    return times
+
+
+def invalidate_quiz_times(quiz_pk):
+    cache.delete(_cache_key(quiz_pk))
@@ -0,0 +1,105 @@
+"""
+ZIP archive of the submission files of an assignment, streamed to the
+client while it is being built.
+
+The archive is written into a small buffer that is emptied after every
+chunk, so memory usage does not depend on the size of the files and no
+temporary archive is written to disk. Since the output is not seekable,
+zipfile writes the sizes and CRC of each file after its data (data
+descriptors) and ZIP64 records are used, so archives and files larger
+than 4GB are supported.
+"""
+import os
+import zipfile
+from django.utils.text import slugify
+from .models import SubmissionFile
+
+FILTERS = ('late', 'on-time')
+
+
+class _StreamBuffer:
+    """ Write-only, unseekable file object collecting the zip output """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def get_submission_files(assignment, submission_filter=None):
+    """
+    Files of all the submissions of an assignment, with the owners.
+    :param submission_filter: None, 'late' or 'on-time'
+    """
+    files = SubmissionFile.objects.filter(submission__assignment=assignment)
+    if submission_filter == 'late':
+        files = files.filter(submission__in=assignment.submission_set.late())
+    elif submission_filter == 'on-time':
+        files = files.filter(submission__in=assignment.submission_set.on_time())
+    return files.select_related('submission__owner__user')\
+        .order_by('submission__owner__reg_no', 'pk')
+
+
+def get_archive_name(submission_file, used_names: set) -> str:
+    """
+    'reg_no/filename' path of the file inside the archive. Username is used
+    if the student has no registration number. Duplicate names get a suffix.
+    """
+    owner = submission_file.submission.owner
+    folder = slugify(owner.reg_no or owner.user.username) or str(owner.pk)
+    name, ext = os.path.splitext(os.path.basename(submission_file.file.name))
+
+    path = f"{folder}/{name}{ext}"
+    count = 1
+    while path in used_names:
+        count += 1
+        path = f"{folder}/{name} ({count}){ext}"
+    used_names.add(path)
+    return path
+
+
+def stream_submissions_zip(files, chunk_size=64 * 1024):
+    """
+    Generator of the zip archive bytes.
+    :param files: <SubmissionFile> queryset (see get_submission_files)
+    """
+    for data in _build_zip(files, chunk_size):
+        if data:    # Empty chunks would end a chunked response early
+            yield data
+
+
+def _build_zip(files, chunk_size):
+    buffer = _StreamBuffer()
+    used_names = set()
+
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED,
+                         compresslevel=1, allowZip64=True) as archive:
+        for submission_file in files.iterator(chunk_size=200):
+            try:
+                source = submission_file.file.storage.open(submission_file.file.name, 'rb')
+            except (FileNotFoundError, OSError):
+                print("Submission file not found:", submission_file.file.name)
+                continue
+
+            with source, archive.open(get_archive_name(submission_file, used_names),
+                                      'w', force_zip64=True) as dest:
+                for chunk in source.chunks(chunk_size):
+                    dest.write(chunk)
+                    yield buffer.drain()
+            yield buffer.drain()
+    yield buffer.drain()    # Central directory
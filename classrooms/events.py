@@ -0,0 +1,114 @@
+"""
+Server-Sent Events stream of a quiz ('quiz-started' and 'quiz-ended').
+
+Clients listening to this stream don't need to poll the countdown endpoint.
+This is a plain ASGI application (see django_LMS/asgi.py), so it is only
+available when the project is served with an ASGI server. Waiting for the
+events does not keep a worker thread busy. As the django middlewares are not
+used here, the user is taken from the session cookie and anonymous users
+are rejected.
+
+    GET /quiz-events/<quiz_pk>/
+"""
+import asyncio
+import json
+import re
+from datetime import datetime, timezone
+from importlib import import_module
+from types import SimpleNamespace
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.http.cookie import parse_cookie
+from .countdown import get_quiz_times
+
+PATH = re.compile(r'^/quiz-events/(?P<quiz_pk>\d+)/$')
+
+# Quiz times are checked again at least this often (seconds), so a
+# changed start time is noticed. Also used as the keep-alive interval.
+RECHECK_INTERVAL = 15
+
+
+def _event(name, data) -> bytes:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+async def _send(send, body: bytes, more_body=True):
+    await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+
+async def _respond(send, status, body: bytes):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain')]})
+    await _send(send, body, more_body=False)
+
+
+def _get_user(scope):
+    """
+    User of the session cookie, the same way <AuthenticationMiddleware> does.
+    :return: User or <AnonymousUser>
+    """
+    cookies = {}
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.update(parse_cookie(value.decode('latin-1')))
+
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore(cookies.get(settings.SESSION_COOKIE_NAME))
+    return auth.get_user(SimpleNamespace(session=session))
+
+
+async def quiz_events_app(scope, receive, send):
+    user = await sync_to_async(_get_user)(scope)
+    if not user.is_authenticated:
+        await _respond(send, 403, b'Authentication required')
+        return
+
+    quiz_pk = int(PATH.match(scope['path'])['quiz_pk'])
+    times = await sync_to_async(get_quiz_times)(quiz_pk)
+
+    if times is None:
+        await _respond(send, 404, b'Quiz not found')
+        return
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+    ]})
+
+    # Stop streaming as soon as the client goes away
+    disconnected = asyncio.Event()
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(wait_for_disconnect())
+    started = False
+    try:
+        while not disconnected.is_set():
+            now = datetime.now(timezone.utc)
+            data = {'start': times['start'].isoformat(), 'end': times['end'].isoformat()}
+
+            if not started and now >= times['start']:
+                await _send(send, _event('quiz-started', data))
+                started = True
+            if now >= times['end']:
+                await _send(send, _event('quiz-ended', data))
+                break
+
+            next_event = times['end'] if started else times['start']
+            timeout = min((next_event - now).total_seconds(), RECHECK_INTERVAL)
+            try:
+                await asyncio.wait_for(disconnected.wait(), timeout=max(timeout, 0))
+            except asyncio.TimeoutError:
+                await _send(send, b': keep-alive\n\n')
+
+            times = await sync_to_async(get_quiz_times)(quiz_pk)
+            if times is None:   # Quiz deleted
+                break
+    finally:
+        watcher.cancel()
+        if not disconnected.is_set():
+            await _send(send, b'', more_body=False)
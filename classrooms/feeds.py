@@ -0,0 +1,102 @@
+"""
+Class-work feed of a classroom.
+
+Assignments, meetings and quizzes live in separate tables, but the classroom
+page shows them as one stream ordered by creation date (newest first).
+Each table is read already ordered by the database and the streams are
+merged lazily, so only the items of the requested page are loaded.
+"""
+import heapq
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from django.db.models import Q
+from .models import Assignment, Meeting, Quiz
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class ClassWorkFeed:
+    """
+    Newest first stream of all the class work (<Assignment>, <Meeting>
+    and <Quiz>) of a classroom with cursor ("load more") pagination.
+
+    Items are ordered by (_date_created, type, pk) so the order is stable
+    even if two items are created at the same time. The cursor points to
+    the last item of a page and is a string: '<timestamp>:<type>:<pk>'
+    (timestamp in microseconds).
+    """
+    models = {
+        'assignment': Assignment,
+        'meeting': Meeting,
+        'quiz': Quiz,
+    }
+    page_size = 20
+
+    def __init__(self, classroom, page_size=None):
+        self.classroom = classroom
+        self.page_size = page_size or self.page_size
+
+    @staticmethod
+    def sort_key(work):
+        return work._date_created, work.type, work.pk
+
+    @staticmethod
+    def make_cursor(work) -> str:
+        timestamp = (work._date_created - EPOCH) // MICROSECOND
+        return f"{timestamp}:{work.type}:{work.pk}"
+
+    @staticmethod
+    def parse_cursor(cursor: str):
+        """
+        :return: (date_created, type, pk) tuple or None if cursor is invalid
+        """
+        try:
+            ts, work_type, pk = cursor.split(':')
+            return EPOCH + int(ts) * MICROSECOND, work_type, int(pk)
+        except (ValueError, AttributeError):
+            return None
+
+    def _get_queryset(self, work_type, after=None):
+        """
+        Items of a single model, newest first. If a cursor position is
+        given, only the items coming after that position are returned.
+        """
+        model = self.models[work_type]
+        qs = model.objects.filter(classroom=self.classroom)\
+            .select_related('classroom', 'owner__user')\
+            .order_by('-_date_created', '-pk')
+
+        if after:
+            date_created, after_type, pk = after
+            if work_type < after_type:
+                qs = qs.filter(_date_created__lte=date_created)
+            elif work_type > after_type:
+                qs = qs.filter(_date_created__lt=date_created)
+            else:
+                qs = qs.filter(Q(_date_created__lt=date_created) |
+                               Q(_date_created=date_created, pk__lt=pk))
+        return qs
+
+    def page(self, cursor=None):
+        """
+        Returns the items of a single page and the cursor for the next page.
+        Next cursor is None if there are no more items.
+        :param cursor: Cursor returned by the previous page
+        :return: (items, next_cursor)
+        """
+        after = self.parse_cursor(cursor) if cursor else None
+        size = self.page_size
+
+        # Each queryset is limited to a page (+1 to detect the next page),
+        # so only the rows that can show up in this page are loaded.
+        streams = [self._get_queryset(work_type, after)[:size + 1]
+                   for work_type in self.models]
+        merged = heapq.merge(*streams, key=self.sort_key, reverse=True)
+        items = list(islice(merged, size + 1))
+
+        next_cursor = None
+        if len(items) > size:
+            items = items[:size]
+            next_cursor = self.make_cursor(items[-1])
+        return items, next_cursor
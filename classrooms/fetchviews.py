@@ -3,12 +3,137 @@ THESE VIEWS ARE ONLY ACCESSED BY AJAX
 
 This file contains some of non-important data fetching views
 """
-from .models import Quiz
-from django.http import JsonResponse
+import json
+from .models import Classroom, Assignment
+from .feeds import ClassWorkFeed
+from .countdown import get_quiz_times
+from .uploads import UploadError, start_upload, get_session, append_chunk, complete_uploads, abort_upload
+from main.funcs import is_student
+from main.timezones import utc_to_local_naive
+from django.conf import settings
+from django.http import JsonResponse, Http404, HttpResponseNotAllowed
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.template.loader import render_to_string
+from django.contrib.auth.decorators import login_required, user_passes_test
 
 
+def _quiz_times_etag(request, **kwargs):
+    times = get_quiz_times(kwargs['quiz_pk'])
+    return times['etag'] if times else None
+
+
+@login_required
+@cache_control(private=True, max_age=30)
+@condition(etag_func=_quiz_times_etag)
 def quiz_start_time_view(request, **kwargs):
-    quiz = Quiz.objects.get(pk=kwargs['quiz_pk'])
-    countdown = f"{quiz.start}"
-    return JsonResponse({'countdown': countdown})
+    """
+    Start and end times of a quiz for the countdown. Served from the cache
+    and answered with '304 Not Modified' while the quiz times don't change.
+    """
+    times = get_quiz_times(kwargs['quiz_pk'])
+    if times is None:
+        raise Http404("Quiz not found")
+
+    return JsonResponse({
+        'countdown': f"{utc_to_local_naive(times['start'])}",
+        'start': times['start'].isoformat(),
+        'end': times['end'].isoformat(),
+    })
+
+
+@login_required
+def class_work_view(request, **kwargs):
+    """
+    Next page of the classroom class work, used by the 'load more' button.
+    """
+    classroom = get_object_or_404(Classroom, pk=kwargs['pk'])
+    class_work, cursor = ClassWorkFeed(classroom).page(request.GET.get('cursor'))
+    html = render_to_string(
+        'template-parts/class-work-items.html', {'class_work': class_work}, request=request)
+    return JsonResponse({'html': html, 'cursor': cursor})
+
+
+"""===== CHUNKED SUBMISSION UPLOADS (see uploads.py) ====="""
+
+
+def _upload_error(e: UploadError):
+    return JsonResponse({'error': str(e)}, status=e.status)
+
+
+def _session_data(session):
+    return {
+        'id': str(session.pk),
+        'url': reverse('upload-session', kwargs={'session_id': session.pk}),
+        'file_name': session.file_name,
+        'size': session.size,
+        'offset': session.received,
+        'complete': session.complete,
+        'chunk_size': settings.SUBMISSION_UPLOAD_CHUNK_SIZE,
+    }
+
+
+@user_passes_test(is_student)
+@login_required
+def upload_start_view(request, **kwargs):
+    """
+    Start uploading a submission file. POST JSON: {"file_name": .., "size": ..}
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    assignment = get_object_or_404(Assignment, pk=kwargs['pk'])
+    try:
+        data = json.loads(request.body)
+        session = start_upload(assignment, request.user.profile, data.get('file_name'), data.get('size'))
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': "Invalid request"}, status=400)
+    except UploadError as e:
+        return _upload_error(e)
+    return JsonResponse(_session_data(session), status=201)
+
+
+@user_passes_test(is_student)
+@login_required
+def upload_session_view(request, **kwargs):
+    """
+    GET: Upload status (the offset to resume from)
+    PUT: Append a chunk (raw body) at ?offset=
+    DELETE: Cancel the upload
+    """
+    profile = request.user.profile
+    try:
+        if request.method == 'GET':
+            session = get_session(kwargs['session_id'], profile)
+        elif request.method == 'PUT':
+            session = append_chunk(kwargs['session_id'], profile, request.GET.get('offset'),
+                                   request, request.META.get('CONTENT_LENGTH'))
+        elif request.method == 'DELETE':
+            abort_upload(kwargs['session_id'], profile)
+            return JsonResponse({'msg': 'deleted'})
+        else:
+            return HttpResponseNotAllowed(['GET', 'PUT', 'DELETE'])
+    except UploadError as e:
+        return _upload_error(e)
+    return JsonResponse(_session_data(session))
+
+
+@user_passes_test(is_student)
+@login_required
+def upload_complete_view(request, **kwargs):
+    """
+    Submit the assignment with the uploaded files. POST JSON: {"sessions": [ids]}
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    assignment = get_object_or_404(Assignment, pk=kwargs['pk'])
+    try:
+        session_ids = json.loads(request.body).get('sessions')
+        submission = complete_uploads(assignment, request.user.profile, session_ids)
+    except (ValueError, AttributeError, TypeError):
+        return JsonResponse({'error': "Invalid request"}, status=400)
+    except UploadError as e:
+        return _upload_error(e)
+    return JsonResponse({'msg': 'submitted', 'submission': submission.pk}, status=201)
 
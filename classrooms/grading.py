@@ -0,0 +1,126 @@
+"""
+Bulk grading of assignment submissions.
+
+Grades are posted as a list of rows (student_id, grade, comment), either
+as JSON or CSV. Every row is validated with <AssignmentGradeForm> and, if
+all the rows are valid, the submissions are updated with a single
+bulk_update inside a transaction. Otherwise nothing is saved and the
+errors of each invalid row are returned.
+
+JSON: [{"student_id": 1, "grade": "A", "comment": "Good"}, ...]
+      (or {"grades": [...]})
+CSV:  student_id,grade,comment  (header row is optional)
+
+A missing comment keeps the current comment of the submission.
+"""
+import csv
+import io
+import json
+from django.db import transaction
+from users.stats import schedule_refresh
+from .forms import AssignmentGradeForm
+from .models import Submission
+
+CSV_COLUMNS = ('student_id', 'grade', 'comment')
+
+
+class GradesParseError(Exception):
+    pass
+
+
+def parse_json_grades(body) -> list:
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        raise GradesParseError("Invalid JSON")
+
+    if isinstance(data, dict):
+        data = data.get('grades')
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise GradesParseError("Expected a list of {student_id, grade, comment} objects")
+    return data
+
+
+def parse_csv_grades(text: str) -> list:
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    if rows and rows[0] and rows[0][0].strip().lower() == 'student_id':
+        rows = rows[1:]     # Header row
+    return [dict(zip(CSV_COLUMNS, (cell.strip() for cell in row))) for row in rows]
+
+
+def parse_grades_request(request) -> list:
+    """
+    Rows of a bulk grading request. JSON body, CSV body or an
+    uploaded CSV file ('file' field of a multipart form).
+    """
+    content_type = request.content_type
+    if content_type == 'application/json':
+        return parse_json_grades(request.body)
+
+    try:
+        if 'file' in request.FILES:
+            return parse_csv_grades(request.FILES['file'].read().decode('utf-8-sig'))
+        if content_type in ('text/csv', 'text/plain'):
+            return parse_csv_grades(request.body.decode('utf-8-sig'))
+    except UnicodeDecodeError:
+        raise GradesParseError("CSV must be UTF-8 encoded")
+    raise GradesParseError("Send the grades as JSON or CSV")
+
+
+def apply_grades(assignment, rows):
+    """
+    Validate all the rows and update the submissions of the assignment.
+    :param assignment: <Assignment> being graded
+    :param rows: List of dicts with student_id, grade, comment keys
+    :return: (no of updated submissions, list of row errors)
+    """
+    student_ids = set()
+    for row in rows:
+        try:
+            student_ids.add(int(row.get('student_id')))
+        except (TypeError, ValueError):
+            pass
+
+    # All the submissions of the request with a single query
+    submissions = {
+        sub.owner_id: sub for sub in
+        Submission.objects.filter(assignment=assignment, owner_id__in=student_ids)}
+
+    errors = []
+    graded = {}
+    for i, row in enumerate(rows, start=1):
+        student_id = row.get('student_id')
+        try:
+            student_id = int(student_id)
+        except (TypeError, ValueError):
+            errors.append({'row': i, 'student_id': student_id, 'errors': ["Invalid student id"]})
+            continue
+
+        submission = submissions.get(student_id)
+        if submission is None:
+            errors.append({'row': i, 'student_id': student_id, 'errors': ["No submission for this student"]})
+            continue
+        if student_id in graded:
+            errors.append({'row': i, 'student_id': student_id, 'errors': ["Student is graded twice"]})
+            continue
+
+        comment = row.get('comment')
+        form = AssignmentGradeForm({
+            'grade': row.get('grade') or '',
+            'lec_comment': submission.lec_comment if comment is None else comment,
+        }, instance=submission)
+        if not form.is_valid():
+            messages = [f"{field}: {error}" for field, field_errors in form.errors.items()
+                        for error in field_errors]
+            errors.append({'row': i, 'student_id': student_id, 'errors': messages})
+            continue
+        graded[student_id] = form.save(commit=False)
+
+    if errors:
+        return 0, errors
+
+    with transaction.atomic():
+        Submission.objects.bulk_update(graded.values(), ['grade', 'lec_comment'], batch_size=500)
+        # bulk_update sends no signals
+        schedule_refresh(students=graded.keys(), lecturers=[assignment.owner_id])
+    return len(graded), []
@@ -0,0 +1,177 @@
+"""
+Item analysis of the quizzes: which questions were too hard or ambiguous.
+
+The selected answers of all the responses are loaded with a single query
+into a response matrix (one row per response, one boolean column per
+answer of the quiz) and every statistic is computed from it with NumPy,
+without looping over the responses:
+
+    difficulty:     Proportion of the responses answering the question
+                    correctly (all the correct answers and no incorrect
+                    answer selected). Low values are hard questions.
+    discrimination: Point-biserial correlation between answering the
+                    question correctly and the score of the response.
+                    Low or negative values are ambiguous questions, the
+                    best students do not do better than the others.
+    selection rate: Proportion of the responses selecting each answer.
+                    Distractors (incorrect answers) selected more than a
+                    correct answer need a look.
+
+Reports are cached until a response is saved or deleted (the version of
+'quiz-responses' is increased by the signal handlers) or the answers of
+the quiz change (<Quiz.answer_key_version>).
+"""
+from itertools import chain
+import numpy as np
+from django.core.cache import cache
+from main.caching import get_versions
+from .models import QuizQuestionAnswer, QuizStudentResponse, QuizStudentResponseQuestionAnswer
+
+CACHE_TIMEOUT = 60 * 60 * 24
+HARD = 0.3              # Difficulty below this
+EASY = 0.9              # Difficulty above this
+LOW_DISCRIMINATION = 0.2
+
+
+def load_answers(quiz) -> list:
+    """
+    Answers of the quiz, ordered by question, so the answers of each
+    question are next to each other in the response matrix.
+    :return: List of (answer pk, question number, question, letter, answer, correct)
+    """
+    return list(QuizQuestionAnswer.objects.filter(question__quiz=quiz)
+                .order_by('question__number', 'letter')
+                .values_list('pk', 'question__number', 'question__question', 'letter', 'answer', 'correct'))
+
+
+def build_response_matrix(quiz, answer_pks):
+    """
+    :param answer_pks: Answer of each column of the matrix
+    :return: (scores of the responses, bool matrix of the selected answers)
+    """
+    responses = list(QuizStudentResponse.objects.filter(quiz=quiz).order_by('pk').values_list('pk', 'score'))
+    response_pks = np.array([pk for pk, _ in responses], dtype=np.int64)
+    scores = np.array([score for _, score in responses], dtype=float)
+    selected = np.zeros((len(response_pks), len(answer_pks)), dtype=bool)
+
+    rows = QuizStudentResponseQuestionAnswer.objects.filter(response_question__response__quiz=quiz)\
+        .values_list('response_question__response_id', 'answer_id')
+    pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+    if not len(pairs) or not len(response_pks) or not len(answer_pks):
+        return scores, selected
+
+    # Row and column of each selected answer, by binary search on the sorted primary keys
+    answer_pks = np.asarray(answer_pks, dtype=np.int64)
+    order = np.argsort(answer_pks)
+    sorted_pks = answer_pks[order]
+    row = np.searchsorted(response_pks, pairs[:, 0]).clip(max=len(response_pks) - 1)
+    col = np.searchsorted(sorted_pks, pairs[:, 1]).clip(max=len(sorted_pks) - 1)
+    found = (response_pks[row] == pairs[:, 0]) & (sorted_pks[col] == pairs[:, 1])
+    selected[row[found], order[col[found]]] = True
+    return scores, selected
+
+
+def analyse(scores, selected, correct, question_starts) -> dict:
+    """
+    Statistics of a response matrix.
+    :param scores: Score of each response (n)
+    :param selected: Selected answers (n x answers)
+    :param correct: Whether each answer is correct (answers)
+    :param question_starts: Column of the first answer of each question
+    :return: Arrays of difficulty, discrimination (questions) and selection rates (answers)
+    """
+    n = len(scores)
+    if n == 0 or not len(question_starts):
+        nan = np.full(len(question_starts), np.nan)
+        return {'difficulty': nan, 'discrimination': nan, 'selection_rate': np.full(len(correct), np.nan)}
+
+    # A question is correct when every answer of it is selected as in the answer key
+    mismatch = selected != correct
+    item_correct = ~np.logical_or.reduceat(mismatch, question_starts, axis=1)
+    difficulty = item_correct.mean(axis=0)
+
+    # Point-biserial correlation: cov(item, score) / (std(item) * std(score))
+    centered = scores - scores.mean()
+    covariance = item_correct.T.astype(float) @ centered / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discrimination = covariance / (np.sqrt(difficulty * (1 - difficulty)) * scores.std())
+    discrimination[~np.isfinite(discrimination)] = np.nan
+
+    return {
+        'difficulty': difficulty,
+        'discrimination': discrimination,
+        'selection_rate': selected.mean(axis=0),
+    }
+
+
+def _value(x, digits=3):
+    return None if np.isnan(x) else round(float(x), digits)
+
+
+def build_report(quiz) -> dict:
+    answers = load_answers(quiz)
+    scores, selected = build_response_matrix(quiz, [a[0] for a in answers])
+    correct = np.array([a[5] for a in answers], dtype=bool)
+    numbers = [a[1] for a in answers]
+    question_starts = np.array([i for i, number in enumerate(numbers)
+                                if i == 0 or number != numbers[i - 1]], dtype=np.intp)
+    stats = analyse(scores, selected, correct, question_starts)
+
+    questions = []
+    for q, start in enumerate(question_starts):
+        end = question_starts[q + 1] if q + 1 < len(question_starts) else len(answers)
+        options = [{
+            'letter': answers[i][3],
+            'answer': answers[i][4],
+            'correct': answers[i][5],
+            'selection_rate': _value(stats['selection_rate'][i]),
+        } for i in range(start, end)]
+
+        difficulty, discrimination = _value(stats['difficulty'][q]), _value(stats['discrimination'][q])
+        flags = []
+        if difficulty is not None and difficulty < HARD:
+            flags.append("Too hard")
+        if difficulty is not None and difficulty > EASY:
+            flags.append("Too easy")
+        if discrimination is not None and discrimination < LOW_DISCRIMINATION:
+            flags.append("Low discrimination")
+        correct_rates = [o['selection_rate'] or 0 for o in options if o['correct']]
+        if correct_rates and any((o['selection_rate'] or 0) > min(correct_rates)
+                                 for o in options if not o['correct']):
+            flags.append("Distractor selected more than a correct answer")
+
+        questions.append({
+            'number': answers[start][1],
+            'question': answers[start][2],
+            'difficulty': difficulty,
+            'discrimination': discrimination,
+            'answers': options,
+            'flags': flags,
+        })
+
+    return {
+        'responses': len(scores),
+        'average_score': _value(scores.mean(), 2) if len(scores) else None,
+        'questions': questions,
+    }
+
+
+def cached_quiz_report(name, quiz, build):
+    """
+    Report of the quiz built by build(quiz), cached until a response is
+    saved or deleted or the answers of the quiz change.
+    """
+    version, = get_versions(('quiz-responses', quiz.pk))
+    key = f"quiz-{name}:{quiz.pk}:{quiz.answer_key_version}:{version}"
+    report = cache.get(key)
+    if report is None:
+        report = build(quiz)
+        cache.set(key, report, CACHE_TIMEOUT)
+    return report
+
+
+def get_report(quiz) -> dict:
+    """
+    Item analysis report of the quiz. Cached until a new response arrives.
+    """
+    return cached_quiz_report('item-analysis', quiz, build_report)
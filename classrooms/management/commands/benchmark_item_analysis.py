@@ -0,0 +1,85 @@
+import random
+import timeit
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from classrooms.item_analysis import build_report
+from classrooms.models import (Classroom, Quiz, QuizQuestion, QuizQuestionAnswer, QuizStudentResponse,
+                               QuizStudentResponseQuestion, QuizStudentResponseQuestionAnswer)
+from main.models import Batch, Department
+from users.models import CustomizedUser, Lecturer, Student
+
+LETTERS = 'ABCD'
+
+
+class Command(BaseCommand):
+    help = "Seed a quiz with random responses and time the item analysis report. " \
+           "All the seeded rows are rolled back at the end."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--responses', type=int, default=2000)
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            quiz = self.seed(options['responses'], options['questions'])
+            seconds = timeit.repeat(lambda: build_report(quiz), number=1, repeat=options['repeat'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Item analysis of {options['responses']} responses x {options['questions']} questions: "
+                f"{min(seconds) * 1000:.0f} ms (best of {options['repeat']})"))
+            transaction.set_rollback(True)
+
+    def seed(self, no_of_responses, no_of_questions):
+        batch = Batch.objects.create(year='0000')
+        department = Department.objects.create(batch=batch, name='benchmark')
+        user = CustomizedUser.objects.create(username='__benchmark__', email='benchmark@localhost')
+        lecturer = Lecturer.objects.create(user=user)
+        classroom = Classroom.objects.create(owner=lecturer, department=department, name='benchmark')
+        quiz = Quiz.objects.create(classroom=classroom, owner=lecturer, title='benchmark',
+                                   _start=timezone.now(), duration=60)
+
+        QuizQuestion.objects.bulk_create(
+            QuizQuestion(quiz=quiz, number=i + 1, question=f"Question {i + 1}") for i in range(no_of_questions))
+        questions = list(quiz.quizquestion_set.order_by('number'))
+        QuizQuestionAnswer.objects.bulk_create(
+            QuizQuestionAnswer(question=q, letter=letter, answer=f"Answer {letter}", correct=letter == 'A')
+            for q in questions for letter in LETTERS)
+        answers = {(a.question_id, a.letter): a.pk for a in QuizQuestionAnswer.objects.filter(question__quiz=quiz)}
+
+        CustomizedUser.objects.bulk_create(
+            CustomizedUser(username=f'__benchmark__{i}', email=f'benchmark{i}@localhost')
+            for i in range(no_of_responses))
+        users = CustomizedUser.objects.filter(username__startswith='__benchmark__', lecturer__isnull=True)
+        Student.objects.bulk_create(Student(user=u, department=department) for u in users)
+
+        # Students with a higher ability select the correct answer more often
+        ability = {}
+        responses = []
+        for student in Student.objects.filter(department=department):
+            ability[student.pk] = random.random()
+            responses.append(QuizStudentResponse(quiz=quiz, owner=student, score=0))
+        QuizStudentResponse.objects.bulk_create(responses, batch_size=5000)
+        responses = list(QuizStudentResponse.objects.filter(quiz=quiz).values_list('pk', 'owner_id'))
+
+        QuizStudentResponseQuestion.objects.bulk_create(
+            (QuizStudentResponseQuestion(response_id=r_pk, question=q) for r_pk, _ in responses for q in questions),
+            batch_size=5000)
+        res_questions = QuizStudentResponseQuestion.objects.filter(response__quiz=quiz)\
+            .values_list('pk', 'response_id', 'question_id')
+
+        owners = dict(responses)
+        selected, scores = [], {}
+        for rq_pk, r_pk, q_pk in res_questions.iterator(chunk_size=10000):
+            correct = random.random() < 0.25 + 0.7 * ability[owners[r_pk]]
+            letter = 'A' if correct else random.choice(LETTERS[1:])
+            selected.append(QuizStudentResponseQuestionAnswer(response_question_id=rq_pk,
+                                                              answer_id=answers[(q_pk, letter)]))
+            scores[r_pk] = scores.get(r_pk, 0) + correct
+        QuizStudentResponseQuestionAnswer.objects.bulk_create(selected, batch_size=5000)
+        QuizStudentResponse.objects.bulk_update(
+            [QuizStudentResponse(pk=r_pk, score=correct / no_of_questions * 100) for r_pk, correct in scores.items()],
+            ['score'], batch_size=5000)
+
+        self.stdout.write(f"Seeded {len(responses)} responses to {no_of_questions} questions\n")
+        return quiz
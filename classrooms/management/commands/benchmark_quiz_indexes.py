@@ -0,0 +1,76 @@
+import random
+import timeit
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.utils import timezone
+from classrooms.models import Classroom, Quiz
+from main.models import Batch, Department
+from users.models import CustomizedUser, Lecturer
+
+
+def computed_end_expression():
+    """ How the quiz end was calculated before it was stored in <Quiz._end> """
+    duration = models.ExpressionWrapper(
+        models.F('duration') * 60 * 1000000, output_field=models.DurationField())
+    return models.ExpressionWrapper(
+        models.F('_start') + duration, output_field=models.DateTimeField())
+
+
+class Command(BaseCommand):
+    help = "Seed quizzes into a temporary classroom set and compare the query plans and " \
+           "timings of the quiz time filters with the computed and the stored end time. " \
+           "All the seeded rows are rolled back at the end."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quizzes', type=int, default=100000)
+        parser.add_argument('--classrooms', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            classrooms = self.seed(options['quizzes'], options['classrooms'])
+            self.compare(classrooms[0], options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, no_of_quizzes, no_of_classrooms):
+        batch = Batch.objects.create(year='0000')
+        department = Department.objects.create(batch=batch, name='benchmark')
+        user = CustomizedUser.objects.create(username='__benchmark__', email='benchmark@localhost')
+        lecturer = Lecturer.objects.create(user=user)
+        Classroom.objects.bulk_create(
+            Classroom(owner=lecturer, department=department, name=f"benchmark {i}")
+            for i in range(no_of_classrooms))
+        classrooms = list(Classroom.objects.filter(department=department))
+
+        now = timezone.now()
+        quizzes = []
+        for i in range(no_of_quizzes):
+            start = now + timedelta(minutes=random.randint(-60 * 24 * 365, 60 * 24 * 30))
+            duration = random.choice([15, 30, 60, 120])
+            quizzes.append(Quiz(classroom=classrooms[i % no_of_classrooms], owner=lecturer,
+                                title=f"benchmark {i}", _start=start, duration=duration,
+                                _end=start + timedelta(minutes=duration)))
+        Quiz.objects.bulk_create(quizzes, batch_size=5000)
+        self.stdout.write(f"Seeded {no_of_quizzes} quizzes in {no_of_classrooms} classrooms\n")
+        return classrooms
+
+    def compare(self, classroom, repeat):
+        now = timezone.now()
+        computed = Quiz.objects.alias(_computed_end=computed_end_expression())
+        cases = [
+            ("live quizzes",
+             computed.filter(_start__lte=now, _computed_end__gt=now),
+             Quiz.objects.live()),
+            ("expired quizzes of a classroom",
+             computed.filter(classroom=classroom, _computed_end__lt=now).order_by('-_start'),
+             Quiz.objects.filter(classroom=classroom).expired().order_by('-_start')),
+        ]
+        for name, before, after in cases:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, qs in (("computed end", before), ("stored end", after)):
+                ms = min(timeit.repeat(lambda: list(qs.values_list('pk', flat=True)),
+                                       number=1, repeat=repeat)) * 1000
+                self.stdout.write(f"  {label}: {ms:.2f} ms")
+                for line in qs.explain().splitlines():
+                    self.stdout.write(f"      {line}")
@@ -0,0 +1,15 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from classrooms.uploads import cleanup_abandoned_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete the chunked uploads that were not completed and not updated " \
+           "for the given no of hours. Run periodically (eg: daily cron job)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24)
+
+    def handle(self, *args, **options):
+        removed = cleanup_abandoned_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} abandoned uploads"))
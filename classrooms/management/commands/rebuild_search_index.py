@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from classrooms.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Index all the posts, assignments, quizzes and meetings again for the search. " \
+           "Run once after the first migration, the index is updated automatically afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        counts = rebuild_index(batch_size=options['batch_size'])
+        for doc_type, count in counts.items():
+            self.stdout.write(f"{doc_type:<12}{count:>8}")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {sum(counts.values())} objects"))
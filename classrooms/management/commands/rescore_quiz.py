@@ -0,0 +1,50 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from classrooms.models import Quiz, QuizStudentResponse, QuizStudentResponseQuestionAnswer
+from classrooms.scoring import build_answer_key
+from main.caching import bump_version
+from users.stats import schedule_refresh
+
+
+class Command(BaseCommand):
+    help = "Recalculate the scores of all the responses of a quiz. " \
+           "Use after correcting the answers of a quiz."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='+', type=int)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for quiz_id in options['quiz_ids']:
+            try:
+                quiz = Quiz.objects.get(pk=quiz_id)
+            except Quiz.DoesNotExist:
+                raise CommandError(f"Quiz {quiz_id} does not exist")
+
+            updated = self.rescore(quiz, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Rescored {updated} responses of '{quiz.title}'"))
+
+    @staticmethod
+    def rescore(quiz, batch_size) -> int:
+        answer_key = build_answer_key(quiz)
+
+        # Selected answers of all the responses, loaded with a single query
+        submitted = defaultdict(lambda: defaultdict(list))
+        selected = QuizStudentResponseQuestionAnswer.objects.filter(
+            response_question__response__quiz=quiz,
+        ).values_list('response_question__response_id', 'answer__question__number', 'answer__letter')
+        for response_id, number, letter in selected.iterator():
+            submitted[response_id][number].append(letter)
+
+        responses = list(QuizStudentResponse.objects.filter(quiz=quiz).only('pk', 'owner_id', 'score'))
+        for response in responses:
+            response.score = answer_key.score(submitted[response.pk])
+
+        with transaction.atomic():
+            QuizStudentResponse.objects.bulk_update(responses, ['score'], batch_size=batch_size)
+            # bulk_update sends no signals
+            schedule_refresh(students=[response.owner_id for response in responses], quizzes=[quiz.pk])
+            transaction.on_commit(lambda: bump_version('quiz-responses', quiz.pk))
+        return len(responses)
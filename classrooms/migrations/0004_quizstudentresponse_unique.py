@@ -0,0 +1,35 @@
+# Generated by Django 4.1.7 on 2026-10-18 01:37
+
+from django.db import migrations
+
+
+def delete_duplicate_responses(apps, schema_editor):
+    """
+    Keep only the first response of a student for a quiz. Later ones
+    could only be created by concurrent double submissions.
+    """
+    QuizStudentResponse = apps.get_model('classrooms', 'QuizStudentResponse')
+    seen = set()
+    duplicates = []
+    for pk, quiz_id, owner_id in QuizStudentResponse.objects.order_by('pk')\
+            .values_list('pk', 'quiz_id', 'owner_id').iterator():
+        if (quiz_id, owner_id) in seen:
+            duplicates.append(pk)
+        seen.add((quiz_id, owner_id))
+    QuizStudentResponse.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_student_reg_no'),
+        ('classrooms', '0003_remove_assignment_type'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_responses, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='quizstudentresponse',
+            unique_together={('quiz', 'owner')},
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.1.7 on 2026-10-18 03:12
+
+from django.db import migrations, models
+
+
+def fill_quiz_end(apps, schema_editor):
+    """
+    Set <Quiz._end> (start + duration minutes) of the existing quizzes.
+    Durations are stored as microseconds by the MySQL and SQLite backends.
+    """
+    Quiz = apps.get_model('classrooms', 'Quiz')
+    duration = models.ExpressionWrapper(
+        models.F('duration') * 60 * 1000000, output_field=models.DurationField())
+    Quiz.objects.update(_end=models.ExpressionWrapper(
+        models.F('_start') + duration, output_field=models.DateTimeField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0005_quiz_answer_key_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='_end',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_quiz_end, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='quiz',
+            name='_end',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['classroom', '_date_due'], name='assignment_class_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['classroom', '_start'], name='meeting_class_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['classroom', '_start'], name='quiz_class_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['classroom', '_end'], name='quiz_class_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['_end'], name='quiz_end_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.7 on 2026-10-18 01:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_profile_thumbnails'),
+        ('classrooms', '0006_quiz_end_and_time_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('received', models.BigIntegerField(default=0)),
+                ('_date_created', models.DateTimeField(auto_now_add=True)),
+                ('_date_mod', models.DateTimeField(auto_now=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='classrooms.assignment')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.student')),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.7 on 2026-10-18 01:56
+
+from django.db import migrations, models
+import main.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0007_uploadsession'),
+        ('main', '0002_blob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submissionfile',
+            name='file',
+            field=models.FileField(max_length=255, storage=main.storage.ContentAddressedStorage(), upload_to='submission-files'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.1.7 on 2026-10-18 02:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+TABLE = 'classrooms_searchdocument'
+FTS_TABLE = 'classrooms_searchdocument_fts'
+
+# SQLite: FTS5 external content table, kept in sync with triggers
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"title, body, content='{TABLE}', content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE TRIGGER {TABLE}_ai AFTER INSERT ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    f"CREATE TRIGGER {TABLE}_ad AFTER DELETE ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    f"CREATE TRIGGER {TABLE}_au AFTER UPDATE ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# MySQL: InnoDB FULLTEXT index
+MYSQL_CREATE = [f"ALTER TABLE {TABLE} ADD FULLTEXT INDEX {TABLE}_ft (title, body)"]
+MYSQL_DROP = [f"ALTER TABLE {TABLE} DROP INDEX {TABLE}_ft"]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0008_submissionfile_blob_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.CharField(max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=300)),
+                ('body', models.TextField(blank=True)),
+                ('_date_created', models.DateTimeField()),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='classrooms.classroom')),
+            ],
+            options={
+                'unique_together': {('doc_type', 'object_id')},
+            },
+        ),
+        # Other databases are searched without a full-text index (see search.py)
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_CREATE, 'mysql': MYSQL_CREATE}),
+            _run({'sqlite': SQLITE_DROP, 'mysql': MYSQL_DROP}),
+        ),
+    ]
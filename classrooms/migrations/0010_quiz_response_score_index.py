@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-18 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0009_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizstudentresponse',
+            index=models.Index(fields=['quiz', 'score'], name='quiz_response_score_idx'),
+        ),
+    ]
@@ -1,15 +1,27 @@
 import os.path
+import uuid
 from datetime import datetime, timedelta
 from django.db import models
 from users.models import CustomizedUser, Student, Lecturer
 from main.models import Batch, Department
+from main.storage import blob_storage
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
 from ckeditor.fields import RichTextField
-from main.funcs import (
+from main.timezones import (
     local_to_utc_aware,
     local_to_utc_naive,
     utc_to_local_aware,
     utc_to_local_naive,
-    get_naive_dt
+    get_naive_dt,
+    local_today
+)
+from .querysets import (
+    AssignmentQuerySet,
+    SubmissionQuerySet,
+    MeetingQuerySet,
+    QuizQuerySet
 )
 
 
@@ -69,8 +81,13 @@ class Assignment(models.Model):
     file = models.FileField(null=True, blank=True, upload_to='assignment-files')  # This won't be used actually
     review_complete = models.BooleanField(default=False)
 
+    objects = AssignmentQuerySet.as_manager()
+
     class Meta:
         unique_together = (('title', 'classroom'),)
+        indexes = [
+            models.Index(fields=['classroom', '_date_due'], name='assignment_class_due_idx'),
+        ]
 
     def __str__(self):
         return f"Assignment: {self.title} [ {self.classroom} ]"
@@ -93,9 +110,7 @@ class Assignment(models.Model):
 
     @property
     def expired(self):
-        if get_naive_dt(self.date_due) < get_naive_dt(datetime.utcnow()):
-            return True
-        return False
+        return self._date_due < timezone.now()
 
     @property
     def pending_submissions(self) -> int:
@@ -113,6 +128,8 @@ class Submission(models.Model):
     file = models.FileField(blank=True, null=True)  # this should not be saved. instead, <SubmissionFile> will be used.
     lec_comment = models.TextField(null=True, blank=True)
 
+    objects = SubmissionQuerySet.as_manager()
+
     def __str__(self):
         return f"Submission By: {self.owner.user.username}" \
                f" [Assignment-> {self.assignment.title}]"
@@ -134,14 +151,39 @@ class Submission(models.Model):
 
 class SubmissionFile(models.Model):
     """
-    Used for multiple file upload functionality
+    Used for multiple file upload functionality.
+    Files are deduplicated by the content-addressed storage (main/storage.py).
     """
     submission = models.ForeignKey(Submission, on_delete=models.CASCADE)
-    file = models.FileField(upload_to='submission-files')
+    file = models.FileField(upload_to='submission-files', storage=blob_storage, max_length=255)
+
+    def get_file_name(self):
+        return os.path.basename(self.file.name)
 
     def get_short_file_name(self):
-        name = self.file.name
-        return os.path.basename(name)[-28:]
+        return self.get_file_name()[-28:]
+
+
+class UploadSession(models.Model):
+    """
+    Chunked (resumable) upload of a single submission file (see uploads.py).
+    Chunks are appended to a part file until 'received' reaches 'size'.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE)
+    owner = models.ForeignKey(Student, on_delete=models.CASCADE)
+    file_name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    _date_created = models.DateTimeField(auto_now_add=True)
+    _date_mod = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload: {self.file_name} ({self.received}/{self.size})"
+
+    @property
+    def complete(self):
+        return self.received == self.size
 
 
 """
@@ -164,8 +206,13 @@ class Meeting(models.Model):
     meeting_pwd = models.CharField(null=True, blank=True, max_length=200)
     recording_url = models.URLField(null=True, blank=True)
 
+    objects = MeetingQuerySet.as_manager()
+
     class Meta:
         unique_together = (('classroom', 'topic'),)
+        indexes = [
+            models.Index(fields=['classroom', '_start'], name='meeting_class_start_idx'),
+        ]
 
     def __str__(self):
         return f"Meeting: {self.topic} [Class-> {self.classroom.name}" \
@@ -196,15 +243,11 @@ class Meeting(models.Model):
 
     @property
     def is_today(self):
-        if self.start.date() == datetime.today().date():
-            return True
-        print("not today:", self.start)
-        return False
+        return self.start.date() == local_today()
 
     @property
     def is_expired(self):
-        if get_naive_dt(datetime.utcnow()).date() > get_naive_dt(self._start).date():
-            return True
+        return self.start.date() < local_today()
 
 
 """
@@ -222,15 +265,33 @@ class Quiz(models.Model):
     _date_created = models.DateTimeField(auto_now_add=True)
     _date_modified = models.DateTimeField(auto_now=True)
     _start = models.DateTimeField()
+    _end = models.DateTimeField(editable=False)     # _start + duration, set on save
     duration = models.IntegerField()
     accept_after_expired = models.BooleanField(default=True)
+    # Increased whenever questions or answers change (see scoring.py)
+    answer_key_version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = QuizQuerySet.as_manager()
 
     class Meta:
         unique_together = (('classroom', 'title'),)
+        indexes = [
+            models.Index(fields=['classroom', '_start'], name='quiz_class_start_idx'),
+            models.Index(fields=['classroom', '_end'], name='quiz_class_end_idx'),
+            models.Index(fields=['_end'], name='quiz_end_idx'),
+        ]
 
     def __str__(self):
         return f"Quiz: {self.title}"
 
+    def save(self, *args, **kwargs):
+        # Keep the stored end time in sync with start and duration
+        self._end = self._start + timedelta(minutes=float(self.duration))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'_start', 'duration'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, '_end'}
+        super().save(*args, **kwargs)
+
     @property
     def type(self):
         return 'quiz'
@@ -245,15 +306,11 @@ class Quiz(models.Model):
 
     @property
     def live(self):
-        if self.start < datetime.now() < self.end:
-            return True
-        return False
+        return self._start < timezone.now() < self._end
 
     @property
     def expired(self):
-        if datetime.now() > self.end:
-            return True
-        return False
+        return timezone.now() > self._end
 
     @property
     def start(self):
@@ -261,7 +318,7 @@ class Quiz(models.Model):
 
     @property
     def end(self):
-        return self.start + timedelta(minutes=float(self.duration))
+        return utc_to_local_naive(self._end)
 
 
 class QuizQuestion(models.Model):
@@ -317,6 +374,14 @@ class QuizStudentResponse(models.Model):
     _date_created = models.DateTimeField(auto_now_add=True)
     score = models.FloatField(default=0)
 
+    class Meta:
+        # Only one response is allowed per student for a quiz
+        unique_together = (('quiz', 'owner'),)
+        indexes = [
+            # Results ranked by score
+            models.Index(fields=['quiz', 'score'], name='quiz_response_score_idx'),
+        ]
+
     def __str__(self):
         return f"Quiz Response by: {self.owner.user.get_full_name()}"
 
@@ -351,3 +416,33 @@ class QuizStudentResponseQuestionAnswer(models.Model):
 
     def __str__(self):
         return f"StudentResponseQuestionAnswer: {self.answer.answer}"
+
+
+class SearchDocument(models.Model):
+    """
+    Plain text (html stripped) of a <Post>, <Assignment>, <Quiz> or <Meeting>,
+    kept up to date by the signal handlers. Full-text indexed by the
+    database. (see search.py)
+    """
+    doc_type = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE)
+    title = models.CharField(max_length=300)
+    body = models.TextField(blank=True)
+    _date_created = models.DateTimeField()    # Of the indexed object
+
+    class Meta:
+        unique_together = (('doc_type', 'object_id'),)
+
+    def __str__(self):
+        return f"{self.doc_type}: {self.title}"
+
+    def get_absolute_url(self):
+        if self.doc_type == 'post':
+            return reverse('post-details', kwargs={'class_pk': self.classroom_id, 'pk': self.object_id})
+        return reverse(f'{self.doc_type}-details', kwargs={
+            'class_name': slugify(self.classroom.name), 'pk': self.object_id})
+
+    @property
+    def date_created(self):
+        return utc_to_local_naive(self._date_created)
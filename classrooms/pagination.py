@@ -0,0 +1,126 @@
+"""
+Keyset (cursor) pagination of ordered querysets for the list pages.
+
+Instead of OFFSET, the next page is selected with a WHERE clause on the
+ordering field and the primary key of the last item of the previous page,
+so every page is a range scan no matter how long the history is. The
+cursor is a string: '<value>:<pk>' (datetime values in microseconds).
+"""
+from datetime import datetime, timedelta, timezone
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by its first ordering field (pk if not ordered).
+    The primary key is used as the tie-breaker, so the order is stable
+    even if several items have the same value.
+    """
+
+    def __init__(self, queryset, page_size):
+        ordering = queryset.query.order_by or ('-pk',)
+        self.descending = ordering[0].startswith('-')
+        self.field = ordering[0].lstrip('-')
+        self.page_size = page_size
+
+        pk_order = '-pk' if self.descending else 'pk'
+        if self.field == 'pk':
+            self.queryset = queryset.order_by(pk_order)
+        else:
+            self.queryset = queryset.order_by(ordering[0], pk_order)
+
+    def make_cursor(self, item) -> str:
+        if self.field == 'pk':
+            return str(item.pk)
+        value = getattr(item, self.field)
+        if isinstance(value, datetime):
+            value = (value - EPOCH) // MICROSECOND
+        return f"{value}:{item.pk}"
+
+    def parse_cursor(self, cursor: str):
+        """
+        :return: (value, pk) tuple or None if cursor is invalid
+        """
+        try:
+            if self.field == 'pk':
+                return None, int(cursor)
+            value, pk = cursor.split(':')
+            field = self.queryset.model._meta.get_field(self.field)
+            if field.get_internal_type() == 'DateTimeField':
+                return EPOCH + int(value) * MICROSECOND, int(pk)
+            return field.to_python(value), int(pk)
+        except (ValueError, AttributeError, ValidationError):
+            return None
+
+    def _after(self, value, pk):
+        op = 'lt' if self.descending else 'gt'
+        if self.field == 'pk':
+            return self.queryset.filter(**{f"pk__{op}": pk})
+        return self.queryset.filter(Q(**{f"{self.field}__{op}": value}) |
+                                    Q(**{self.field: value, f"pk__{op}": pk}))
+
+    def page(self, cursor=None):
+        """
+        Returns the items of a single page and the cursor for the next page.
+        Next cursor is None if there are no more items.
+        :param cursor: Cursor returned by the previous page
+        :return: (items, next_cursor)
+        """
+        after = self.parse_cursor(cursor) if cursor else None
+        qs = self._after(*after) if after else self.queryset
+
+        items = list(qs[:self.page_size + 1])   # +1 to detect the next page
+        next_cursor = None
+        if len(items) > self.page_size:
+            items = items[:self.page_size]
+            next_cursor = self.make_cursor(items[-1])
+        return items, next_cursor
+
+
+class KeysetPaginationMixin:
+    """
+    <ListView> mixin. Shows a single page of the (ordered) queryset and
+    the cursor of the next page as 'next_cursor'.
+
+    GET parameters:
+        cursor: Cursor of the page to show (first page if not given)
+        page_size: Items per page (limited to max_page_size)
+        format=json: Returns {'html': <items>, 'cursor': <next cursor>}
+                     rendered with 'items_template_name' (infinite scroll)
+    """
+    page_size = 20
+    max_page_size = 100
+    items_template_name = None
+    list_select_related = ()
+
+    def get_page_size(self) -> int:
+        try:
+            size = int(self.request.GET.get('page_size', self.page_size))
+        except ValueError:
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_context_data(self, **kwargs):
+        queryset = kwargs.pop('object_list', self.object_list)
+        if queryset is None:
+            raise Http404("Unknown list type")
+        if self.list_select_related:
+            queryset = queryset.select_related(*self.list_select_related)
+
+        paginator = KeysetPaginator(queryset, self.get_page_size())
+        items, next_cursor = paginator.page(self.request.GET.get('cursor'))
+        context = super().get_context_data(object_list=items, **kwargs)
+        context['next_cursor'] = next_cursor
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') == 'json':
+            html = render_to_string(self.items_template_name, context, request=self.request)
+            return JsonResponse({'html': html, 'cursor': context['next_cursor']})
+        return super().render_to_response(context, **response_kwargs)
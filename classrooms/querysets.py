@@ -0,0 +1,121 @@
+"""
+Custom querysets of the class work models (<Assignment>, <Meeting>, <Quiz>).
+
+Date predicates (expired, live, today, ...) are evaluated by the database.
+Times are compared in UTC and local days are converted to UTC
+[start, end) boundaries before querying (see main.timezones).
+Day based methods take an optional local date and default to today.
+"""
+from django.db import models
+from django.utils import timezone
+from main.timezones import local_day_range, local_month_range
+
+
+class ClassWorkQuerySet(models.QuerySet):
+    """
+    Common filters. Subclasses set the field used for the day filters.
+    """
+    date_field = None
+
+    def for_department(self, department_id):
+        return self.filter(classroom__department_id=department_id)
+
+    def on_day(self, day=None):
+        start, end = local_day_range(day)
+        return self.filter(**{f"{self.date_field}__gte": start,
+                              f"{self.date_field}__lt": end})
+
+    def today(self):
+        return self.on_day()
+
+    def after_day(self, day=None):
+        """ Items after the given day (today excluded) """
+        start, end = local_day_range(day)
+        return self.filter(**{f"{self.date_field}__gte": end})
+
+    def before_day(self, day=None):
+        """ Items before the given day (today excluded) """
+        start, end = local_day_range(day)
+        return self.filter(**{f"{self.date_field}__lt": start})
+
+    def in_month(self, day=None):
+        start, end = local_month_range(day)
+        return self.filter(**{f"{self.date_field}__gte": start,
+                              f"{self.date_field}__lt": end})
+
+
+class AssignmentQuerySet(ClassWorkQuerySet):
+    date_field = '_date_due'
+
+    def ongoing(self):
+        """ Due date is not exceeded """
+        return self.filter(_date_due__gte=timezone.now())
+
+    def expired(self):
+        return self.filter(_date_due__lt=timezone.now())
+
+    def pending_review(self):
+        return self.expired().filter(review_complete=False)
+
+    def reviewed(self):
+        return self.filter(review_complete=True)
+
+    def submitted_by(self, student):
+        return self.filter(self._submission_exists(student))
+
+    def not_submitted_by(self, student):
+        return self.filter(~self._submission_exists(student))
+
+    @staticmethod
+    def _submission_exists(student):
+        from .models import Submission
+        return models.Exists(Submission.objects.filter(
+            assignment=models.OuterRef('pk'), owner=student))
+
+
+class SubmissionQuerySet(models.QuerySet):
+    def late(self):
+        """ Submitted after the due date (same as <Submission.is_late_submit>) """
+        return self.filter(_date_created__gt=models.F('assignment___date_due'))
+
+    def on_time(self):
+        return self.filter(_date_created__lte=models.F('assignment___date_due'))
+
+
+class MeetingQuerySet(ClassWorkQuerySet):
+    date_field = '_start'
+
+    def upcoming(self):
+        """ Meetings after today """
+        return self.after_day()
+
+    def previous(self):
+        """ Meetings before today (same as <Meeting.is_expired>) """
+        return self.before_day()
+
+
+class QuizQuerySet(ClassWorkQuerySet):
+    date_field = '_start'
+
+    def live(self):
+        now = timezone.now()
+        return self.filter(_start__lte=now, _end__gt=now)
+
+    def expired(self):
+        return self.filter(_end__lt=timezone.now())
+
+    def upcoming(self):
+        """ Quizzes after today """
+        return self.after_day()
+
+    def responded_by(self, student):
+        return self.filter(self._response_exists(student))
+
+    def not_responded_by(self, student):
+        return self.filter(~self._response_exists(student))
+
+    @staticmethod
+    def _response_exists(student):
+        from .models import QuizStudentResponse
+        return models.Exists(QuizStudentResponse.objects.filter(
+            quiz=models.OuterRef('pk'), owner=student))
@@ -0,0 +1,99 @@
+"""
+Ranked results of a quiz, score statistics and the CSV export.
+
+Responses are ranked by score in the database. Students with the same
+score have the same rank (1, 2, 2, 4). The rank of each response is the
+no of responses with a higher score plus one, counted with the
+(quiz, score) index, so any page of the results can be ranked by itself.
+
+The statistics (mean, median, percentiles, histogram) are computed from
+all the scores with NumPy and cached like the item analysis report.
+"""
+import csv
+import numpy as np
+from django.db.models import OuterRef, Value
+from main.timezones import utc_to_local_naive
+from users.dashboard import count_subquery
+from .item_analysis import cached_quiz_report
+from .models import QuizStudentResponse
+
+HISTOGRAM_BINS = 10     # 0-10, 10-20, ... 90-100
+PERCENTILES = (25, 50, 75, 90)
+CSV_COLUMNS = ('Rank', 'Registration No', 'Name', 'Email', 'Score', 'Submitted')
+
+
+def get_ranked_responses(quiz):
+    """
+    Responses of the quiz, best score first, annotated with the 'rank'.
+    """
+    higher = QuizStudentResponse.objects.filter(quiz=OuterRef('quiz'), score__gt=OuterRef('score'))
+    return QuizStudentResponse.objects.filter(quiz=quiz)\
+        .annotate(rank=count_subquery(higher) + Value(1))\
+        .order_by('-score')
+
+
+def score_summary(scores) -> dict:
+    """
+    :param scores: Scores (0 - 100) of all the responses
+    """
+    scores = np.asarray(scores, dtype=float)
+    counts, edges = np.histogram(scores, bins=HISTOGRAM_BINS, range=(0, 100))
+    histogram = [{'label': f"{edges[i]:.0f}-{edges[i + 1]:.0f}", 'count': int(count)}
+                 for i, count in enumerate(counts)]
+    if not len(scores):
+        return {'responses': 0, 'mean': None, 'median': None, 'min': None, 'max': None,
+                'percentiles': {}, 'histogram': histogram}
+
+    # All the percentiles (and the median) with a single partition of the scores
+    values = np.percentile(scores, PERCENTILES)
+    percentiles = {str(p): round(float(v), 2) for p, v in zip(PERCENTILES, values)}
+    return {
+        'responses': len(scores),
+        'mean': round(float(scores.mean()), 2),
+        'median': percentiles['50'],
+        'min': round(float(scores.min()), 2),
+        'max': round(float(scores.max()), 2),
+        'percentiles': percentiles,
+        'histogram': histogram,
+    }
+
+
+def build_score_summary(quiz) -> dict:
+    scores = QuizStudentResponse.objects.filter(quiz=quiz).values_list('score', flat=True)
+    return score_summary(np.fromiter(scores.iterator(), dtype=float))
+
+
+def get_score_summary(quiz) -> dict:
+    """
+    Score statistics of the quiz. Cached until a new response arrives.
+    """
+    return cached_quiz_report('score-summary', quiz, build_score_summary)
+
+
+class _Echo:
+    """ File-like object returning what is written, for streaming the csv rows """
+
+    def write(self, value):
+        return value
+
+
+def stream_results_csv(quiz):
+    """
+    Generator of the csv lines of the ranked results, in the order of the
+    results page. Rows are read with an iterator and the ranks are
+    counted while streaming.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+
+    rows = QuizStudentResponse.objects.filter(quiz=quiz).order_by('-score', '-pk').values_list(
+        'score', 'owner__reg_no', 'owner__user__first_name', 'owner__user__last_name',
+        'owner__user__email', '_date_created')
+
+    rank = 0
+    previous = None
+    for position, (score, reg_no, first_name, last_name, email, created) in enumerate(rows.iterator(), start=1):
+        if score != previous:
+            rank, previous = position, score
+        yield writer.writerow([rank, reg_no, f"{first_name} {last_name}".strip(), email, score,
+                               utc_to_local_naive(created).strftime('%Y-%m-%d %H:%M:%S')])
@@ -0,0 +1,83 @@
+"""
+Quiz answer keys and scoring.
+
+The answer key of a quiz is built once from the database and cached.
+Cache keys contain <Quiz.answer_key_version>, which is increased whenever
+the questions or answers of the quiz change, so a stale key is never used.
+"""
+from django.core.cache import cache
+from django.db.models import F
+from .models import Quiz, QuizQuestionAnswer
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class AnswerKey:
+    """
+    Correct and incorrect answers of a quiz as (question number, letter) pairs.
+    """
+
+    def __init__(self, answers):
+        """
+        :param answers: Iterable of (question number, letter, correct) tuples
+        """
+        self.correct = set()
+        self.incorrect = set()
+        for number, letter, correct in answers:
+            if correct:
+                self.correct.add((number, letter))
+            else:
+                self.incorrect.add((number, letter))
+
+    def score(self, submitted: dict) -> float:
+        """
+        Score of a response. Percentage of the correct answers selected,
+        minus 0.1 for each selected incorrect answer (never below 0).
+        :param submitted: Mapping of question number to the selected letters
+        :return:
+        """
+        selected = set((number, letter)
+                       for number, letters in submitted.items() for letter in letters)
+        correct = len(selected & self.correct)
+        incorrect = len(selected & self.incorrect)
+
+        try:
+            score = (correct / len(self.correct)) * 100 - (incorrect * 0.1)
+        except ZeroDivisionError:   # No actual correct answers for the quiz
+            score = 100 if incorrect == 0 else 0
+
+        score = 0 if score < 0 else score
+        return round(score, 2)
+
+
+def _cache_key(quiz: Quiz) -> str:
+    return f"quiz-answer-key-{quiz.pk}-{quiz.answer_key_version}"
+
+
+def build_answer_key(quiz: Quiz) -> AnswerKey:
+    """
+    Build the answer key from the database (single query) and cache it.
+    """
+    answers = QuizQuestionAnswer.objects.filter(question__quiz=quiz)\
+        .values_list('question__number', 'letter', 'correct')
+    answer_key = AnswerKey(answers)
+    cache.set(_cache_key(quiz), answer_key, CACHE_TIMEOUT)
+    return answer_key
+
+
+def get_answer_key(quiz: Quiz) -> AnswerKey:
+    """
+    Cached answer key of the quiz. Built if not available.
+    """
+    answer_key = cache.get(_cache_key(quiz))
+    if answer_key is None:
+        answer_key = build_answer_key(quiz)
+    return answer_key
+
+
+def invalidate_answer_key(quiz_pk):
+    """
+    Increase the answer key version of the quiz, so the cached key
+    is not used anymore.
+    """
+    Quiz.objects.filter(pk=quiz_pk).update(answer_key_version=F('answer_key_version') + 1)
@@ -0,0 +1,160 @@
+"""
+Full-text search of the posts and the class work.
+
+Titles and text (CK Editor html stripped) of posts, assignments, quizzes
+and meetings are copied into <SearchDocument> rows by the signal handlers
+(index_object, remove_object) and by the 'rebuild_search_index' command.
+The rows are full-text indexed by the database (see migration 0009):
+
+    MySQL:  FULLTEXT index, ranked by MATCH ... AGAINST
+    SQLite: FTS5 table kept in sync by triggers, ranked by bm25
+    Others: LIKE on the title and the text, title matches first
+
+Results are limited to the classrooms the user can see.
+"""
+import html
+import re
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from .models import Classroom, Post, Assignment, Quiz, Meeting, SearchDocument
+
+# doc_type -> (model, title field, text field)
+INDEXED_MODELS = {
+    'post': (Post, 'title', 'content'),
+    'assignment': (Assignment, 'title', 'content'),
+    'quiz': (Quiz, 'title', 'description'),
+    'meeting': (Meeting, 'topic', 'description'),
+}
+DOC_TYPES = {model: doc_type for doc_type, (model, _, _) in INDEXED_MODELS.items()}
+
+FTS_TABLE = 'classrooms_searchdocument_fts'
+TITLE_WEIGHT = 10.0     # bm25 weight of the title column (text is 1)
+MAX_TERMS = 10
+MAX_RESULTS = 50
+
+_BLOCK_TAG_RE = re.compile(r'<(br|/?(p|div|li|tr|td|th|h\d|blockquote|pre))\b[^>]*>', re.IGNORECASE)
+
+
+def html_to_text(value) -> str:
+    # Block tags are replaced with spaces, so the words on both sides are not joined
+    text = html.unescape(re.sub(r'<[^>]*>', '', _BLOCK_TAG_RE.sub(' ', value or '')))
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def make_document(obj) -> SearchDocument:
+    doc_type = DOC_TYPES[type(obj)]
+    _, title_field, text_field = INDEXED_MODELS[doc_type]
+    return SearchDocument(
+        doc_type=doc_type,
+        object_id=obj.pk,
+        classroom_id=obj.classroom_id,
+        title=getattr(obj, title_field) or '',
+        body=html_to_text(getattr(obj, text_field)),
+        _date_created=obj._date_created)
+
+
+def index_object(obj, update_fields=None):
+    """
+    Add or update the search document of a post, assignment, quiz or meeting.
+    :param update_fields: Fields saved (post_save). Nothing is done if the
+                          indexed fields were not saved.
+    """
+    doc_type = DOC_TYPES[type(obj)]
+    _, title_field, text_field = INDEXED_MODELS[doc_type]
+    if update_fields and not {title_field, text_field, 'classroom'} & set(update_fields):
+        return
+
+    doc = make_document(obj)
+    SearchDocument.objects.update_or_create(
+        doc_type=doc_type, object_id=obj.pk, defaults={
+            'classroom_id': doc.classroom_id,
+            'title': doc.title,
+            'body': doc.body,
+            '_date_created': doc._date_created,
+        })
+
+
+def remove_object(obj):
+    SearchDocument.objects.filter(doc_type=DOC_TYPES[type(obj)], object_id=obj.pk).delete()
+
+
+def rebuild_index(batch_size=500) -> dict:
+    """
+    Index all the objects again. Objects are read and written in batches,
+    so memory usage does not depend on the no of objects.
+    :return: No of indexed objects of each type
+    """
+    counts = {}
+    for doc_type, (model, title_field, text_field) in INDEXED_MODELS.items():
+        objects = model.objects.only('pk', 'classroom_id', '_date_created', title_field, text_field).order_by('pk')
+        counts[doc_type] = 0
+
+        with transaction.atomic():
+            SearchDocument.objects.filter(doc_type=doc_type).delete()
+            batch = []
+            for obj in objects.iterator(chunk_size=batch_size):
+                batch.append(make_document(obj))
+                if len(batch) >= batch_size:
+                    SearchDocument.objects.bulk_create(batch)
+                    counts[doc_type] += len(batch)
+                    batch = []
+            SearchDocument.objects.bulk_create(batch)
+            counts[doc_type] += len(batch)
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return counts
+
+
+def get_visible_classrooms(user):
+    if user.is_student:
+        return Classroom.objects.filter(department_id=user.profile.department_id)
+    elif user.is_lecturer:
+        return user.profile.classroom_set.all()
+    return Classroom.objects.none()
+
+
+def get_terms(query: str) -> list:
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _rank_sqlite(docs, terms):
+    # Every term is a prefix ("assign" matches "assignment"), all must match
+    match = ' '.join(f'"{term}"*' for term in terms)
+    table = SearchDocument._meta.db_table
+    matched = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+    score = RawSQL(
+        f"SELECT -bm25({FTS_TABLE}, %s, 1.0) FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {table}.id", (TITLE_WEIGHT, match))
+    return docs.filter(pk__in=matched).annotate(score=score)
+
+
+def _rank_mysql(docs, terms):
+    table = SearchDocument._meta.db_table
+    score = RawSQL(f"MATCH ({table}.title, {table}.body) AGAINST (%s IN NATURAL LANGUAGE MODE)",
+                   (' '.join(terms),))
+    return docs.annotate(score=score).filter(score__gt=0)
+
+
+def _rank_like(docs, terms):
+    for term in terms:
+        docs = docs.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    title_matches = [Case(When(title__icontains=term, then=Value(1)), default=Value(0),
+                          output_field=IntegerField()) for term in terms]
+    return docs.annotate(score=sum(title_matches[1:], title_matches[0]))
+
+
+def search(user, query, limit=MAX_RESULTS) -> list:
+    """
+    Search documents of the classrooms the user can see, best match first.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return []
+
+    docs = SearchDocument.objects.filter(classroom__in=get_visible_classrooms(user))
+    rank = {'sqlite': _rank_sqlite, 'mysql': _rank_mysql}.get(connection.vendor, _rank_like)
+    return list(rank(docs, terms).select_related('classroom')
+                .order_by('-score', '-_date_created')[:limit])
@@ -1,7 +1,13 @@
 import os
-from django.db.models.signals import post_delete
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
-from .models import Submission
+from main.caching import bump_object_version, bump_version
+from .models import Classroom, Post, Assignment, Meeting, Submission, SubmissionFile, Quiz, QuizQuestion, \
+    QuizQuestionAnswer, QuizStudentResponse
+from .scoring import invalidate_answer_key
+from .search import index_object, remove_object
+from .countdown import invalidate_quiz_times
 
 
 @receiver(post_delete, sender=Submission)
@@ -15,3 +21,114 @@ def submission_deleted(sender, instance, **kwargs):
                 os.remove(instance.file.path)
             except Exception as e:
                 print(f"Error when deleting submission file: {e}")
+
+
+@receiver(post_delete, sender=SubmissionFile)
+def submission_file_deleted(sender, instance, **kwargs):
+    """
+    Release the file of a deleted <SubmissionFile>. (also when deleted with
+    the submission) The stored file is removed only if no other
+    <SubmissionFile> refers to the same content.
+    """
+    if instance.file:
+        try:
+            instance.file.delete(save=False)
+        except OSError as e:
+            print(f"Error when deleting submission file: {e}")
+
+
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+@receiver(post_save, sender=QuizQuestionAnswer)
+@receiver(post_delete, sender=QuizQuestionAnswer)
+def quiz_answers_changed(sender, instance, **kwargs):
+    """
+    Invalidate the cached answer key of the quiz when a question
+    or an answer is changed. (ex: answer corrected from the admin)
+    Bulk operations (bulk_create, bulk_update, queryset delete and
+    cascades) should invalidate the answer key by themselves.
+    """
+    if kwargs.get('origin', instance) is not instance:
+        return
+
+    if isinstance(instance, QuizQuestion):
+        invalidate_answer_key(instance.quiz_id)
+    else:
+        quiz_pk = QuizQuestion.objects.filter(
+            pk=instance.question_id).values_list('quiz_id', flat=True).first()
+        invalidate_answer_key(quiz_pk)
+
+
+@receiver(post_save, sender=QuizStudentResponse)
+@receiver(post_delete, sender=QuizStudentResponse)
+def quiz_response_changed(sender, instance, **kwargs):
+    """
+    The cached item analysis of the quiz should not be used anymore.
+    Increased after the commit, so the selected answers are saved by then.
+    """
+    quiz_pk = instance.quiz_id
+    transaction.on_commit(lambda: bump_version('quiz-responses', quiz_pk))
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    """
+    Start time or duration may have been changed. Cached
+    countdown times of the quiz should not be used anymore.
+    """
+    invalidate_quiz_times(instance.pk)
+
+
+@receiver(post_save, sender=Classroom)
+@receiver(post_delete, sender=Classroom)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_save, sender=Meeting)
+@receiver(post_delete, sender=Meeting)
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def classroom_content_changed(sender, instance, **kwargs):
+    """
+    Cached copies of the object and the cached fragments of its
+    classroom page should not be used anymore. (see main/caching.py)
+    """
+    bump_object_version(instance)
+    classroom_pk = instance.pk if isinstance(instance, Classroom) else instance.classroom_id
+    bump_version('classroom-content', classroom_pk)
+
+
+@receiver(m2m_changed, sender=Classroom.lecturers.through)
+def classroom_lecturers_changed(sender, instance, action, pk_set=None, **kwargs):
+    if isinstance(instance, Classroom):
+        if action.startswith('post_'):
+            bump_version('classroom-content', instance.pk)
+        return
+
+    # Changed from the lecturer side. Classrooms are not known after clearing.
+    if action in ('post_add', 'post_remove'):
+        classroom_pks = pk_set
+    elif action == 'pre_clear':
+        classroom_pks = instance.classroom_set.values_list('pk', flat=True)
+    else:
+        return
+    for classroom_pk in classroom_pks:
+        bump_version('classroom-content', classroom_pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Assignment)
+@receiver(post_save, sender=Quiz)
+@receiver(post_save, sender=Meeting)
+def update_search_index(sender, instance, **kwargs):
+    index_object(instance, kwargs.get('update_fields'))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=Meeting)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_object(instance)
@@ -1,5 +1,41 @@
-from datetime import datetime
+import asyncio
+import csv
+import io
+import json
+import os
+import re
+import tracemalloc
+import zipfile
+from datetime import datetime, timedelta
+from importlib import import_module
+from unittest import mock
+from asgiref.sync import async_to_sync
 import pytz
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from main.models import Blob, Department
+from main.timezones import local_day_range, local_today
+from main.testing import ClassroomTestCase, TempDirsMixin, create_lecturer, create_student
+from classrooms.models import Classroom, Post, Assignment, Meeting, Submission, SubmissionFile, UploadSession, \
+    SearchDocument, Quiz, QuizQuestion, QuizQuestionAnswer, QuizStudentResponse, QuizStudentResponseQuestion, \
+    QuizStudentResponseQuestionAnswer
+from classrooms.downloads import get_submission_files, stream_submissions_zip
+from classrooms.feeds import ClassWorkFeed
+from classrooms.item_analysis import build_report, get_report
+from classrooms.pagination import KeysetPaginator
+from classrooms.scoring import AnswerKey, build_answer_key, get_answer_key, invalidate_answer_key
+from classrooms import events, uploads
+from classrooms.countdown import get_quiz_times
+from classrooms.uploads import append_chunk, complete_uploads, get_part_path, start_upload
+from classrooms.views import _save_quiz_response
 
 format = "%Y/%m/%d %H:%M:%S"
 dt_str = str(datetime.now().strftime(format))
@@ -80,3 +116,1085 @@ print('Datetime string in UTC Time zone: ', dt_utc_str)
 #
 # arr = [10, 100, 800, 1, 20, 40, 4, 5, 30, 40, 50]
 # print(bubble_sort(arr))
+
+
+class ClassWorkFeedTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        now = timezone.now()
+        for i in range(3):
+            Assignment.objects.create(classroom=cls.classroom, owner=cls.lecturer, title=f'Assignment {i}',
+                                      _date_due=now, content='content')
+            Meeting.objects.create(classroom=cls.classroom, owner=cls.lecturer, topic=f'Meeting {i}', _start=now)
+            Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title=f'Quiz {i}',
+                                _start=now, duration=60)
+
+        # Items created at the same time are ordered by type and pk
+        same_time = now - timedelta(hours=1)
+        Assignment.objects.filter(title__in=['Assignment 0', 'Assignment 1']).update(_date_created=same_time)
+        Quiz.objects.filter(title='Quiz 0').update(_date_created=same_time)
+        Meeting.objects.filter(topic='Meeting 0').update(_date_created=same_time)
+
+    def all_items(self):
+        works = [*Assignment.objects.all(), *Meeting.objects.all(), *Quiz.objects.all()]
+        return [(w.type, w.pk) for w in sorted(works, key=ClassWorkFeed.sort_key, reverse=True)]
+
+    def test_pages_follow_the_cursor(self):
+        feed = ClassWorkFeed(self.classroom, page_size=2)
+        items, cursor = feed.page()
+        pages = [items]
+        while cursor:
+            with self.assertNumQueries(3):     # One query per model
+                items, cursor = feed.page(cursor)
+            pages.append(items)
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 2, 1])
+        self.assertEqual([(w.type, w.pk) for page in pages for w in page], self.all_items())
+
+    def test_invalid_cursor_is_the_first_page(self):
+        feed = ClassWorkFeed(self.classroom, page_size=4)
+        first_page = [(w.type, w.pk) for w in feed.page()[0]]
+        for cursor in ('garbage', '1:quiz', 'x:quiz:1', '1:quiz:x'):
+            self.assertEqual([(w.type, w.pk) for w in feed.page(cursor)[0]], first_page)
+
+    def test_last_page_has_no_cursor(self):
+        items, cursor = ClassWorkFeed(self.classroom, page_size=9).page()
+        self.assertEqual(len(items), 9)
+        self.assertIsNone(cursor)
+
+
+class AnswerKeyTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.quiz = Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title='Quiz',
+                                       _start=timezone.now(), duration=60)
+        # Question 1: A is correct, question 2: A and B are correct
+        for number, correct in ((1, 'A'), (2, 'AB')):
+            question = QuizQuestion.objects.create(quiz=cls.quiz, number=number, question=f'Question {number}')
+            for letter in 'ABC':
+                QuizQuestionAnswer.objects.create(question=question, letter=letter, answer=letter,
+                                                  correct=letter in correct)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_score(self):
+        answer_key = build_answer_key(self.quiz)
+        self.assertEqual(answer_key.score({1: ['A'], 2: ['A', 'B']}), 100)
+        self.assertEqual(answer_key.score({1: ['A'], 2: ['A']}), 66.67)
+        # 0.1 off for each incorrect answer, never below 0
+        self.assertEqual(answer_key.score({1: ['A', 'B'], 2: ['A', 'B', 'C']}), 99.8)
+        self.assertEqual(answer_key.score({1: ['B'], 2: ['C']}), 0)
+        self.assertEqual(answer_key.score({}), 0)
+
+    def test_quiz_without_correct_answers(self):
+        answer_key = AnswerKey([(1, 'A', False), (1, 'B', False)])
+        self.assertEqual(answer_key.score({1: []}), 100)
+        self.assertEqual(answer_key.score({1: ['A']}), 0)
+
+    def test_cached_until_the_version_changes(self):
+        self.quiz.refresh_from_db(fields=['answer_key_version'])
+        with self.assertNumQueries(1):
+            get_answer_key(self.quiz)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_answer_key(self.quiz).score({1: ['A']}), 33.33)
+
+        version = self.quiz.answer_key_version
+        QuizQuestionAnswer.objects.filter(question__number=2).update(correct=False)
+        invalidate_answer_key(self.quiz.pk)
+        self.quiz.refresh_from_db(fields=['answer_key_version'])
+        self.assertEqual(self.quiz.answer_key_version, version + 1)
+        self.assertEqual(get_answer_key(self.quiz).score({1: ['A']}), 100)
+
+
+class QuizQuestionsSyncTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.quiz = Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title='Quiz',
+                                       _start=timezone.now(), duration=60)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='lecturer', password='pass')
+        self.url = reverse('quiz-questions', kwargs={'class_name': 'mechanics', 'quiz_pk': self.quiz.pk})
+
+    def post(self, questions):
+        """
+        :param questions: {number: (question, {letter: (answer, correct)})}
+        """
+        dom = [{
+            'question': {'question-id': str(number), 'text': text},
+            'answers': [{'letter': letter, 'text': answer, 'correct': 'true' if correct else 'false'}
+                        for letter, (answer, correct) in answers.items()],
+        } for number, (text, answers) in questions.items()]
+        return self.client.post(self.url, {'dom': json.dumps({'dom': dom})}).json()
+
+    def saved(self):
+        return {q.number: (q.question, {a.letter: (a.answer, a.correct) for a in q.quizquestionanswer_set.all()})
+                for q in self.quiz.quizquestion_set.prefetch_related('quizquestionanswer_set')}
+
+    def test_only_the_changes_are_saved(self):
+        questions = {
+            1: ('Question 1', {'A': ('1A', True), 'B': ('1B', False)}),
+            2: ('Question 2', {'A': ('2A', False), 'B': ('2B', True)}),
+            3: ('Question 3', {'A': ('3A', True)}),
+        }
+        self.assertEqual(self.post(questions), {'msg': 'saved', 'created': 8, 'updated': 0, 'deleted': 0})
+        self.assertEqual(self.saved(), questions)
+        kept = QuizQuestionAnswer.objects.get(question__number=1, letter='A').pk
+
+        # Question 1 edited, question 2 deleted, question 4 added in a single save
+        questions = {
+            1: ('Question 1 edited', {'A': ('1A', True), 'B': ('1B', True), 'C': ('1C', False)}),
+            3: ('Question 3', {'A': ('3A', True)}),
+            4: ('Question 4', {'A': ('4A', True)}),
+        }
+        self.assertEqual(self.post(questions), {'msg': 'saved', 'created': 3, 'updated': 2, 'deleted': 1})
+        self.assertEqual(self.saved(), questions)
+        self.assertTrue(QuizQuestionAnswer.objects.filter(pk=kept).exists())
+        self.assertFalse(QuizQuestionAnswer.objects.filter(question__number=2).exists())
+
+        # Answer deleted from a question
+        questions[1] = ('Question 1 edited', {'A': ('1A', True)})
+        self.assertEqual(self.post(questions), {'msg': 'saved', 'created': 0, 'updated': 0, 'deleted': 2})
+        self.assertEqual(self.saved(), questions)
+
+    def test_answer_key_follows_the_changes(self):
+        self.post({1: ('Question 1', {'A': ('1A', True), 'B': ('1B', False)})})
+        self.quiz.refresh_from_db()
+        self.assertEqual(get_answer_key(self.quiz).score({1: ['A']}), 100)
+
+        self.post({1: ('Question 1', {'A': ('1A', False), 'B': ('1B', True)})})
+        self.quiz.refresh_from_db()
+        self.assertEqual(get_answer_key(self.quiz).score({1: ['A']}), 0)
+
+        # Nothing changed: the answer key is kept
+        version = self.quiz.answer_key_version
+        self.assertEqual(self.post({1: ('Question 1', {'A': ('1A', False), 'B': ('1B', True)})}),
+                         {'msg': 'saved', 'created': 0, 'updated': 0, 'deleted': 0})
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.answer_key_version, version)
+
+    def test_no_edits_after_responses(self):
+        self.post({1: ('Question 1', {'A': ('1A', True)})})
+        QuizStudentResponse.objects.create(quiz=self.quiz, owner=create_student('student', self.department), score=0)
+        self.assertEqual(self.post({}), {'msg': 'responses-available'})
+        self.assertEqual(len(self.saved()), 1)
+
+
+class QuizLiveViewTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student = create_student('student', cls.department)
+        cls.quiz = Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title='Quiz',
+                                       _start=timezone.now(), duration=60)
+        for number, correct in [(1, 'A'), (2, 'B')]:
+            question = QuizQuestion.objects.create(quiz=cls.quiz, number=number, question=f'Question {number}')
+            for letter in 'AB':
+                QuizQuestionAnswer.objects.create(question=question, letter=letter, correct=letter == correct)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='student', password='pass')
+        self.url = reverse('quiz-live', kwargs={'class_name': 'mechanics', 'quiz_pk': self.quiz.pk})
+
+    def post(self, submitted):
+        """
+        :param submitted: {number: [selected letters]}
+        """
+        dom = [{
+            'question': {'question-id': str(number), 'text': ''},
+            'answers': [{'letter': letter, 'text': '', 'correct': 'true' if letter in letters else 'false'}
+                        for letter in 'ABZ'],
+        } for number, letters in submitted.items()]
+        return self.client.post(self.url, {'dom': json.dumps({'dom': dom})})
+
+    def saved(self):
+        return {q.question.number: sorted(a.answer.letter for a in q.quizstudentresponsequestionanswer_set.all())
+                for q in QuizStudentResponseQuestion.objects.filter(response__quiz=self.quiz)}
+
+    def test_single_submission(self):
+        self.assertEqual(self.post({1: ['A'], 2: ['A', 'B']}).status_code, 200)
+        response = QuizStudentResponse.objects.get(quiz=self.quiz, owner=self.student)
+        self.assertEqual(self.saved(), {1: ['A'], 2: ['A', 'B']})
+        self.assertEqual(response.score, get_answer_key(self.quiz).score({1: ['A'], 2: ['A', 'B']}))
+
+    def test_double_submission_keeps_the_first_response(self):
+        self.post({1: ['A'], 2: ['B']})
+        response = self.post({1: ['B'], 2: ['A']})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'msg': 'already-responded'})
+        self.assertEqual(QuizStudentResponse.objects.filter(quiz=self.quiz).count(), 1)
+        self.assertEqual(self.saved(), {1: ['A'], 2: ['B']})
+
+    def test_unknown_questions_and_letters_are_ignored(self):
+        self.assertEqual(self.post({1: ['A', 'Z'], 2: ['Z'], 9: ['A']}).status_code, 200)
+        self.assertEqual(self.saved(), {1: ['A'], 2: []})
+
+    def test_response_is_saved_in_one_transaction(self):
+        with mock.patch.object(QuizStudentResponseQuestionAnswer.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.post({1: ['A'], 2: ['B']})
+        self.assertFalse(QuizStudentResponse.objects.filter(quiz=self.quiz).exists())
+        self.assertFalse(QuizStudentResponseQuestion.objects.exists())
+
+        # Student can still respond after the failure
+        self.assertEqual(self.post({1: ['A'], 2: ['B']}).status_code, 200)
+        self.assertEqual(self.saved(), {1: ['A'], 2: ['B']})
+
+    def test_queries_do_not_grow_with_questions(self):
+        with CaptureQueriesContext(connection) as two_questions:
+            _save_quiz_response(self.quiz, self.student, {1: ['A'], 2: ['B']}, 100)
+        QuizStudentResponse.objects.all().delete()
+        for number in range(3, 10):
+            question = QuizQuestion.objects.create(quiz=self.quiz, number=number)
+            QuizQuestionAnswer.objects.create(question=question, letter='A', correct=True)
+        with self.assertNumQueries(len(two_questions)):
+            _save_quiz_response(self.quiz, self.student, {number: ['A'] for number in range(1, 10)}, 100)
+
+
+class QuizCountdownTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.quiz = Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title='Quiz',
+                                       _start=timezone.now() + timedelta(hours=1), duration=60)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='lecturer', password='pass')
+        self.url = reverse('quiz-countdown', kwargs={'class_name': 'mechanics', 'quiz_pk': self.quiz.pk})
+
+    def test_times_are_cached(self):
+        with self.assertNumQueries(1):
+            times = get_quiz_times(self.quiz.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_quiz_times(self.quiz.pk), times)
+        self.assertEqual((times['start'], times['end']), (self.quiz._start, self.quiz._end))
+
+    def test_not_modified_while_times_do_not_change(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['start'], self.quiz._start.isoformat())
+        self.assertIn('max-age=30', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_quiz_save_invalidates_the_times(self):
+        etag = self.client.get(self.url)['ETag']
+        self.quiz._start += timedelta(minutes=30)
+        self.quiz.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['start'], self.quiz._start.isoformat())
+        self.assertEqual(response.json()['end'], self.quiz._end.isoformat())
+
+    def test_unknown_quiz(self):
+        url = reverse('quiz-countdown', kwargs={'class_name': 'mechanics', 'quiz_pk': self.quiz.pk + 1})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+class QuizEventsTest(ClassroomTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='lecturer', password='pass')
+
+    def stream(self, quiz_pk, logged_in=True):
+        """
+        Run the SSE app until the stream ends. The client disconnects after
+        the 'quiz-started' event.
+        :return: ASGI messages sent by the app
+        """
+        messages = []
+        headers = []
+        if logged_in:
+            session = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+            headers.append((b'cookie', f'{settings.SESSION_COOKIE_NAME}={session}'.encode()))
+
+        async def run():
+            started = asyncio.Event()
+
+            async def receive():
+                await started.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                if b'event: quiz-started' in message.get('body', b''):
+                    started.set()
+
+            scope = {'type': 'http', 'path': f'/quiz-events/{quiz_pk}/', 'headers': headers}
+            await asyncio.wait_for(events.quiz_events_app(scope, receive, send), timeout=5)
+
+        async_to_sync(run)()
+        return messages
+
+    def quiz(self, start):
+        return Quiz.objects.create(classroom=self.classroom, owner=self.lecturer, title='Quiz',
+                                   _start=start, duration=60)
+
+    def test_anonymous_users_are_rejected(self):
+        quiz = self.quiz(timezone.now())
+        messages = self.stream(quiz.pk, logged_in=False)
+        self.assertEqual(messages[0]['status'], 403)
+        self.assertFalse(messages[-1]['more_body'])
+
+    def test_unknown_quiz(self):
+        messages = self.stream(12345)
+        self.assertEqual(messages[0]['status'], 404)
+        self.assertEqual(messages[1]['body'], b'Quiz not found')
+
+    def test_live_quiz_sends_quiz_started(self):
+        quiz = self.quiz(timezone.now() - timedelta(minutes=1))
+        messages = self.stream(quiz.pk)
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), messages[0]['headers'])
+
+        event, data = messages[1]['body'].decode().strip().split('\n')
+        self.assertEqual(event, 'event: quiz-started')
+        self.assertEqual(json.loads(data[len('data: '):]),
+                         {'start': quiz._start.isoformat(), 'end': quiz._end.isoformat()})
+        self.assertNotIn(b'quiz-ended', b''.join(m.get('body', b'') for m in messages))
+
+    def test_expired_quiz_sends_both_events_and_ends(self):
+        quiz = self.quiz(timezone.now() - timedelta(hours=2))
+        bodies = [m['body'] for m in self.stream(quiz.pk)[1:]]
+        self.assertTrue(bodies[0].startswith(b'event: quiz-started'))
+        self.assertTrue(bodies[1].startswith(b'event: quiz-ended'))
+
+
+class QuizEndTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.start = timezone.now().replace(microsecond=0) - timedelta(minutes=45)
+        cls.quiz = Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title='Quiz',
+                                       _start=cls.start, duration=60)
+
+    def stored_end(self):
+        return Quiz.objects.values_list('_end', flat=True).get(pk=self.quiz.pk)
+
+    def test_end_is_set_on_create(self):
+        self.assertEqual(self.stored_end(), self.start + timedelta(minutes=60))
+
+    def test_update_fields_include_the_end(self):
+        self.quiz.duration = 90
+        self.quiz.save(update_fields=['duration'])
+        self.assertEqual(self.stored_end(), self.start + timedelta(minutes=90))
+
+        self.quiz._start += timedelta(minutes=10)
+        self.quiz.save(update_fields=['_start'])
+        self.assertEqual(self.stored_end(), self.start + timedelta(minutes=100))
+
+        # Other fields only: the stored end is not touched
+        self.quiz.duration = 5
+        self.quiz.save(update_fields=['title'])
+        self.assertEqual(self.stored_end(), self.start + timedelta(minutes=100))
+
+    def test_live_and_expired_follow_the_duration(self):
+        self.assertIn(self.quiz, Quiz.objects.live())
+        self.assertNotIn(self.quiz, Quiz.objects.expired())
+        self.assertTrue(self.quiz.live)
+
+        self.quiz.duration = 30
+        self.quiz.save(update_fields=['duration'])
+        self.assertNotIn(self.quiz, Quiz.objects.live())
+        self.assertIn(self.quiz, Quiz.objects.expired())
+        self.assertTrue(self.quiz.expired)
+
+    def test_migration_fills_the_end(self):
+        migration = import_module('classrooms.migrations.0006_quiz_end_and_time_indexes')
+        Quiz.objects.update(_end=self.start)
+        migration.fill_quiz_end(apps, None)
+        self.assertEqual(self.stored_end(), self.start + timedelta(minutes=60))
+
+
+class ClassWorkQuerySetTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.now = timezone.now()
+        cls.today_start, cls.today_end = local_day_range()
+        cls.student = create_student('student', cls.department)
+
+        def assignment(title, due, **fields):
+            return Assignment.objects.create(classroom=cls.classroom, owner=cls.lecturer, title=title,
+                                             _date_due=due, content='content', **fields)
+
+        def quiz(title, start, duration=60):
+            return Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title=title,
+                                       _start=start, duration=duration)
+
+        def meeting(topic, start):
+            return Meeting.objects.create(classroom=cls.classroom, owner=cls.lecturer, topic=topic, _start=start)
+
+        assignment('Expired', cls.now - timedelta(hours=1))
+        assignment('Reviewed', cls.now - timedelta(hours=1), review_complete=True)
+        ongoing = assignment('Ongoing', cls.now + timedelta(hours=1))
+        Submission.objects.create(assignment=ongoing, owner=cls.student)
+
+        live = quiz('Live', cls.now - timedelta(minutes=10))
+        quiz('Expired', cls.now - timedelta(hours=2), duration=30)
+        quiz('Tomorrow', cls.today_end)
+        quiz('Start of today', cls.today_start)
+        QuizStudentResponse.objects.create(quiz=live, owner=cls.student, score=50)
+
+        meeting('Previous', cls.today_start - timedelta(microseconds=1))
+        meeting('Today', cls.today_start)
+        meeting('Upcoming', cls.today_end)
+
+    @staticmethod
+    def titles(queryset, field='title'):
+        return sorted(queryset.values_list(field, flat=True))
+
+    def test_assignments(self):
+        self.assertEqual(self.titles(Assignment.objects.expired()), ['Expired', 'Reviewed'])
+        self.assertEqual(self.titles(Assignment.objects.ongoing()), ['Ongoing'])
+        self.assertEqual(self.titles(Assignment.objects.pending_review()), ['Expired'])
+        self.assertEqual(self.titles(Assignment.objects.reviewed()), ['Reviewed'])
+        self.assertEqual(self.titles(Assignment.objects.submitted_by(self.student)), ['Ongoing'])
+        self.assertEqual(self.titles(Assignment.objects.not_submitted_by(self.student)), ['Expired', 'Reviewed'])
+
+    def test_quizzes(self):
+        self.assertIn('Live', self.titles(Quiz.objects.live()))
+        self.assertNotIn('Expired', self.titles(Quiz.objects.live()))
+        expired = self.titles(Quiz.objects.expired())
+        self.assertIn('Expired', expired)
+        self.assertFalse({'Live', 'Tomorrow'} & set(expired))
+        self.assertEqual(self.titles(Quiz.objects.upcoming()), ['Tomorrow'])
+        self.assertEqual(self.titles(Quiz.objects.responded_by(self.student)), ['Live'])
+        self.assertNotIn('Live', self.titles(Quiz.objects.not_responded_by(self.student)))
+
+    def test_local_days(self):
+        # Day boundaries are the local midnights, [start, end)
+        self.assertIn('Start of today', self.titles(Quiz.objects.today()))
+        self.assertNotIn('Tomorrow', self.titles(Quiz.objects.today()))
+        self.assertEqual(self.titles(Meeting.objects.today(), 'topic'), ['Today'])
+        self.assertEqual(self.titles(Meeting.objects.upcoming(), 'topic'), ['Upcoming'])
+        self.assertEqual(self.titles(Meeting.objects.previous(), 'topic'), ['Previous'])
+
+        tomorrow = local_today() + timedelta(days=1)
+        self.assertEqual(self.titles(Quiz.objects.on_day(tomorrow)), ['Tomorrow'])
+        self.assertEqual(self.titles(Meeting.objects.after_day(tomorrow), 'topic'), [])
+        self.assertIn('Today', self.titles(Meeting.objects.in_month(), 'topic'))
+
+    def test_for_department(self):
+        other = Department.objects.create(batch=self.department.batch, name='Chemistry')
+        self.assertEqual(Assignment.objects.for_department(self.department.pk).count(), 3)
+        self.assertFalse(Assignment.objects.for_department(other.pk).exists())
+
+
+class KeysetPaginatorTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Three assignments share each due date
+        now = timezone.now()
+        for i in range(7):
+            Assignment.objects.create(classroom=cls.classroom, owner=cls.lecturer, title=f'Assignment {i}',
+                                      _date_due=now - timedelta(days=i // 3), content='content')
+
+    def all_pages(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        items, cursor = paginator.page()
+        pages = [items]
+        while cursor:
+            items, cursor = paginator.page(cursor)
+            pages.append(items)
+        return [[item.pk for item in page] for page in pages]
+
+    def test_ties_are_ordered_by_pk(self):
+        queryset = Assignment.objects.order_by('-_date_due')
+        pages = self.all_pages(queryset, 2)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual(sum(pages, []), list(queryset.order_by('-_date_due', '-pk').values_list('pk', flat=True)))
+
+        queryset = Assignment.objects.order_by('_date_due')
+        self.assertEqual(sum(self.all_pages(queryset, 3), []),
+                         list(queryset.order_by('_date_due', 'pk').values_list('pk', flat=True)))
+
+    def test_unordered_queryset_is_ordered_by_pk(self):
+        pages = self.all_pages(Assignment.objects.all(), 4)
+        self.assertEqual(sum(pages, []), sorted(Assignment.objects.values_list('pk', flat=True), reverse=True))
+
+    def test_float_values(self):
+        quiz = Quiz.objects.create(classroom=self.classroom, owner=self.lecturer, title='Quiz',
+                                   _start=timezone.now(), duration=60)
+        for i, score in enumerate([50.5, 50.5, 75.25, 10]):
+            QuizStudentResponse.objects.create(quiz=quiz, owner=create_student(f'student{i}', self.department),
+                                               score=score)
+        queryset = QuizStudentResponse.objects.order_by('-score')
+        self.assertEqual(sum(self.all_pages(queryset, 1), []),
+                         list(queryset.order_by('-score', '-pk').values_list('pk', flat=True)))
+
+    def test_invalid_cursor_is_the_first_page(self):
+        paginator = KeysetPaginator(Assignment.objects.order_by('-_date_due'), 2)
+        first_page = paginator.page()[0]
+        for cursor in ('garbage', '1:x', 'x:1', '1:2:3', ':'):
+            self.assertIsNone(paginator.parse_cursor(cursor))
+            self.assertEqual(paginator.page(cursor)[0], first_page)
+
+    def test_list_view(self):
+        self.client.login(username='lecturer', password='pass')
+        url = reverse('assignments-list', kwargs={'type': 'all'})
+        response = self.client.get(url, {'page_size': 3})
+        titles = [a.title for a in response.context['assignments']]
+        cursor = response.context['next_cursor']
+        while cursor:
+            data = self.client.get(url, {'page_size': 3, 'cursor': cursor, 'format': 'json'}).json()
+            titles.extend(re.findall(r'card-title text-muted mb-0">(.*?)</h5>', data['html']))
+            cursor = data['cursor']
+        self.assertEqual(sorted(titles), [f'Assignment {i}' for i in range(7)])
+
+
+class AssignmentSubmissionsViewTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.assignment = Assignment.objects.create(
+            classroom=cls.classroom, owner=cls.lecturer, title='Assignment 1',
+            _date_due=timezone.now(), content='content')
+
+        for i in range(6):
+            student = create_student(f'student{i}', cls.department)
+            if i % 2 == 0:
+                submission = Submission.objects.create(assignment=cls.assignment, owner=student)
+                SubmissionFile.objects.create(submission=submission, file=f'submission-files/{i}.pdf')
+
+    def get_page(self):
+        return self.client.get(reverse('submit-details', kwargs={
+            'class_name': 'mechanics', 'assignment_pk': self.assignment.pk}))
+
+    def test_non_submitted_students(self):
+        self.client.login(username='lecturer', password='pass')
+        response = self.get_page()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['submissions']), 3)
+        self.assertEqual(sorted(s.user.username for s in response.context['non_submitted']),
+                         ['student1', 'student3', 'student5'])
+
+    def test_query_count_does_not_grow_with_students(self):
+        self.client.login(username='lecturer', password='pass')
+        self.get_page()     # Warm up the session and the user
+
+        with self.assertNumQueries(6):
+            self.get_page()
+
+        # More students and submissions must not add queries
+        for i in range(6, 12):
+            student = create_student(f'student{i}', self.department)
+            Submission.objects.create(assignment=self.assignment, owner=student)
+
+        with self.assertNumQueries(6):
+            self.get_page()
+
+
+class BulkGradeViewTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.assignment = Assignment.objects.create(
+            classroom=cls.classroom, owner=cls.lecturer, title='Assignment 1',
+            _date_due=timezone.now(), content='content')
+        cls.students = [create_student(f'student{i}', cls.department) for i in range(3)]
+        for student in cls.students[:2]:
+            Submission.objects.create(assignment=cls.assignment, owner=student, lec_comment='Draft')
+
+    def setUp(self):
+        self.client.login(username='lecturer', password='pass')
+        self.url = reverse('bulk-grade', kwargs={'class_name': 'mechanics', 'assignment_pk': self.assignment.pk})
+
+    def grades(self):
+        return dict(Submission.objects.filter(assignment=self.assignment).values_list('owner_id', 'grade'))
+
+    def test_json(self):
+        first, second = self.students[:2]
+        response = self.client.post(self.url, {'grades': [
+            {'student_id': first.pk, 'grade': 'A', 'comment': 'Good'},
+            {'student_id': second.pk, 'grade': 'B'},
+        ]}, content_type='application/json')
+        self.assertEqual(response.json(), {'updated': 2, 'errors': []})
+        self.assertEqual(self.grades(), {first.pk: 'A', second.pk: 'B'})
+        # A missing comment keeps the current comment
+        self.assertEqual(Submission.objects.get(owner=first).lec_comment, 'Good')
+        self.assertEqual(Submission.objects.get(owner=second).lec_comment, 'Draft')
+
+    def test_csv(self):
+        first, second = self.students[:2]
+        body = f"student_id,grade,comment\n{first.pk},A,Good\n\n{second.pk},C,\n"
+        response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(self.grades(), {first.pk: 'A', second.pk: 'C'})
+
+        # Uploaded file without a header row
+        upload = SimpleUploadedFile('grades.csv', f"{first.pk},B\n".encode('utf-8-sig'))
+        self.assertEqual(self.client.post(self.url, {'file': upload}).json()['updated'], 1)
+        self.assertEqual(self.grades()[first.pk], 'B')
+
+    def test_nothing_is_saved_if_a_row_is_invalid(self):
+        first, second, not_submitted = self.students
+        response = self.client.post(self.url, [
+            {'student_id': first.pk, 'grade': 'A'},
+            {'student_id': 'x', 'grade': 'A'},
+            {'student_id': not_submitted.pk, 'grade': 'A'},
+            {'student_id': first.pk, 'grade': 'B'},
+            {'student_id': second.pk, 'grade': 'A' * 21},
+        ], content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertEqual(data['updated'], 0)
+        self.assertEqual([(e['row'], e['errors'][0]) for e in data['errors'][:3]], [
+            (2, "Invalid student id"), (3, "No submission for this student"), (4, "Student is graded twice")])
+        self.assertEqual((data['errors'][3]['row'], data['errors'][3]['errors'][0][:6]), (5, 'grade:'))
+        self.assertEqual(self.grades(), {first.pk: None, second.pk: None})
+
+    def test_invalid_requests(self):
+        response = self.client.post(self.url, '{"grades": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['errors'], ["Invalid JSON"])
+        response = self.client.post(self.url, {'grades': 'A'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post(self.url, b'\xff', content_type='text/csv').status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_only_for_the_lecturers_of_the_classroom(self):
+        create_lecturer('other')
+        self.client.login(username='other', password='pass')
+        response = self.client.post(self.url, [{'student_id': self.students[0].pk, 'grade': 'A'}],
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.grades()[self.students[0].pk], None)
+
+
+class SubmissionsZipTest(TempDirsMixin, ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.assignment = Assignment.objects.create(
+            classroom=cls.classroom, owner=cls.lecturer, title='Assignment 1',
+            _date_due=timezone.now() - timedelta(days=1), content='content')
+
+        # REG0 submitted on time with two files of the same name, the student without reg_no is late
+        on_time = create_student('student0', cls.department, reg_no='REG0')
+        late = create_student('student1', cls.department)
+        cls.on_time = Submission.objects.create(assignment=cls.assignment, owner=on_time)
+        cls.late = Submission.objects.create(assignment=cls.assignment, owner=late)
+        Submission.objects.filter(pk=cls.on_time.pk).update(_date_created=timezone.now() - timedelta(days=2))
+
+        for submission, name, content in ((cls.on_time, 'report.pdf', b'first'),
+                                          (cls.on_time, 'report.pdf', b'second'),
+                                          (cls.late, 'late.pdf', b'late')):
+            SubmissionFile.objects.create(submission=submission, file=SimpleUploadedFile(name, content))
+
+    def setUp(self):
+        self.client.login(username='lecturer', password='pass')
+        self.url = reverse('submissions-download',
+                           kwargs={'class_name': 'mechanics', 'assignment_pk': self.assignment.pk})
+
+    def download(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        return {name: archive.read(name) for name in archive.namelist()}
+
+    def test_archive(self):
+        self.assertEqual(self.download(), {
+            'reg0/report.pdf': b'first',
+            'reg0/report (2).pdf': b'second',
+            'student1/late.pdf': b'late',
+        })
+
+    def test_filters(self):
+        self.assertEqual(list(self.assignment.submission_set.late()), [self.late])
+        self.assertEqual(list(self.assignment.submission_set.on_time()), [self.on_time])
+        self.assertEqual(list(self.download(filter='late')), ['student1/late.pdf'])
+        self.assertEqual(sorted(self.download(filter='on-time')), ['reg0/report (2).pdf', 'reg0/report.pdf'])
+        self.assertEqual(self.client.get(self.url, {'filter': 'missing'}).status_code, 400)
+
+    def test_stream_is_chunked(self):
+        chunks = list(stream_submissions_zip(get_submission_files(self.assignment), chunk_size=2))
+        self.assertGreater(len(chunks), 3)
+        self.assertTrue(all(chunks))
+        self.assertEqual(len(zipfile.ZipFile(io.BytesIO(b''.join(chunks))).namelist()), 3)
+
+    def test_only_for_the_lecturers_of_the_classroom(self):
+        create_lecturer('other')
+        self.client.login(username='other', password='pass')
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class _ZeroStream:
+    """ Request-like stream of zero bytes, without keeping them in memory """
+
+    def read(self, size):
+        return bytes(size)
+
+
+@override_settings(SUBMISSION_UPLOAD_CHUNK_SIZE=1024)
+class ChunkedUploadTest(TempDirsMixin, ClassroomTestCase):
+    temp_dir_settings = ('MEDIA_ROOT', 'SUBMISSION_UPLOAD_DIR')
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.assignment = Assignment.objects.create(
+            classroom=cls.classroom, owner=cls.lecturer, title='Assignment 1',
+            _date_due=timezone.now(), content='content')
+        cls.student = create_student('student', cls.department)
+
+    def setUp(self):
+        self.client.login(username='student', password='pass')
+        self.url_kwargs = {'class_name': 'mechanics', 'pk': self.assignment.pk}
+
+    def start(self, file_name, size):
+        return self.client.post(reverse('upload-start', kwargs=self.url_kwargs),
+                                {'file_name': file_name, 'size': size}, content_type='application/json')
+
+    def put_chunk(self, session, offset, data):
+        return self.client.put(f"{session['url']}?offset={offset}", data,
+                               content_type='application/octet-stream')
+
+    def test_resumable_upload(self):
+        content = os.urandom(2500)
+        response = self.start('report.pdf', len(content))
+        self.assertEqual(response.status_code, 201)
+        session = response.json()
+
+        self.assertEqual(self.put_chunk(session, 0, content[:1024]).json()['offset'], 1024)
+        # Interrupted upload: the client resumes from the offset of the server
+        self.assertEqual(self.put_chunk(session, 0, content[:1024]).status_code, 409)
+        offset = self.client.get(session['url']).json()['offset']
+        self.assertEqual(offset, 1024)
+        self.put_chunk(session, 1024, content[1024:2048])
+
+        # Not complete yet
+        response = self.client.post(reverse('upload-complete', kwargs=self.url_kwargs),
+                                    {'sessions': [session['id']]}, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+
+        self.assertTrue(self.put_chunk(session, 2048, content[2048:]).json()['complete'])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('upload-complete', kwargs=self.url_kwargs),
+                                        {'sessions': [session['id']]}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+        submission_file = SubmissionFile.objects.get(submission__owner=self.student)
+        with submission_file.file.open('rb') as f:
+            self.assertEqual(f.read(), content)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.path.exists(get_part_path(session['id'])))
+
+    def upload(self, file_name, content):
+        session = start_upload(self.assignment, self.student, file_name, len(content))
+        append_chunk(session.pk, self.student, 0, io.BytesIO(content), len(content))
+        return session
+
+    def test_failed_completion_keeps_part_files(self):
+        first, second = self.upload('a.pdf', b'first file'), self.upload('b.pdf', b'second file')
+        save_part = uploads._save_part
+
+        def fail_second(submission_file, session):
+            if session.pk == second.pk:
+                raise OSError("Disk full")
+            save_part(submission_file, session)
+
+        with mock.patch('classrooms.uploads._save_part', side_effect=fail_second), \
+                self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(OSError):
+                complete_uploads(self.assignment, self.student, [first.pk, second.pk])
+
+        # Nothing is saved, the blob of the first file is removed and the upload can be completed again
+        self.assertFalse(Submission.objects.exists())
+        self.assertFalse(Blob.objects.exists())
+        blob_files = [f for _, _, files in os.walk(os.path.join(settings.MEDIA_ROOT, 'blobs')) for f in files]
+        self.assertEqual(blob_files, [])
+        self.assertTrue(os.path.exists(get_part_path(first.pk)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            complete_uploads(self.assignment, self.student, [first.pk, second.pk])
+        self.assertEqual(SubmissionFile.objects.filter(submission__owner=self.student).count(), 2)
+        self.assertFalse(os.path.exists(get_part_path(first.pk)))
+        self.assertFalse(os.path.exists(get_part_path(second.pk)))
+
+    def test_invalid_uploads(self):
+        self.assertEqual(self.start('script.exe', 100).status_code, 400)
+        self.assertEqual(self.start('report.pdf', 0).status_code, 400)
+
+        session = self.start('report.pdf', 100).json()
+        self.assertEqual(self.put_chunk(session, 0, b'x' * 2048).status_code, 400)   # Chunk too large
+        self.assertEqual(self.put_chunk(session, 0, b'x' * 101).status_code, 400)    # Exceeds the file
+
+    def test_memory_does_not_grow_with_file_size(self):
+        # Set LMS_LARGE_UPLOAD_TEST=1 to upload a 1GB file
+        size = 1024 ** 3 if os.getenv('LMS_LARGE_UPLOAD_TEST') else 32 * 1024 ** 2
+        chunk_size = 8 * 1024 ** 2
+
+        with self.settings(SUBMISSION_UPLOAD_CHUNK_SIZE=chunk_size):
+            session = start_upload(self.assignment, self.student, 'large.zip', size)
+            tracemalloc.start()
+            for offset in range(0, size, chunk_size):
+                append_chunk(session.pk, self.student, offset, _ZeroStream(), min(chunk_size, size - offset))
+            complete_uploads(self.assignment, self.student, [session.pk])
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        self.assertLess(peak, 2 * 1024 ** 2)
+        self.assertEqual(SubmissionFile.objects.get(submission__owner=self.student).file.size, size)
+
+
+class DeduplicatingStorageTest(TempDirsMixin, ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        assignment = Assignment.objects.create(
+            classroom=cls.classroom, owner=cls.lecturer, title='Assignment 1',
+            _date_due=timezone.now(), content='content')
+
+        cls.submissions = []
+        for i in range(2):
+            student = create_student(f'student{i}', cls.department)
+            cls.submissions.append(Submission.objects.create(assignment=assignment, owner=student))
+
+    def test_same_content_is_stored_once(self):
+        first = SubmissionFile.objects.create(
+            submission=self.submissions[0], file=SimpleUploadedFile('report.pdf', b'same content'))
+        second = SubmissionFile.objects.create(
+            submission=self.submissions[1], file=SimpleUploadedFile('my report.pdf', b'same content'))
+
+        self.assertEqual(first.get_file_name(), 'report.pdf')
+        self.assertEqual(second.get_file_name(), 'my_report.pdf')
+        self.assertEqual(first.file.path, second.file.path)
+        blob = Blob.objects.get()
+        self.assertEqual((blob.ref_count, blob.size), (2, len(b'same content')))
+
+        # The blob is removed with the last reference
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submissions[0].delete()
+        self.assertTrue(os.path.exists(second.file.path))
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(first.file.path))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_legacy_files(self):
+        path = os.path.join(settings.MEDIA_ROOT, 'submission-files', 'old.pdf')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'old content')
+        legacy = SubmissionFile.objects.create(submission=self.submissions[0], file='submission-files/old.pdf')
+        self.assertEqual(legacy.file.path, path)
+
+        call_command('storage_report', '--convert', stdout=io.StringIO())
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.get_file_name(), 'old.pdf')
+        self.assertFalse(os.path.exists(path))
+        with legacy.file.open('rb') as f:
+            self.assertEqual(f.read(), b'old content')
+
+
+class ClassroomPageCacheTest(ClassroomTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='lecturer', password='pass')
+
+    def get_page(self):
+        return self.client.get(reverse('class-details', kwargs={'pk': self.classroom.pk}))
+
+    def test_fragments_are_cached_until_content_changes(self):
+        with CaptureQueriesContext(connection) as first:
+            self.get_page()
+        with CaptureQueriesContext(connection) as second:
+            self.get_page()
+        self.assertLess(len(second), len(first))
+
+        Assignment.objects.create(classroom=self.classroom, owner=self.lecturer, title='New Assignment',
+                                  _date_due=timezone.now(), content='content')
+        self.assertContains(self.get_page(), 'New Assignment')
+
+        self.lecturer.user.first_name = 'Renamed'
+        self.lecturer.user.save()
+        self.assertIn('Renamed', self.get_page().context['people_html'])
+        self.assertIn('By: Renamed', self.get_page().context['class_work_html'])
+
+        self.classroom.name = 'Dynamics'
+        self.classroom.save()
+        self.assertContains(self.get_page(), 'Dynamics')
+
+
+class SearchTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.physics = cls.classroom
+        chemistry = Department.objects.create(batch=cls.department.batch, name='Chemistry')
+        cls.chemistry = Classroom.objects.create(owner=cls.lecturer, department=chemistry, name='Organic')
+        create_student('student', cls.department)
+
+        Post.objects.create(classroom=cls.physics, owner=cls.lecturer, title='Week 1',
+                            content='<p>Read about <b>entropy</b></p><p>before the lab</p>')
+        Assignment.objects.create(classroom=cls.physics, owner=cls.lecturer, title='Entropy problems',
+                                  _date_due=timezone.now(), content='<p>Questions</p>')
+        Assignment.objects.create(classroom=cls.chemistry, owner=cls.lecturer, title='Entropy of reactions',
+                                  _date_due=timezone.now(), content='content')
+
+    def search(self, query):
+        self.client.login(username='student', password='pass')
+        return self.client.get(reverse('search'), {'q': query, 'format': 'json'}).json()['results']
+
+    def test_ranked_and_scoped_to_visible_classrooms(self):
+        results = self.search('entrop')
+        # Title matches first, other classrooms are not visible
+        self.assertEqual([r['title'] for r in results], ['Entropy problems', 'Week 1'])
+        self.assertEqual(results[1]['snippet'], 'Read about entropy before the lab')
+
+    def test_index_follows_changes(self):
+        post = Post.objects.get(title='Week 1')
+        post.content = 'Nothing to read'
+        post.save()
+        self.assertEqual([r['title'] for r in self.search('entropy')], ['Entropy problems'])
+
+        Assignment.objects.filter(title='Entropy problems').first().delete()
+        self.assertEqual(self.search('entropy'), [])
+        self.assertEqual(self.search('"unbalanced'), [])
+
+    def test_rebuild(self):
+        SearchDocument.objects.all().delete()
+        call_command('rebuild_search_index', '--batch-size', '2', stdout=io.StringIO())
+        self.assertEqual(SearchDocument.objects.count(), 3)
+        self.assertEqual(len(self.search('entropy')), 2)
+
+
+class ItemAnalysisTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.quiz = Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title='Quiz',
+                                       _start=timezone.now(), duration=60)
+
+        # Answer 'A' of question 1 and 'B' of question 2 are correct
+        cls.answers = {}
+        for number, correct in ((1, 'A'), (2, 'B')):
+            question = QuizQuestion.objects.create(quiz=cls.quiz, number=number, question=f'Question {number}')
+            for letter in 'AB':
+                cls.answers[(number, letter)] = QuizQuestionAnswer.objects.create(
+                    question=question, letter=letter, answer=letter, correct=letter == correct)
+
+        # Question 1 is answered correctly by the best students, question 2 by the worst
+        cls.students = [create_student(f'student{i}', cls.department) for i in range(5)]
+        for student, (score, letters) in zip(cls.students, [(100, 'AA'), (50, 'AA'), (50, 'BB'), (0, 'BB')]):
+            cls.respond(student, score, letters)
+
+    @classmethod
+    def respond(cls, student, score, letters):
+        response = QuizStudentResponse.objects.create(quiz=cls.quiz, owner=student, score=score)
+        for number, letter in enumerate(letters, start=1):
+            answer = cls.answers[(number, letter)]
+            res_question = QuizStudentResponseQuestion.objects.create(response=response, question=answer.question)
+            QuizStudentResponseQuestionAnswer.objects.create(response_question=res_question, answer=answer)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_report(self):
+        report = build_report(self.quiz)
+        self.assertEqual(report['responses'], 4)
+        first, second = report['questions']
+
+        self.assertEqual((first['difficulty'], second['difficulty']), (0.5, 0.5))
+        self.assertAlmostEqual(first['discrimination'], 0.707, places=3)
+        self.assertAlmostEqual(second['discrimination'], -0.707, places=3)
+        self.assertNotIn("Low discrimination", first['flags'])
+        self.assertIn("Low discrimination", second['flags'])
+        self.assertEqual([a['selection_rate'] for a in first['answers']], [0.5, 0.5])
+
+    def test_cached_until_new_response(self):
+        self.assertEqual(get_report(self.quiz)['responses'], 4)
+        with self.assertNumQueries(0):
+            get_report(self.quiz)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.respond(self.students[4], 100, 'AB')
+        report = get_report(self.quiz)
+        self.assertEqual(report['responses'], 5)
+        self.assertEqual(report['questions'][1]['difficulty'], 0.6)
+
+    def test_only_for_the_lecturers_of_the_classroom(self):
+        url = reverse('quiz-analysis', kwargs={'class_name': 'mechanics', 'quiz_pk': self.quiz.pk})
+        self.client.login(username='lecturer', password='pass')
+        response = self.client.get(url, {'format': 'json'})
+        self.assertEqual(len(response.json()['questions']), 2)
+
+        create_lecturer('other')
+        self.client.login(username='other', password='pass')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class QuizResultsViewTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.quiz = Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title='Quiz 1',
+                                       _start=timezone.now(), duration=60)
+        other_quiz = Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title='Quiz 2',
+                                         _start=timezone.now(), duration=60)
+
+        for i, score in enumerate([40, 90, 75, 10, 75]):
+            student = create_student(f'student{i}', cls.department, first_name=f'Student{i}', reg_no=f'REG{i}')
+            QuizStudentResponse.objects.create(quiz=cls.quiz, owner=student, score=score)
+            QuizStudentResponse.objects.create(quiz=other_quiz, owner=student, score=100)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='lecturer', password='pass')
+        self.url = reverse('quiz-results', kwargs={'class_name': 'mechanics', 'quiz_pk': self.quiz.pk})
+
+    def test_ranked_pages(self):
+        response = self.client.get(self.url, {'page_size': 2})
+        ranked = [(r.rank, r.score) for r in response.context['responses']]
+        cursor = response.context['next_cursor']
+        while cursor:
+            response = self.client.get(self.url, {'page_size': 2, 'cursor': cursor, 'format': 'json'})
+            ranked.extend((int(rank), float(score)) for rank, score in re.findall(
+                r'font-weight-bold">(\d+)</h6>.*?<h6 class="m-0">([\d.]+)%', response.json()['html'], re.S))
+            cursor = response.json()['cursor']
+        self.assertEqual(ranked, [(1, 90), (2, 75), (2, 75), (4, 40), (5, 10)])
+
+    def test_summary(self):
+        summary = self.client.get(self.url).context['score_summary']
+        self.assertEqual((summary['responses'], summary['mean'], summary['median']), (5, 58.0, 75.0))
+        self.assertEqual(summary['percentiles']['25'], 40.0)
+        self.assertEqual([bucket['count'] for bucket in summary['histogram']], [0, 1, 0, 0, 1, 0, 0, 2, 0, 1])
+
+    def test_csv_export(self):
+        response = self.client.get(self.url, {'format': 'csv'})
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['Rank', 'Registration No', 'Name'])
+        self.assertEqual([(row[0], row[4]) for row in rows[1:]],
+                         [('1', '90.0'), ('2', '75.0'), ('2', '75.0'), ('4', '40.0'), ('5', '10.0')])
+
+    def test_query_count_does_not_grow_with_responses(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+    def test_only_for_the_lecturers_of_the_classroom(self):
+        create_lecturer('other')
+        self.client.login(username='other', password='pass')
+        self.assertEqual(self.client.get(self.url).status_code, 403)
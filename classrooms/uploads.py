@@ -0,0 +1,239 @@
+"""
+Chunked, resumable uploads of assignment submission files.
+
+1. start_upload: Creates an <UploadSession> for a file (name and size).
+2. append_chunk: Appends a chunk to the part file of the session. Chunks
+   must be sent in order, starting from the 'received' offset of the
+   session, so an interrupted upload is resumed by asking the session for
+   its offset and sending the rest of the file.
+3. complete_uploads: When all the files are uploaded, the submission and
+   its <SubmissionFile> objects are created in a single transaction and
+   the part files are moved into the media storage. Part files are removed
+   only after the transaction is committed, so a failed completion can be
+   tried again.
+
+Requests are read and written in small pieces, so memory usage does not
+depend on the file or chunk size. Part files of abandoned sessions are
+removed by the 'cleanup_uploads' management command.
+"""
+import os
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from main.storage import blob_storage
+from .models import Submission, SubmissionFile, UploadSession
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class _PartFile(File):
+    """
+    Completed part file. FileSystemStorage moves files that have a
+    temporary path instead of copying them.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def get_part_path(session_id) -> str:
+    return os.path.join(settings.SUBMISSION_UPLOAD_DIR, f"{session_id}.part")
+
+
+def validate_file(file_name: str, size: int):
+    ext = os.path.splitext(file_name)[1].lstrip('.').lower()
+    if ext not in settings.SUBMISSION_ALLOWED_EXTENSIONS:
+        raise UploadError(f"File type '{ext}' is not allowed")
+    if size <= 0:
+        raise UploadError("File is empty")
+    if size > settings.SUBMISSION_MAX_FILE_SIZE:
+        raise UploadError(f"File is larger than {settings.SUBMISSION_MAX_FILE_SIZE // (1024 * 1024)}MB")
+
+
+def _check_can_submit(assignment, student):
+    if assignment.review_complete:
+        raise UploadError("Submissions are not accepted", status=403)
+    if Submission.objects.filter(assignment=assignment, owner=student).exists():
+        raise UploadError("Already submitted. Unsubmit first", status=409)
+
+
+def start_upload(assignment, student, file_name, size) -> UploadSession:
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError("Invalid file size")
+    file_name = os.path.basename(str(file_name or ''))[:255]
+
+    validate_file(file_name, size)
+    _check_can_submit(assignment, student)
+
+    session = UploadSession.objects.create(
+        assignment=assignment, owner=student, file_name=file_name, size=size)
+    os.makedirs(settings.SUBMISSION_UPLOAD_DIR, exist_ok=True)
+    open(get_part_path(session.pk), 'wb').close()
+    return session
+
+
+def get_session(session_id, student, lock=False) -> UploadSession:
+    sessions = UploadSession.objects.filter(pk=session_id, owner=student)
+    if lock:
+        sessions = sessions.select_for_update()
+    session = sessions.first()
+    if session is None:
+        raise UploadError("Upload not found", status=404)
+    return session
+
+
+def append_chunk(session_id, student, offset, stream, length) -> UploadSession:
+    """
+    Append a chunk read from the stream (the request) to the part file.
+    :param offset: Position of the chunk in the file. Must be equal to the
+                   no of bytes already received.
+    :param length: Chunk size in bytes (Content-Length)
+    """
+    try:
+        offset, length = int(offset), int(length)
+    except (TypeError, ValueError):
+        raise UploadError("Invalid offset or chunk size")
+    if length <= 0 or length > settings.SUBMISSION_UPLOAD_CHUNK_SIZE:
+        raise UploadError("Invalid chunk size")
+
+    with transaction.atomic():
+        session = get_session(session_id, student, lock=True)
+        if offset != session.received:
+            raise UploadError(f"Expected offset {session.received}", status=409)
+        if offset + length > session.size:
+            raise UploadError("Chunk exceeds the file size")
+
+        with open(get_part_path(session.pk), 'r+b') as part:
+            # Discard the data of a previously failed chunk
+            part.seek(offset)
+            part.truncate()
+
+            remaining = length
+            while remaining:
+                data = stream.read(min(COPY_BUFFER_SIZE, remaining))
+                if not data:
+                    raise UploadError("Incomplete chunk")
+                part.write(data)
+                remaining -= len(data)
+
+        session.received = offset + length
+        session.save(update_fields=['received', '_date_mod'])
+    return session
+
+
+def complete_uploads(assignment, student, session_ids) -> Submission:
+    """
+    Create the submission with the files of the given (complete) sessions.
+    Nothing is saved if any of the uploads is not complete.
+    """
+    try:
+        session_ids = list(dict.fromkeys(uuid.UUID(str(pk)) for pk in session_ids or []))
+    except (TypeError, ValueError):
+        raise UploadError("Invalid upload id")
+    if not session_ids:
+        raise UploadError("No files uploaded")
+    if len(session_ids) > settings.SUBMISSION_MAX_FILES:
+        raise UploadError(f"Maximum of {settings.SUBMISSION_MAX_FILES} files allowed")
+
+    saved_names = []
+    try:
+        with transaction.atomic():
+            sessions = list(UploadSession.objects.select_for_update().filter(
+                pk__in=session_ids, owner=student, assignment=assignment))
+            if len(sessions) != len(session_ids):
+                raise UploadError("Upload not found", status=404)
+            if not all(session.complete for session in sessions):
+                raise UploadError("Upload is not complete", status=409)
+            _check_can_submit(assignment, student)
+
+            submission = Submission.objects.create(assignment=assignment, owner=student)
+            for session in sessions:
+                submission_file = SubmissionFile(submission=submission)
+                _save_part(submission_file, session)
+                saved_names.append(submission_file.file.name)
+            UploadSession.objects.filter(pk__in=session_ids).delete()
+    except Exception:
+        # Blobs created for the rolled back files. The part files are kept, so it can be tried again
+        for name in saved_names:
+            blob_storage.discard(name)
+        raise
+
+    # Part files are needed until the files are saved for good
+    transaction.on_commit(lambda: [_remove_part(pk) for pk in session_ids])
+    return submission
+
+
+def _save_part(submission_file, session):
+    """
+    Save the part file of the session into the file field. A hard link to
+    the part file is moved into the storage, not the part file itself, so
+    the part file is kept if the transaction is rolled back. The part file
+    is copied if hard links are not supported.
+    """
+    part_path = get_part_path(session.pk)
+    link_path = f"{part_path}.{uuid.uuid4().hex}"
+    try:
+        os.link(part_path, link_path)
+    except OSError:
+        link_path = None
+
+    try:
+        with open(link_path or part_path, 'rb') as part:
+            content = _PartFile(part, name=session.file_name) if link_path else File(part, name=session.file_name)
+            submission_file.file.save(session.file_name, content)
+    finally:
+        # Not moved if the file is a duplicate of an existing blob
+        if link_path and os.path.exists(link_path):
+            os.remove(link_path)
+
+
+def abort_upload(session_id, student):
+    session = get_session(session_id, student)
+    session.delete()
+    _remove_part(session.pk)
+
+
+def _remove_part(session_id):
+    try:
+        os.remove(get_part_path(session_id))
+    except FileNotFoundError:
+        pass
+
+
+def cleanup_abandoned_uploads(older_than: timedelta) -> int:
+    """
+    Delete the sessions not updated within the given time and their part
+    files, and part files without a session.
+    :return: No of removed part files
+    """
+    cutoff = timezone.now() - older_than
+    removed = 0
+
+    for session_id in UploadSession.objects.filter(_date_mod__lt=cutoff)\
+            .values_list('pk', flat=True).iterator():
+        UploadSession.objects.filter(pk=session_id).delete()
+        if os.path.exists(get_part_path(session_id)):
+            _remove_part(session_id)
+            removed += 1
+
+    upload_dir = settings.SUBMISSION_UPLOAD_DIR
+    if os.path.isdir(upload_dir):
+        active = {str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)}
+        for entry in os.scandir(upload_dir):
+            session_id = entry.name[:-len('.part')]
+            if entry.name.endswith('.part') and session_id not in active \
+                    and entry.stat().st_mtime < cutoff.timestamp():
+                _remove_part(session_id)
+                removed += 1
+    return removed
@@ -4,12 +4,15 @@ from . import fetchviews
 
 
 urlpatterns = [
+    path('search/', views.search_view, name='search'),
     path('classrooms/',
          views.ClassroomListView.as_view(), name='classrooms'),
     path('classroom/create-new/',
          views.ClassroomCreateView.as_view(), name='class-create'),
     path('classroom/<str:pk>/',
          views.ClassroomDetailView.as_view(), name='class-details'),
+    path('classroom/<str:pk>/class-work/',
+         fetchviews.class_work_view, name='class-work'),
     path('classroom/<str:pk>/edit/',
          views.ClassroomUpdateView.as_view(), name='class-update'),
     path('classroom/<str:pk>/delete/',
@@ -34,6 +37,16 @@ urlpatterns = [
          '', views.assignment_unsubmit_view, name='assignment-unsubmit'),
     path('classroom/<str:class_name>/assignment/<str:assignment_pk>/submission-details/',
          views.assignment_submissions_view, name='submit-details'),
+    path('classroom/<str:class_name>/assignment/<str:pk>/uploads/',
+         fetchviews.upload_start_view, name='upload-start'),
+    path('classroom/<str:class_name>/assignment/<str:pk>/uploads/complete/',
+         fetchviews.upload_complete_view, name='upload-complete'),
+    path('uploads/<uuid:session_id>/',
+         fetchviews.upload_session_view, name='upload-session'),
+    path('classroom/<str:class_name>/assignment/<str:assignment_pk>/download-all/',
+         views.assignment_download_all_view, name='submissions-download'),
+    path('classroom/<str:class_name>/assignment/<str:assignment_pk>/grades/',
+         views.assignment_bulk_grade_view, name='bulk-grade'),
     path('complete-review/<str:assignment_pk>/',
          views.assignment_complete_review_view, name='complete-review'),
     path('undo-complete-review/<str:assignment_pk>/',
@@ -66,6 +79,8 @@ urlpatterns = [
     # Quiz results page (for lecturer)
     path('classroom/<str:class_name>/quiz/<str:quiz_pk>/results',
          views.QuizResultsView.as_view(), name='quiz-results'),
+    path('classroom/<str:class_name>/quiz/<str:quiz_pk>/analysis',
+         views.quiz_item_analysis_view, name='quiz-analysis'),
 
     # Other fetch views
     path('classroom/<str:class_name>/quiz/<str:quiz_pk>/countdown',
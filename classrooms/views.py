@@ -1,7 +1,12 @@
 import json
+from functools import cached_property
 from django.contrib import messages
+from django.db import IntegrityError, transaction
+from django.db.models import Subquery
 from django.http import HttpResponseRedirect, HttpResponse, HttpResponseForbidden, HttpResponseNotAllowed
-from django.shortcuts import render, redirect
+from django.http import StreamingHttpResponse, HttpResponseBadRequest
+from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy, reverse
 from django.utils.text import slugify
 from django.views.generic import (
@@ -35,11 +40,18 @@ from .models import (
     QuizQuestionAnswer,
     Meeting, QuizStudentResponseQuestion, QuizStudentResponse, QuizStudentResponseQuestionAnswer
 )
+from .feeds import ClassWorkFeed
+from .pagination import KeysetPaginationMixin
+from .scoring import get_answer_key, build_answer_key, invalidate_answer_key
+from .grading import GradesParseError, parse_grades_request, apply_grades
+from .downloads import FILTERS, get_submission_files, stream_submissions_zip
+from .search import search
+from .item_analysis import get_report
+from .quiz_results import get_ranked_responses, get_score_summary, stream_results_csv
 from users.models import Lecturer, Student
-from main.funcs import (
-    is_lecturer,
-    is_student,
-    get_naive_dt,
+from main.funcs import is_lecturer, is_student
+from main.caching import CachedObjectMixin, MemoizedObjectMixin, cached_fragment
+from main.timezones import (
     local_to_utc_aware,
     local_to_utc_naive,
     utc_to_local_aware,
@@ -48,7 +60,6 @@ from main.funcs import (
 from django.http import JsonResponse
 from http.client import OK
 from .forms import MeetingUpdateForm, QuizCreateForm
-from main.funcs import local_to_utc_aware
 
 
 class ClassroomListView(LoginRequiredMixin, ListView):
@@ -70,47 +81,51 @@ class ClassroomListView(LoginRequiredMixin, ListView):
             return self.request.user.lecturer.classroom_set.all()
 
 
-class ClassroomDetailView(LoginRequiredMixin, DetailView):
+class ClassroomDetailView(LoginRequiredMixin, CachedObjectMixin, DetailView):
     """
     Inherited from Generic class based view (DetailView).
+    Class work, people and the summary are the same for all the users,
+    so they are rendered once and cached until the classroom content
+    (or a profile) changes. (see main/caching.py, signals.py)
     """
 
     model = Classroom
+    queryset = Classroom.objects.select_related('owner', 'department')
     template_name = "classrooms/class-detail.html"
     context_object_name = 'class'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         classroom = self.get_object()
-
-        assignments = classroom.assignment_set.all()
-        meetings = classroom.meeting_set.all()
-        quizzes = classroom.quiz_set.all()
-        work = set(a for a in assignments)
-        work.update(set(m for m in meetings))
-        work.update(set(q for q in quizzes))
-
-        # Sort the classwork by date_posted using BUBBLE-SORT ALGORITHM
-        def bubble_sort(array):
-            n = len(array)
-
-            for i in range(n):
-                already_sorted = True
-                for j in range(n - i - 1):
-                    if array[j].date_created < array[j + 1].date_created:
-                        array[j], array[j + 1] = array[j + 1], array[j]
-                        already_sorted = False
-                if already_sorted:
-                    break
-            return array
-
-        context['class_work'] = bubble_sort(list(work))
-        context['lecturers'] = classroom.lecturers.all()
-        context['students'] = classroom.department.student_set.all()
+        content = ('classroom-content', classroom.pk)
+
+        # Class work shows the names of the owners too
+        context['class_work_html'] = cached_fragment(
+            f"class-work:{classroom.pk}", [content, 'people'], lambda: self.render_class_work(classroom))
+        context['people_html'] = cached_fragment(
+            f"class-people:{classroom.pk}", [content, 'people'], lambda: self.render_people(classroom))
+        context['summary_html'] = cached_fragment(
+            f"class-summary:{classroom.pk}", [content], lambda: render_to_string(
+                'template-parts/class-summary.html', {'class': classroom}))
         context['events'] = None
         context['posts'] = self.get_posts()
         return context
 
+    @staticmethod
+    def render_class_work(classroom) -> str:
+        # Only the first page of the class work is rendered,
+        # rest is loaded by the 'load more' button.
+        class_work, cursor = ClassWorkFeed(classroom).page()
+        return render_to_string('template-parts/class-work.html', {
+            'class': classroom, 'class_work': class_work, 'class_work_cursor': cursor})
+
+    @staticmethod
+    def render_people(classroom) -> str:
+        return render_to_string('template-parts/class-people.html', {
+            'lecturers': classroom.lecturers.select_related('user'),
+            'students': classroom.department.student_set.select_related('user'),
+        })
+
     def get_posts(self):
         posts = self.get_object().post_set.all()
         return posts
@@ -157,7 +172,7 @@ class ClassroomCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         return False
 
 
-class ClassroomUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class ClassroomUpdateView(LoginRequiredMixin, UserPassesTestMixin, MemoizedObjectMixin, UpdateView):
     """
     Inherited from Generic class based view (UpdateView).
     """
@@ -204,7 +219,7 @@ class ClassroomUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         return reverse('class-details', kwargs={'pk': self.kwargs['pk']})
 
 
-class ClassroomDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class ClassroomDeleteView(LoginRequiredMixin, UserPassesTestMixin, MemoizedObjectMixin, DeleteView):
     """
     Inherited from Generic class based view (DeleteView).
     """
@@ -253,13 +268,14 @@ class PostCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         return reverse('class-details', kwargs={'pk': self.kwargs['pk']})
 
 
-class PostDetailView(LoginRequiredMixin, DetailView):
+class PostDetailView(LoginRequiredMixin, CachedObjectMixin, DetailView):
     model = Post
+    queryset = Post.objects.select_related('classroom', 'owner')
     template_name = "classrooms/posts/post-details.html"
     context_object_name = "post"
 
 
-class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, MemoizedObjectMixin, UpdateView):
     model = Post
     template_name = "classrooms/posts/post-update.html"
     context_object_name = "post"
@@ -279,7 +295,7 @@ class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         return False
 
 
-class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, MemoizedObjectMixin, DeleteView):
     model = Post
     template_name = "classrooms/posts/post-delete.html"
     context_object_name = "post"
@@ -338,7 +354,7 @@ class AssignmentCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         return False
 
 
-class AssignmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class AssignmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, MemoizedObjectMixin, UpdateView):
     model = Assignment
     template_name = "classrooms/assignments/assignment-update.html"
     context_object_name = "assignment"
@@ -379,10 +395,12 @@ class AssignmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
             'pk': self.kwargs['pk']})
 
 
-class AssignmentListView(LoginRequiredMixin, ListView):
+class AssignmentListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Assignment
     template_name = "classrooms/assignments/assignments-list.html"
+    items_template_name = "classrooms/assignments/parts/assignment-list-items.html"
     context_object_name = "assignments"
+    list_select_related = ('classroom', 'owner__user')
 
     page_type = None
 
@@ -401,7 +419,7 @@ class AssignmentListView(LoginRequiredMixin, ListView):
 
         elif isinstance(profile, Lecturer):
             if page_type == 'all':
-                return profile.get_all_assignments()
+                return profile.get_all_assignments().order_by('-_date_due')
             elif page_type == 'ongoing':
                 return profile.get_ongoing_assignments()
             elif page_type == 'pending-review':
@@ -488,7 +506,7 @@ def assignment_unsubmit_view(request, **kwargs):
                     pk=assignment.pk)
 
 
-class AssignmentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class AssignmentDeleteView(LoginRequiredMixin, UserPassesTestMixin, MemoizedObjectMixin, DeleteView):
     model = Assignment
     template_name = "classrooms/assignments/assignment-delete.html"
     context_object_name = "assignment"
@@ -516,7 +534,8 @@ def assignment_submissions_view(request, **kwargs):
     :param request:
     :return:
     """
-    assignment: Assignment = Assignment.objects.get(pk=kwargs['assignment_pk'])
+    assignment: Assignment = get_object_or_404(
+        Assignment.objects.select_related('classroom'), pk=kwargs['assignment_pk'])
 
     if request.method == 'POST':    # Lecturer trying to grade the assignment
         # To determine which user profile is going to be graded,
@@ -532,31 +551,33 @@ def assignment_submissions_view(request, **kwargs):
                             class_name=slugify(assignment.classroom.name),
                             assignment_pk=assignment.pk)
 
-        requesting_prof = Student.objects.get(pk=requesting_prof_pk)
-        obj = Submission.objects.get(
-            assignment=assignment,
-            owner=requesting_prof,
-        )
+        obj = get_object_or_404(Submission, assignment=assignment, owner_id=requesting_prof_pk)
         form = AssignmentGradeForm(request.POST, instance=obj)
 
         if form.is_valid():
             obj = form.save(commit=False)
             obj.grade = request.POST.get('grade')
             obj.save()
-            return redirect('submit-details',
-                            class_name=slugify(assignment.classroom.name),
-                            assignment_pk=assignment.pk)
+        else:
+            messages.error(request, "Grade could not be saved")
+        return redirect('submit-details',
+                        class_name=slugify(assignment.classroom.name),
+                        assignment_pk=assignment.pk)
     else:
-        submissions = assignment.submission_set.all()
+        # Owners and files of all the submissions are loaded with 2 queries
+        submissions = list(assignment.submission_set
+                           .select_related('owner__user')
+                           .prefetch_related('submissionfile_set'))
 
         # Add grading form attribute to each submission object
         for sub in submissions:
             sub.form = AssignmentGradeForm(instance=sub)
 
-        # All the non-submitted students
-        submitted_profiles = [sub.owner for sub in submissions]
-        non_submitted = [prof for prof in assignment.classroom.department.student_set.all()
-                         if prof not in submitted_profiles]
+        # All the non-submitted students (anti-joined in the database)
+        submitted = Submission.objects.filter(assignment=assignment).values('owner_id')
+        non_submitted = Student.objects.filter(department_id=assignment.classroom.department_id)\
+            .exclude(pk__in=Subquery(submitted))\
+            .select_related('user')
 
         context = {
             'assignment': assignment,
@@ -566,13 +587,66 @@ def assignment_submissions_view(request, **kwargs):
         return render(request, "classrooms/assignments/submission-details.html", context=context)
 
 
+@user_passes_test(is_lecturer)
+@login_required
+def assignment_bulk_grade_view(request, **kwargs):
+    """
+    ONLY FOR THE LECTURERS OF THE CLASSROOM
+
+    Grade many submissions of an assignment at once (see grading.py).
+    Used by the inline grading forms and the CSV upload of the
+    submissions page. Nothing is saved if any of the rows is invalid.
+    :return: JSON with the no of updated submissions and the row errors
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    assignment = get_object_or_404(Assignment.objects.select_related('classroom'), pk=kwargs['assignment_pk'])
+    if not assignment.classroom.lecturers.filter(pk=request.user.profile.pk).exists():
+        return HttpResponseForbidden()
+    try:
+        rows = parse_grades_request(request)
+    except GradesParseError as e:
+        return JsonResponse({'updated': 0, 'errors': [{'row': None, 'errors': [str(e)]}]}, status=400)
+
+    updated, errors = apply_grades(assignment, rows)
+    return JsonResponse({'updated': updated, 'errors': errors}, status=400 if errors else 200)
+
+
+@user_passes_test(is_lecturer)
+@login_required
+def assignment_download_all_view(request, **kwargs):
+    """
+    ONLY FOR THE LECTURERS OF THE CLASSROOM
+
+    All the submission files of an assignment as a single zip archive
+    (reg_no/filename), streamed while it is built (see downloads.py).
+    Optional 'filter' GET parameter: 'late' or 'on-time'.
+    """
+    assignment = get_object_or_404(Assignment.objects.select_related('classroom'), pk=kwargs['assignment_pk'])
+    if not assignment.classroom.lecturers.filter(pk=request.user.profile.pk).exists():
+        return HttpResponseForbidden()
+    submission_filter = request.GET.get('filter')
+    if submission_filter and submission_filter not in FILTERS:
+        return HttpResponseBadRequest("Unknown filter")
+
+    files = get_submission_files(assignment, submission_filter)
+    name = slugify(assignment.title) or 'submissions'
+    if submission_filter:
+        name = f"{name}-{submission_filter}"
+
+    response = StreamingHttpResponse(stream_submissions_zip(files), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{name}.zip"'
+    return response
+
+
 @user_passes_test(is_lecturer)
 @login_required
 def assignment_complete_review_view(request, assignment_pk, **kwargs):
     assignment = Assignment.objects.get(pk=assignment_pk)
     try:
         assignment.review_complete = True
-        assignment.save()
+        assignment.save(update_fields=['review_complete'])
         messages.success(request, "Review completed !")
     except Exception as e:
         messages.error(request, "Something went wrong !")
@@ -587,7 +661,7 @@ def assignment_undo_complete_review_view(request, assignment_pk, **kwargs):
     try:
         assignment = Assignment.objects.get(pk=assignment_pk)
         assignment.review_complete = False
-        assignment.save()
+        assignment.save(update_fields=['review_complete'])
         messages.success(request, "Review restarted !")
     except Exception as e:
         messages.error(request, "Something went wrong !")
@@ -636,10 +710,12 @@ class MeetingCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         return reverse_lazy('class-details', kwargs={'pk': self.kwargs['pk']})
 
 
-class MeetingListView(LoginRequiredMixin, ListView):
+class MeetingListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Meeting
     template_name = 'classrooms/meetings/meetings-list.html'
+    items_template_name = 'classrooms/meetings/parts/meeting-list-items.html'
     context_object_name = 'meetings'
+    list_select_related = ('classroom', 'owner__user')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -676,7 +752,7 @@ class MeetingListView(LoginRequiredMixin, ListView):
                 return prof.get_prev_meetings()
 
 
-class MeetingUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class MeetingUpdateView(LoginRequiredMixin, UserPassesTestMixin, MemoizedObjectMixin, UpdateView):
     model = Meeting
     template_name = 'classrooms/meetings/meeting-update.html'
     form_class = MeetingUpdateForm
@@ -694,7 +770,7 @@ class MeetingUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
             'class_name': cls_name, 'pk': meeting.pk})
 
 
-class MeetingDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class MeetingDeleteView(LoginRequiredMixin, UserPassesTestMixin, MemoizedObjectMixin, DeleteView):
     model = Meeting
     template_name = 'classrooms/meetings/meeting-delete.html'
     context_object_name = 'meeting'
@@ -709,8 +785,9 @@ class MeetingDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return reverse('class-details', kwargs={'pk': cls_pk})
 
 
-class MeetingDetailView(LoginRequiredMixin, DetailView):
+class MeetingDetailView(LoginRequiredMixin, CachedObjectMixin, DetailView):
     model = Meeting
+    queryset = Meeting.objects.select_related('classroom', 'owner')
     template_name = 'classrooms/meetings/meeting-details.html'
     context_object_name = 'meeting'
 
@@ -766,10 +843,12 @@ class QuizCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         })
 
 
-class QuizListView(LoginRequiredMixin, ListView):
+class QuizListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Quiz
     template_name = 'classrooms/quizzes/quiz-list.html'
+    items_template_name = 'classrooms/quizzes/parts/quiz-list-items.html'
     context_object_name = 'quizzes'
+    list_select_related = ('classroom', 'owner__user')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -812,7 +891,7 @@ class QuizListView(LoginRequiredMixin, ListView):
                 return prof.get_previous_quizzes()
 
 
-class QuizUpdateView(UpdateView):
+class QuizUpdateView(MemoizedObjectMixin, UpdateView):
     model = Quiz
     template_name = 'classrooms/quizzes/quiz-update.html'
     context_object_name = 'quiz'
@@ -844,7 +923,7 @@ class QuizUpdateView(UpdateView):
             'class_name': cls_name, 'pk': quiz.pk})
 
 
-class QuizDeleteView(DeleteView):
+class QuizDeleteView(MemoizedObjectMixin, DeleteView):
     model = Quiz
     template_name = 'classrooms/quizzes/quiz-delete.html'
     context_object_name = 'quiz'
@@ -855,8 +934,9 @@ class QuizDeleteView(DeleteView):
             'pk': quiz.classroom.pk,})
 
 
-class QuizDetailView(DetailView, LoginRequiredMixin):
+class QuizDetailView(LoginRequiredMixin, CachedObjectMixin, DetailView):
     model = Quiz
+    queryset = Quiz.objects.select_related('classroom', 'owner')
     context_object_name = 'quiz'
 
     def get_template_names(self):
@@ -873,7 +953,7 @@ class QuizDetailView(DetailView, LoginRequiredMixin):
         context['response'] = self.response
         return context
 
-    @property
+    @cached_property
     def response(self):
         user = self.request.user
         if user.is_student:
@@ -906,15 +986,90 @@ def _bubble_sort(array):
     return array
 
 
+def _sync_quiz_questions(quiz, q_objects) -> dict:
+    """
+    Apply the posted questions and answers to the quiz.
+
+    Posted questions are compared with the existing ones by question
+    number and answer letter, and only the differences are written with
+    bulk operations in a single transaction.
+    :param quiz: <Quiz> instance
+    :param q_objects: Posted questions (from the quiz DOM)
+    :return: No of created, updated and deleted rows
+    """
+    # Posted data -> {number: (question text, {letter: (answer text, correct)})}
+    posted = {}
+    for q_obj in q_objects:
+        question = q_obj['question']
+        answers = {ans['letter']: (ans['text'].strip(' '), ans['correct'] == 'true')
+                   for ans in q_obj['answers']}
+        posted[int(question['question-id'])] = (question['text'].strip(' '), answers)
+
+    questions = {q.number: q for q in quiz.quizquestion_set.all()}
+    stats = {'created': 0, 'updated': 0, 'deleted': 0}
+
+    with transaction.atomic():
+        # Questions
+        new_questions = [QuizQuestion(quiz=quiz, number=number, question=text)
+                         for number, (text, answers) in posted.items() if number not in questions]
+        changed_questions = []
+        for number, (text, answers) in posted.items():
+            question = questions.get(number)
+            if question is not None and question.question != text:
+                question.question = text
+                changed_questions.append(question)
+        removed_questions = [q.pk for number, q in questions.items() if number not in posted]
+
+        # Deleting a question deletes its answers too.
+        if removed_questions:
+            QuizQuestion.objects.filter(pk__in=removed_questions).delete()
+        QuizQuestion.objects.bulk_update(changed_questions, ['question'])
+        if new_questions:
+            QuizQuestion.objects.bulk_create(new_questions)
+            # bulk_create does not set primary keys on every database backend (MySQL)
+            questions = {q.number: q for q in quiz.quizquestion_set.all()}
+
+        stats['created'] += len(new_questions)
+        stats['updated'] += len(changed_questions)
+        stats['deleted'] += len(removed_questions)
+
+        # Answers
+        existing = {(a.question_id, a.letter): a for a in QuizQuestionAnswer.objects.filter(
+            question__quiz=quiz)}
+        new_answers, changed_answers, keep = [], [], set()
+        for number, (text, answers) in posted.items():
+            question = questions[number]
+            for letter, (answer_text, correct) in answers.items():
+                keep.add((question.pk, letter))
+                answer = existing.get((question.pk, letter))
+                if answer is None:
+                    new_answers.append(QuizQuestionAnswer(
+                        question=question, letter=letter, answer=answer_text, correct=correct))
+                elif answer.answer != answer_text or answer.correct != correct:
+                    answer.answer = answer_text
+                    answer.correct = correct
+                    changed_answers.append(answer)
+        removed_answers = [a.pk for key, a in existing.items() if key not in keep]
+
+        if removed_answers:
+            QuizQuestionAnswer.objects.filter(pk__in=removed_answers).delete()
+        QuizQuestionAnswer.objects.bulk_update(changed_answers, ['answer', 'correct'])
+        QuizQuestionAnswer.objects.bulk_create(new_answers)
+
+        stats['created'] += len(new_answers)
+        stats['updated'] += len(changed_answers)
+        stats['deleted'] += len(removed_answers)
+    return stats
+
+
 def quiz_questions_and_answers_view(
         request, class_name, quiz_pk, **kwargs):
     """
     ONLY FOR LECTURERS  (CALLED BY AJAX)
 
     CREATING AND UPDATING QUIZ ANSWERS BOTH DONE IN THIS VIEW.
-    WHENEVER NEED TO CREATE OR UPDATE QUESTIONS AND ANSWERS,
-    ALL PREVIOUS QUESTIONS ANS ANSWERS GETS DELETED AND
-    QUIZ WILL BE REGENERATED COMPLETELY.
+    POSTED QUESTIONS AND ANSWERS ARE COMPARED WITH THE EXISTING
+    ONES AND ONLY THE CHANGES ARE SAVED.
     """
     if not request.user.is_lecturer:
         return HttpResponseNotAllowed([])
@@ -923,42 +1078,84 @@ def quiz_questions_and_answers_view(
 
     if request.method == 'POST':
         # If quiz has responses or starting time exceeded, no edits allowed
-        if len(quiz.quizstudentresponse_set.all()) > 0:
+        if quiz.quizstudentresponse_set.exists():
             return JsonResponse({'msg': 'responses-available'})
 
-        # Delete all the existing question and answers
-        for record in quiz.quizquestion_set.all():
-            record.delete()
-
-        # Recreate all questions and answers with the latest datasets
         q_objects = json.loads(request.POST.get('dom'))
+        stats = _sync_quiz_questions(quiz, q_objects.get('dom'))
 
-        for q_obj in q_objects.get('dom'):
-            # Creating <QuizQuestion> object
-            question = q_obj['question']
-            q_id = question['question-id']
-            q_text = question['text'].strip(' ')
-            q_question = QuizQuestion(
-                quiz=quiz,
-                number=q_id,
-                question=q_text,
-            )
-            q_question.save()
-
-            # Creating answers related for above question
-            for ans in q_obj['answers']:
-                q_answer = QuizQuestionAnswer(
-                    question=q_question,
-                    letter=ans['letter'],
-                    answer=ans['text'].strip(' '),
-                    correct=True if ans['correct'] == 'true' else False,
-                )
-                q_answer.save()
+        if any(stats.values()):
+            # Answer key is built once here and used for scoring all the responses.
+            invalidate_answer_key(quiz.pk)
+            quiz.refresh_from_db(fields=['answer_key_version'])
+            build_answer_key(quiz)
+        return JsonResponse({'msg': 'saved', **stats})
 
     context = {'quiz': quiz}
     return render(request, 'classrooms/quizzes/quiz-questions.html', context)
 
 
+def _get_submitted_answers(q_objects) -> dict:
+    """
+    Answers selected by the student for each submitted question.
+    :param q_objects: Submitted questions (from the quiz DOM)
+    :return: Mapping of question number to the list of selected letters
+    """
+    submitted = {}
+    for q_obj in q_objects:
+        number = int(q_obj['question']['question-id'])
+        submitted[number] = [ans['letter'] for ans in q_obj['answers']
+                             if ans['correct'] == 'true']
+    return submitted
+
+
+def _save_quiz_response(quiz, student, submitted, score):
+    """
+    Save the response of a student for a quiz with all the selected answers.
+
+    Questions and answers of the quiz are loaded once into maps and all the
+    rows are inserted with bulk_create in a single transaction.
+    :param quiz: <Quiz> instance
+    :param student: <Student> instance
+    :param submitted: Mapping of question number to the selected letters
+    :param score: Score of the response
+    :return: Created <QuizStudentResponse> or None if the student already responded
+    """
+    questions = {q.number: q for q in quiz.quizquestion_set.all()}
+    answers = {(a.question_id, a.letter): a
+               for a in QuizQuestionAnswer.objects.filter(question__quiz=quiz)}
+
+    # Selected answers of each submitted question
+    selected = {}
+    for number, letters in submitted.items():
+        question = questions.get(number)
+        if question is None:
+            continue
+        selected[question.pk] = [answers[(question.pk, letter)] for letter in letters
+                                 if (question.pk, letter) in answers]
+
+    try:
+        with transaction.atomic():
+            # <QuizStudentResponse> is unique for quiz and student. A double submission
+            # (even a concurrent one, which a read before the insert would not see on
+            # REPEATABLE READ) fails here and the whole response is rolled back.
+            response = QuizStudentResponse.objects.create(quiz=quiz, owner=student, score=score)
+
+            QuizStudentResponseQuestion.objects.bulk_create(
+                QuizStudentResponseQuestion(response=response, question_id=q_pk)
+                for q_pk in selected)
+
+            # bulk_create does not set primary keys on every database backend (MySQL)
+            res_questions = response.quizstudentresponsequestion_set.values_list('question_id', 'pk')
+            QuizStudentResponseQuestionAnswer.objects.bulk_create(
+                QuizStudentResponseQuestionAnswer(response_question_id=res_q_pk, answer=answer)
+                for q_pk, res_q_pk in res_questions
+                for answer in selected[q_pk])
+    except IntegrityError:
+        return None
+    return response
+
+
 def quiz_live_view(request, **kwargs):
     """
     ONLY FOR STUDENTS (CALLED BY AJAX)
@@ -970,91 +1167,16 @@ def quiz_live_view(request, **kwargs):
     context = {'quiz': quiz}
 
     if request.method == 'POST':    # Student submitting a response
-        # Not allowed making more than 1 response for same quiz
-        if not len(request.user.profile.quizstudentresponse_set.filter(quiz=quiz)) > 0:
-            # creating <QuizStudentResponse> object
-            response = QuizStudentResponse(
-                quiz=quiz,
-                owner=request.user.profile,
-            )
-            response.save()
-
-            # Creating questions and answers related to the response
-            q_objects = json.loads(request.POST.get('dom'))
-
-            for q_obj in q_objects.get('dom'):
-                # Creating <QuizStudentResponseQuestion> object
-                question = q_obj['question']
-                q_id = question['question-id']
-                question = QuizQuestion.objects.get(number=q_id)
-                q_res_question = QuizStudentResponseQuestion(
-                    response=response,
-                    question=question,
-                )
-                q_res_question.save()
-
-                # Creating answers related for above question
-                for ans in q_obj['answers']:
-                    # Save answers that only selected as True by student
-                    if ans['correct'] == 'true':
-                        # detect the correct answer
-                        answer_letter = ans['letter']
-                        answer = question.quizquestionanswer_set.get(letter=answer_letter)
-
-                        q_res_answer = QuizStudentResponseQuestionAnswer(
-                            response_question=q_res_question,
-                            answer=answer,
-                        )
-                        q_res_answer.save()
-
-            """generate score for the response"""
-
-            _all_questions = quiz.quizquestion_set.filter()
-
-            # Finding all the correct answers of the actual quiz
-            _all_correct_ans = set()
-            _all_incorrect_ans = set()
-            for question in _all_questions:
-                for a in question.quizquestionanswer_set.all():
-                    if a.correct:
-                        _all_correct_ans.add(a)
-                    else:
-                        _all_incorrect_ans.add(a)
-
-            # Finding all the correct and incorrect answers that student has marked
-            correct_stu = set()
-            incorrect_stu = set()
-            all_res_questions = response.quizstudentresponsequestion_set.all()
-            for q in all_res_questions:
-
-                # <quizstudentresponsequestionanswer_set> only contains the
-                # answers that student selected as correct
-                for ans in q.quizstudentresponsequestionanswer_set.all():
-                    if ans.answer.correct:
-                        correct_stu.add(ans)
-                    else:
-                        incorrect_stu.add(ans)
-
-            correct_actual = len(_all_correct_ans)
-            correct_stu = len(correct_stu)
-
-            try:
-                correct_score = (correct_stu/correct_actual)*100
-                incorrect_score = len(incorrect_stu)
-                score = correct_score - (incorrect_score * 0.1)
-            except ZeroDivisionError:   # No actual correct answers for the quiz
-                if len(incorrect_stu) == 0:
-                    score = 100
-                else:
-                    score = 0
-
-            score = 0 if score < 0 else score
-            response.score = round(score, 2)
-            response.save()
+        q_objects = json.loads(request.POST.get('dom'))
+        submitted = _get_submitted_answers(q_objects.get('dom'))
 
-        else:
-            print("You already have a response")
-            # return JsonResponse({'what_happened': 'Already responded'})
+        # Score is calculated from the submitted letters with the cached answer key
+        score = get_answer_key(quiz).score(submitted)
+        response = _save_quiz_response(quiz, request.user.profile, submitted, score)
+
+        # Not allowed making more than 1 response for same quiz
+        if not response:
+            return JsonResponse({'msg': 'already-responded'}, status=409)
 
     return render(request, 'classrooms/quizzes/parts/live.html', context)
 
@@ -1087,18 +1209,95 @@ def quiz_stu_response_view(request, **kwargs):
     return render(request, 'classrooms/quizzes/quiz-stu-response.html', context)
 
 
-class QuizResultsView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class QuizResultsView(LoginRequiredMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
+    """
+    ONLY FOR THE LECTURERS OF THE CLASSROOM
+
+    Responses of the quiz ranked by score, one page at a time, with the
+    score statistics of all the responses. (see quiz_results.py)
+    GET parameters:
+        format=csv: All the ranked results as a csv file
+    """
     model = QuizStudentResponse
     context_object_name = 'responses'
     template_name = 'classrooms/quizzes/parts/results.html'
+    items_template_name = 'classrooms/quizzes/parts/results-items.html'
+    list_select_related = ('owner__user',)
+    page_size = 50
+
+    @cached_property
+    def quiz(self):
+        return get_object_or_404(Quiz.objects.select_related('classroom'), pk=self.kwargs['quiz_pk'])
+
+    def get_queryset(self):
+        return get_ranked_responses(self.quiz)
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('format') == 'csv':
+            name = slugify(self.quiz.title) or 'quiz'
+            response = StreamingHttpResponse(stream_results_csv(self.quiz), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{name}-results.csv"'
+            return response
+        return super().get(request, *args, **kwargs)
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['quiz'] = Quiz.objects.get(pk=self.kwargs['quiz_pk'])
+        context['quiz'] = self.quiz
+        if self.request.GET.get('format') != 'json':
+            context['score_summary'] = get_score_summary(self.quiz)
         return context
 
     def test_func(self):
-        if self.request.user.is_lecturer:
-            return True
-        return False
+        if not self.request.user.is_lecturer:
+            return False
+        return self.quiz.classroom.lecturers.filter(pk=self.request.user.profile.pk).exists()
+
+
+@user_passes_test(is_lecturer)
+@login_required
+def quiz_item_analysis_view(request, class_name, quiz_pk, **kwargs):
+    """
+    ONLY FOR THE LECTURERS OF THE CLASSROOM
+
+    Difficulty and discrimination of each question and the selection
+    rate of each answer. (see item_analysis.py)
+    GET parameters:
+        format=json: Returns the report as json
+    """
+    quiz = get_object_or_404(Quiz.objects.select_related('classroom'), pk=quiz_pk)
+    if not quiz.classroom.lecturers.filter(pk=request.user.profile.pk).exists():
+        return HttpResponseForbidden()
+
+    report = get_report(quiz)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(report)
+    return render(request, 'classrooms/quizzes/parts/item-analysis.html', {'quiz': quiz, 'report': report})
+
 
+"""
+=============================
+    SEARCH VIEWS
+=============================
+"""
+
+
+@login_required
+def search_view(request):
+    """
+    Search the posts, assignments, quizzes and meetings of the user's classrooms.
+    GET parameters:
+        q: Words to search
+        format=json: Returns the results as a list
+    """
+    query = request.GET.get('q', '').strip()
+    results = search(request.user, query) if query else []
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'results': [{
+            'type': doc.doc_type,
+            'title': doc.title,
+            'classroom': doc.classroom.name,
+            'url': doc.get_absolute_url(),
+            'snippet': doc.body[:200],
+        } for doc in results]})
+    return render(request, 'classrooms/search.html', {'query': query, 'results': results})
@@ -13,4 +13,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_LMS.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after the django setup, requires the apps to be loaded.
+from classrooms import events
+
+
+async def application(scope, receive, send):
+    """
+    Quiz event streams (Server-Sent Events) are served directly,
+    everything else goes to django.
+    """
+    if scope['type'] == 'http' and events.PATH.match(scope['path']):
+        await events.quiz_events_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
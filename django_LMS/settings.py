@@ -48,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.ProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -142,6 +143,9 @@ LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
 
+# Timezone of the users. Datetimes are stored in UTC and shown in this timezone.
+LOCAL_TIME_ZONE = os.getenv('LOCAL_TIME_ZONE', 'Asia/Colombo')
+
 USE_I18N = True
 
 USE_TZ = True
@@ -149,6 +153,13 @@ USE_TZ = True
 # User model modified
 AUTH_USER_MODEL = "users.CustomizedUser"
 
+# ProfileBackend loads the user with the profiles. ModelBackend is kept so the
+# sessions created before are still valid.
+AUTHENTICATION_BACKENDS = [
+    'users.backends.ProfileBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
@@ -168,9 +179,36 @@ LOGOUT_REDIRECT_URL = 'login'
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 CRISPY_ALLOWED_TEMPLATE_PACKS = 'bootstrap4'
 
+# Cache: local memory by default, Redis (or any Redis compatible server) when REDIS_URL is set
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'lms',
+        }
+    }
+
 # Media File
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+# Files used without being saved in a file field. Never removed by 'collect_orphan_media'
+MEDIA_GC_KEEP = ['profile-male.svg', 'profile-female.svg']
+
+# Chunked (resumable) assignment submission uploads
+SUBMISSION_UPLOAD_DIR = os.getenv('SUBMISSION_UPLOAD_DIR', os.path.join(BASE_DIR, 'upload-chunks'))
+SUBMISSION_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024      # Maximum size of a single chunk
+SUBMISSION_MAX_FILE_SIZE = 2 * 1024 * 1024 * 1024
+SUBMISSION_MAX_FILES = 3
+SUBMISSION_ALLOWED_EXTENSIONS = [
+    'jpg', 'jpeg', 'pdf', 'png', 'ico', 'docx', 'accdb', 'pptx', 'html', 'txt', 'zip', 'rar',
+]
 
 # For Emails
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -0,0 +1,121 @@
+"""
+Versioned cache keys, rendered fragments and per-object caching.
+
+Cached values are never deleted. Instead, each key contains the version
+of the data it was built from. Versions are small counters in the cache
+and are increased by signal handlers when the data changes (post_save,
+post_delete), so every key built from the old version is not used anymore
+and expires by itself:
+
+    'fragment:class-work:<classroom version>'
+    'object:classrooms.quiz:12:<quiz version>'
+
+The cache backend is the 'default' one in settings.CACHES (local memory
+by default, Redis when REDIS_URL is set).
+"""
+import time
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+VERSION_TIMEOUT = None          # Versions are kept as long as the backend allows
+FRAGMENT_TIMEOUT = 60 * 60
+OBJECT_TIMEOUT = 60 * 60
+
+
+def _version_key(name, pk=None) -> str:
+    return f"version:{name}" if pk is None else f"version:{name}:{pk}"
+
+
+def _new_version() -> int:
+    # Not 1: a version evicted from the cache must not be reused with old keys
+    return time.time_ns()
+
+
+def get_versions(*names) -> list:
+    """
+    Current versions of the given names. Each name is a string ('people')
+    or a (name, pk) tuple (('classroom', 3)).
+    """
+    keys = [_version_key(*name) if isinstance(name, tuple) else _version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, VERSION_TIMEOUT)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_version(name, pk=None):
+    """
+    Invalidate every key built with this version.
+    """
+    key = _version_key(name, pk)
+    try:
+        cache.incr(key)
+    except ValueError:  # Not in the cache
+        cache.set(key, _new_version(), VERSION_TIMEOUT)
+
+
+def model_version_name(model) -> str:
+    return model._meta.label_lower
+
+
+def bump_object_version(instance):
+    bump_version(model_version_name(type(instance)), instance.pk)
+
+
+def cached_fragment(name, versions, render, timeout=FRAGMENT_TIMEOUT):
+    """
+    Rendered html of a page fragment, rendered only if there is no
+    cached html for the current versions of the data it shows.
+    :param versions: Names of the versions (see get_versions)
+    :param render: Function returning the html
+    """
+    key = ':'.join(['fragment', name, *map(str, get_versions(*versions))])
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, timeout)
+    return mark_safe(html)
+
+
+class MemoizedObjectMixin:
+    """
+    <SingleObjectMixin> mixin. get_object is called several times per
+    request (dispatch, test_func, get_context_data, get_success_url), but
+    the object is loaded only once.
+    """
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if getattr(self, '_object', None) is None:
+            self._object = self.load_object()
+        return self._object
+
+    def load_object(self):
+        return super().get_object()
+
+
+class CachedObjectMixin(MemoizedObjectMixin):
+    """
+    Also keeps the object in the cache between the requests, until the
+    object is saved or deleted (the object version is increased by the
+    signal handlers). Use it only if the queryset of the view does not
+    depend on the user, since objects are cached by pk only.
+    """
+    object_cache_timeout = OBJECT_TIMEOUT
+
+    def load_object(self):
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        if pk is None:
+            return super().load_object()
+
+        name = model_version_name(self.model)
+        version, = get_versions((name, pk))
+        key = f"object:{name}:{pk}:{version}"
+        obj = cache.get(key)
+        if obj is None:
+            obj = super().load_object()
+            cache.set(key, obj, self.object_cache_timeout)
+        return obj
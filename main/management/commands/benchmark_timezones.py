@@ -0,0 +1,50 @@
+import timeit
+from datetime import datetime, timedelta
+import pytz
+from django.core.management.base import BaseCommand
+from main import timezones
+
+
+"""===== PREVIOUS IMPLEMENTATION (for comparison) ====="""
+
+
+def legacy_local_to_utc_aware(local_dt: datetime):
+    fmt = "%Y/%m/%d %H:%M:%S"
+    dt_str = str(local_dt.strftime(fmt))
+    dt_local = datetime.strptime(dt_str, fmt)
+    return dt_local.astimezone(pytz.UTC)
+
+
+def legacy_utc_to_local_naive(utc_dt: datetime):
+    return utc_dt.astimezone(pytz.timezone('Asia/Colombo')).replace(tzinfo=None)
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark of the timezone conversions against the previous implementation"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=1000,
+                            help="Number of datetimes converted per run (like one list page)")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        size, repeat = options['size'], options['repeat']
+        start = datetime(2023, 1, 1, tzinfo=pytz.UTC)
+        utc_dts = [start + timedelta(minutes=17 * i) for i in range(size)]
+        local_dts = [dt.replace(tzinfo=None) for dt in utc_dts]
+
+        cases = [
+            ('utc_to_local_naive',
+             lambda: [legacy_utc_to_local_naive(dt) for dt in utc_dts],
+             lambda: [timezones.utc_to_local_naive(dt) for dt in utc_dts]),
+            ('local_to_utc_aware',
+             lambda: [legacy_local_to_utc_aware(dt) for dt in local_dts],
+             lambda: [timezones.local_to_utc_aware(dt) for dt in local_dts]),
+        ]
+
+        self.stdout.write(f"{size} datetimes, best of {repeat} runs (ms)")
+        self.stdout.write(f"{'function':<22}{'previous':>10}{'current':>10}{'speedup':>10}")
+        for name, *funcs in cases:
+            legacy, single = (min(timeit.repeat(f, number=1, repeat=repeat)) * 1000 for f in funcs)
+            self.stdout.write(
+                f"{name:<22}{legacy:>10.2f}{single:>10.2f}{legacy / single:>9.1f}x")
@@ -0,0 +1,51 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from main.media_gc import build_reference_index, find_orphans
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = "Find the media files not referred by any file field (orphans) and report them. " \
+           "Nothing is deleted without --delete."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help="Delete the orphans")
+        parser.add_argument('--list', action='store_true', help="Print the path of every orphan")
+        parser.add_argument('--workers', type=int, default=min(32, (os.cpu_count() or 1) * 4))
+        parser.add_argument('--min-age', type=float, default=1,
+                            help="Files modified within this no of hours are kept (default: 1)")
+
+    def handle(self, *args, **options):
+        root = settings.MEDIA_ROOT
+        if not os.path.isdir(root):
+            self.stdout.write(f"{root} does not exist")
+            return
+
+        started = time.perf_counter()
+        index = build_reference_index(root)
+        index_seconds = time.perf_counter() - started
+
+        on_orphan = None
+        if options['list']:
+            def on_orphan(name, size):
+                self.stdout.write(f"{size:>12}  {name}")
+
+        # Chunked uploads are removed by the 'cleanup_uploads' command
+        exclude = [getattr(settings, 'SUBMISSION_UPLOAD_DIR', '')]
+        stats = find_orphans(root, index, min_age=options['min_age'] * 3600, delete=options['delete'],
+                             workers=options['workers'], exclude=exclude, on_orphan=on_orphan)
+
+        self.stdout.write(f"Index:   {len(index)} referenced files in {index_seconds:.2f}s")
+        self.stdout.write(f"Scanned: {stats.files} files ({stats.bytes / MB:.1f}MB) in {stats.dirs} "
+                          f"directories in {stats.seconds:.2f}s, {stats.files_per_second:.0f} files/s "
+                          f"with {options['workers']} workers")
+        summary = f"Orphans: {stats.orphans} files ({stats.orphan_bytes / MB:.1f}MB)"
+        if options['delete']:
+            self.stdout.write(self.style.SUCCESS(f"{summary}, {stats.deleted} deleted"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{summary}. Dry run, use --delete to remove them"))
+        if stats.errors:
+            self.stdout.write(self.style.ERROR(f"{stats.errors} directories could not be scanned"))
@@ -0,0 +1,74 @@
+import os
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import F, Sum
+from main.models import Blob
+from main.storage import ContentAddressedStorage, parse_name
+
+MB = 1024 * 1024
+
+
+def get_storage_fields():
+    """
+    :return: (model, field) pairs of the file fields using the content-addressed storage
+    """
+    return [(model, field) for model in apps.get_models() for field in model._meta.get_fields()
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)]
+
+
+class Command(BaseCommand):
+    help = "Show how much space is reclaimed by the deduplicating file storage. " \
+           "Use --convert to move the files saved before (legacy) into the storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true',
+                            help="Deduplicate the legacy files too")
+
+    def handle(self, *args, **options):
+        if options['convert']:
+            converted, freed = self.convert_legacy_files()
+            self.stdout.write(f"Converted {converted} legacy files ({freed / MB:.1f}MB freed)")
+
+        totals = Blob.objects.aggregate(stored=Sum('size'), referenced=Sum(F('size') * F('ref_count')))
+        stored, referenced = totals['stored'] or 0, totals['referenced'] or 0
+        legacy = sum(self.get_legacy_rows(model, field).count() for model, field in get_storage_fields())
+
+        self.stdout.write(f"Blobs:      {Blob.objects.count()} ({stored / MB:.1f}MB on disk)")
+        self.stdout.write(f"References: {Blob.objects.aggregate(n=Sum('ref_count'))['n'] or 0} "
+                          f"({referenced / MB:.1f}MB without deduplication)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Reclaimed:  {(referenced - stored) / MB:.1f}MB "
+            f"({(referenced - stored) / referenced * 100 if referenced else 0:.0f}%)"))
+        if legacy:
+            self.stdout.write(self.style.WARNING(f"Legacy files (not deduplicated): {legacy}"))
+
+    @staticmethod
+    def get_legacy_rows(model, field):
+        return model._default_manager.exclude(**{field.name: ''})\
+            .exclude(**{f"{field.name}__regex": r'[0-9a-f]{64}/[^/]+$'})
+
+    def convert_legacy_files(self):
+        """
+        Save the legacy files again through the storage and remove the old copies.
+        :return: (no of converted files, bytes freed)
+        """
+        stored_before = Blob.objects.aggregate(size=Sum('size'))['size'] or 0
+        converted = legacy_size = 0
+
+        for model, field in get_storage_fields():
+            storage = field.storage
+            for pk, name in self.get_legacy_rows(model, field).values_list('pk', field.name).iterator():
+                if parse_name(name) is not None or not storage.exists(name):
+                    continue
+                legacy_size += storage.size(name)
+
+                with transaction.atomic(), storage.open(name) as f:
+                    new_name = storage.save(
+                        field.generate_filename(None, os.path.basename(name)), f, max_length=field.max_length)
+                    model._default_manager.filter(pk=pk).update(**{field.name: new_name})
+                storage.delete(name)
+                converted += 1
+
+        stored_after = Blob.objects.aggregate(size=Sum('size'))['size'] or 0
+        return converted, legacy_size - (stored_after - stored_before)
@@ -0,0 +1,156 @@
+"""
+Garbage collection of orphaned media files.
+
+Files under MEDIA_ROOT that no file field refers to anymore are orphans.
+Examples are the files of deleted classrooms and replaced profile pictures.
+
+1. build_reference_index: A set of every referenced path (relative to
+   MEDIA_ROOT). Values of all the FileField/ImageField columns of all the
+   models are streamed from the database. Files referred in other ways are
+   added too: blobs of the content-addressed storage, and the files returned
+   by the 'get_referenced_files' class method of a model (ex: thumbnails).
+2. find_orphans: MEDIA_ROOT is scanned in parallel by a thread pool (one
+   task per directory, os.scandir releases the GIL while waiting for the
+   disk) and every file is looked up in the index.
+
+Orphans are passed to a callback instead of being collected, so memory
+usage depends on the no of referenced files only. Files modified recently
+are skipped, since a file is written before the row referring it is
+committed.
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import models
+from .models import Blob
+from .storage import BLOB_DIR
+
+
+class ScanStats:
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.dirs = 0
+        self.orphans = 0
+        self.orphan_bytes = 0
+        self.deleted = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+
+def _relative_name(root, storage, name):
+    try:
+        return os.path.relpath(storage.path(name), root).replace(os.sep, '/')
+    except SuspiciousFileOperation:
+        return None     # Not in the media folder
+
+
+def build_reference_index(root) -> set:
+    """
+    :param root: MEDIA_ROOT
+    :return: Set of the referenced file paths, relative to the root
+    """
+    index = set(getattr(settings, 'MEDIA_GC_KEEP', []))
+    for model in apps.get_models():
+        fields = [f for f in model._meta.concrete_fields if isinstance(f, models.FileField)]
+        if fields:
+            rows = model._base_manager.values_list(*[f.attname for f in fields])
+            for row in rows.iterator(chunk_size=10000):
+                for field, name in zip(fields, row):
+                    if name:
+                        index.add(_relative_name(root, field.storage, name))
+
+        if hasattr(model, 'get_referenced_files'):
+            for name in model.get_referenced_files():
+                index.add(_relative_name(root, default_storage, name))
+
+    for name in Blob.objects.values_list('name', flat=True).iterator(chunk_size=10000):
+        index.add(f"{BLOB_DIR}/{name}")
+    index.discard(None)
+    return index
+
+
+def _scan_dir(path, root, index, cutoff, delete):
+    """
+    Scan the files of a single directory.
+    :return: (sub directories, orphans as (name, size) tuples, stats)
+    """
+    stats = ScanStats()
+    subdirs, orphans = [], []
+    prefix_len = len(root) + 1
+
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                stats.files += 1
+                stats.bytes += stat.st_size
+
+                name = entry.path[prefix_len:].replace(os.sep, '/')
+                if name in index or stat.st_mtime > cutoff:
+                    continue
+                orphans.append((name, stat.st_size))
+                stats.orphans += 1
+                stats.orphan_bytes += stat.st_size
+                if delete:
+                    try:
+                        os.remove(entry.path)
+                        stats.deleted += 1
+                    except FileNotFoundError:
+                        pass
+    except FileNotFoundError:
+        pass    # Removed while scanning
+    except OSError as e:
+        print(f"Error when scanning media: {e}")
+        stats.errors += 1
+    return subdirs, orphans, stats
+
+
+def find_orphans(root, index, min_age=3600, delete=False, workers=8, exclude=(), on_orphan=None) -> ScanStats:
+    """
+    Scan the root directory for the files not in the index.
+    :param min_age: Files modified within this no of seconds are not orphans
+    :param delete: Delete the orphans
+    :param exclude: Absolute paths of the directories not to scan
+    :param on_orphan: Called with the name (relative to the root) and the size of each orphan
+    """
+    root = os.path.abspath(root)
+    exclude = {os.path.abspath(path) for path in exclude if path}
+    cutoff = time.time() - min_age
+    total = ScanStats()
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='media-gc') as pool:
+        pending = {pool.submit(_scan_dir, root, root, index, cutoff, delete)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, orphans, stats = future.result()
+                pending.update(pool.submit(_scan_dir, path, root, index, cutoff, delete)
+                               for path in subdirs if path not in exclude)
+
+                total.dirs += 1
+                for attr in ('files', 'bytes', 'orphans', 'orphan_bytes', 'deleted', 'errors'):
+                    setattr(total, attr, getattr(total, attr) + getattr(stats, attr))
+                if on_orphan:
+                    for name, size in orphans:
+                        on_orphan(name, size)
+
+    total.seconds = time.perf_counter() - started
+    return total
@@ -26,3 +26,17 @@ class Department(models.Model):
                 return f"{self.description[:50]} ..."
             else:
                 return self.description
+
+
+class Blob(models.Model):
+    """
+    File stored once by the content-addressed storage (see storage.py),
+    with the no of file fields referring to it.
+    """
+    name = models.CharField(max_length=100, primary_key=True)   # '<digest[:2]>/<digest><ext>'
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    _date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
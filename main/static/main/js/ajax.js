@@ -0,0 +1,348 @@
+$(document).ready(function() {
+    /*
+    * CLASSROOM
+    */
+
+    // Load the next page of the class work
+    $('#loadMoreClassWork').on('click', function() {
+        var btn = $(this);
+
+        $.ajax({
+            type: 'GET',
+            url: $(btn).attr('data-url'),
+            data: {'cursor': $(btn).attr('data-cursor')},
+            success: function(data) {
+                $('#classWorkItems').append(data.html);
+
+                if (data.cursor) {
+                    $(btn).attr('data-cursor', data.cursor);
+                } else {
+                    $(btn).parent().remove();   // Nothing more to load
+                }
+            },
+        });
+    });
+
+    /*
+    * ASSIGNMENT, MEETING AND QUIZ LISTS
+    */
+
+    // Load the next page of the list (infinite scroll)
+    const loadMoreItems = $('#loadMoreItems');
+
+    if (loadMoreItems.length) {
+        var loadingItems = false;
+
+        function loadNextItems() {
+            var btn = loadMoreItems;
+            if (loadingItems || !$(btn).attr('data-cursor')) {
+                return;
+            }
+            loadingItems = true;
+
+            $.ajax({
+                type: 'GET',
+                url: $(btn).attr('data-url'),
+                data: {'cursor': $(btn).attr('data-cursor'), 'format': 'json'},
+                success: function(data) {
+                    $('#listItems').append(data.html);
+
+                    if (data.cursor) {
+                        $(btn).attr('data-cursor', data.cursor);
+                    } else {
+                        $(btn).attr('data-cursor', '');
+                        $(btn).parent().remove();   // Nothing more to load
+                    }
+                },
+                complete: function() {
+                    loadingItems = false;
+                },
+            });
+        }
+
+        $(loadMoreItems).on('click', loadNextItems);
+
+        // Load the next page when the button scrolls into view
+        $(window).on('scroll', function() {
+            if ($(loadMoreItems).attr('data-cursor') &&
+                    $(window).scrollTop() + $(window).height() >= $(loadMoreItems).offset().top) {
+                loadNextItems();
+            }
+        });
+    }
+
+    /*
+    * PEOPLE
+    */
+
+    // Load the next page of the lecturers or the students (keeps the department and batch filters)
+    $('.load-more-people').on('click', function() {
+        var btn = $(this);
+        var params = new URLSearchParams(location.search);
+        params.set('role', $(btn).attr('data-role'));
+        params.set('cursor', $(btn).attr('data-cursor'));
+        params.set('format', 'json');
+
+        $.ajax({
+            type: 'GET',
+            url: location.pathname + '?' + params.toString(),
+            success: function(data) {
+                $($(btn).attr('data-target')).append(data.html);
+
+                if (data.cursor) {
+                    $(btn).attr('data-cursor', data.cursor);
+                } else {
+                    $(btn).parent().remove();   // Nothing more to load
+                }
+            },
+        });
+    });
+
+    /*
+    * ASSIGNMENT GRADING
+    */
+
+    function gradeErrorsText(errors) {
+        return $.map(errors, function(row) {
+            var prefix = row.row ? 'Row ' + row.row + ': ' : '';
+            return prefix + row.errors.join(', ');
+        }).join(' | ');
+    }
+
+    // Grade a single submission without reloading the page
+    $('.inline-grade-form').on('submit', function(e) {
+        e.preventDefault();
+        var form = $(this);
+        var studentId = $(form).attr('data-student-id');
+        var grade = $(form).find('[name="grade"]').val();
+
+        $.ajax({
+            type: 'POST',
+            url: $(form).attr('data-url'),
+            contentType: 'application/json',
+            headers: {'X-CSRFToken': $(form).find('[name="csrfmiddlewaretoken"]').val()},
+            data: JSON.stringify([{
+                'student_id': studentId,
+                'grade': grade,
+                'comment': $(form).find('[name="lec_comment"]').val(),
+            }]),
+            success: function() {
+                $(form).find('.grade-errors').text('');
+                $('#gradeStatus' + studentId).html(grade
+                    ? '<b class="text-success">Graded</b>'
+                    : '<b class="text-warning">Pending Review</b>');
+            },
+            error: function(xhr) {
+                var errors = xhr.responseJSON ? xhr.responseJSON.errors : [];
+                $(form).find('.grade-errors').text(gradeErrorsText(errors) || 'Grade could not be saved');
+            },
+        });
+    });
+
+    // Grade many submissions with a CSV file (student_id, grade, comment)
+    $('#gradesCsvForm input[type="file"]').on('change', function() {
+        var form = $('#gradesCsvForm');
+        var data = new FormData(form[0]);
+
+        $.ajax({
+            type: 'POST',
+            url: $(form).attr('data-url'),
+            data: data,
+            processData: false,
+            contentType: false,
+            headers: {'X-CSRFToken': $(form).find('[name="csrfmiddlewaretoken"]').val()},
+            success: function() {
+                location.reload();
+            },
+            error: function(xhr) {
+                var errors = xhr.responseJSON ? xhr.responseJSON.errors : [];
+                $('#gradesCsvErrors').text(gradeErrorsText(errors) || 'Grades could not be saved');
+            },
+        });
+        $(this).val('');    // Allow uploading the same file again
+    });
+
+    /*
+    * ASSIGNMENT SUBMISSION (chunked, resumable uploads)
+    */
+
+    const assignmentSubmitForm = $('#assignmentSubmitForm');
+
+    if (assignmentSubmitForm.length && window.Blob && Blob.prototype.slice) {
+        const form = assignmentSubmitForm;
+        const csrfHeaders = {'X-CSRFToken': $(form).find('[name="csrfmiddlewaretoken"]').val()};
+
+        function sleep(ms) {
+            return new Promise(function(resolve) { setTimeout(resolve, ms); });
+        }
+
+        // Upload a single file, resuming a previous upload of the same file if possible
+        async function uploadFile(file, onProgress) {
+            var key = 'upload:' + $(form).attr('data-upload-url') + ':' +
+                file.name + ':' + file.size + ':' + file.lastModified;
+            var session = null;
+
+            if (localStorage.getItem(key)) {
+                try {
+                    session = await $.ajax({type: 'GET', url: localStorage.getItem(key)});
+                } catch (xhr) {
+                    session = null;     // Expired or cleaned up, start again
+                }
+            }
+            if (!session) {
+                session = await $.ajax({
+                    type: 'POST',
+                    url: $(form).attr('data-upload-url'),
+                    contentType: 'application/json',
+                    headers: csrfHeaders,
+                    data: JSON.stringify({'file_name': file.name, 'size': file.size}),
+                });
+            }
+            localStorage.setItem(key, session.url);
+
+            var offset = session.offset;
+            var retries = 0;
+            while (offset < file.size) {
+                try {
+                    var status = await $.ajax({
+                        type: 'PUT',
+                        url: session.url + '?offset=' + offset,
+                        data: file.slice(offset, offset + session.chunk_size),
+                        processData: false,
+                        contentType: 'application/octet-stream',
+                        headers: csrfHeaders,
+                    });
+                    offset = status.offset;
+                    retries = 0;
+                    onProgress(offset);
+                } catch (xhr) {
+                    if (xhr.status && xhr.status < 500 && xhr.status !== 409 || ++retries > 5) {
+                        throw xhr;
+                    }
+                    await sleep(1000 * retries);
+                    // Continue from the data the server has received
+                    offset = (await $.ajax({type: 'GET', url: session.url})).offset;
+                }
+            }
+            localStorage.removeItem(key);
+            return session.id;
+        }
+
+        $(form).on('submit', async function(e) {
+            var files = $(form).find('input[type="file"]')[0].files;
+            if (!files.length) {
+                return;     // Normal form submission
+            }
+            e.preventDefault();
+
+            var btn = $(form).find('button');
+            var errors = $(form).find('.upload-errors');
+            var total = 0, done = 0;
+            $.each(files, function(i, file) { total += file.size; });
+            $(btn).prop('disabled', true);
+            $(errors).text('');
+
+            try {
+                var sessions = [];
+                for (let i = 0; i < files.length; i++) {
+                    sessions.push(await uploadFile(files[i], function(offset) {
+                        $(btn).text('Uploading ' + Math.floor((done + offset) / total * 100) + '%');
+                    }));
+                    done += files[i].size;
+                }
+                $(btn).text('Submitting');
+                await $.ajax({
+                    type: 'POST',
+                    url: $(form).attr('data-complete-url'),
+                    contentType: 'application/json',
+                    headers: csrfHeaders,
+                    data: JSON.stringify({'sessions': sessions}),
+                });
+                location.reload();
+            } catch (xhr) {
+                $(errors).text(xhr.responseJSON ? xhr.responseJSON.error : 'Upload failed. Submit again to resume.');
+                $(btn).prop('disabled', false).text('Submit');
+            }
+        });
+    }
+
+    /*
+    * QUIZ COUNTDOWN
+    */
+
+    const quizCountDown = $('#quizCountDown');
+
+    if (quizCountDown.length) {
+        var quizStart = null;
+        var clockOffset = 0;    // Server clock - client clock (ms)
+        var checking = false;
+        var checkDelay = 1000;
+
+        function serverNow() {
+            return Date.now() + clockOffset;
+        }
+
+        // Update the remaining time every second using the start time and the clock of the server.
+        setInterval(function() {
+            if (quizStart == null || checking) {
+                return;
+            }
+            var remaining = Math.floor((quizStart - serverNow()) / 1000);
+            if (remaining <= 0) {
+                // Reload only when a fresh response confirms the quiz started,
+                // backing off while it does not (eg: client clock is ahead).
+                checking = true;
+                fetchQuizTimes(true).done(function() {
+                    if (quizStart <= serverNow()) {
+                        location.reload();  // Quiz started
+                    }
+                }).always(function() {
+                    setTimeout(function() { checking = false; }, checkDelay);
+                    checkDelay = Math.min(checkDelay * 2, 60000);
+                });
+                return;
+            }
+            var hours = Math.floor(remaining / 3600);
+            var minutes = Math.floor((remaining % 3600) / 60);
+            var seconds = remaining % 60;
+            $(quizCountDown).text(hours + 'h ' + minutes + 'm ' + seconds + 's');
+        }, 1000);
+
+        // Quiz times are cached by the server (and the browser), so polling is cheap.
+        // A fresh request skips the browser cache, so its Date header gives the server clock.
+        function fetchQuizTimes(fresh) {
+            return $.ajax({
+                type: 'GET',
+                url: $(quizCountDown).attr('data-url'),
+                cache: !fresh,
+                success: function(data, status, xhr) {
+                    quizStart = Date.parse(data.start);
+                    var serverDate = Date.parse(xhr.getResponseHeader('Date'));
+                    if (fresh && !isNaN(serverDate)) {
+                        clockOffset = serverDate - Date.now();
+                    }
+                },
+            });
+        }
+        fetchQuizTimes(true);
+
+        // Server-Sent Events are only available when served with ASGI.
+        // Poll the countdown endpoint when they are not available.
+        var polling = null;
+        if (window.EventSource) {
+            var events = new EventSource($(quizCountDown).attr('data-events-url'));
+            events.addEventListener('quiz-started', function() {
+                events.close();
+                location.reload();
+            });
+            events.onerror = function() {
+                events.close();
+                if (polling == null) {
+                    polling = setInterval(fetchQuizTimes, 60000);
+                }
+            };
+        } else {
+            polling = setInterval(fetchQuizTimes, 60000);
+        }
+    }
+});
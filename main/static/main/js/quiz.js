@@ -244,6 +244,11 @@ $(document).ready(function() {
                 window.location.href = $('#redirectFromQuizLive').val();
             },
             error: function(response) {
+                // 409: A response was already made (eg: double click), show that one
+                if (response.status === 409) {
+                    window.location.href = $('#redirectFromQuizLive').val();
+                    return;
+                }
                 console.log("Request failed");
             },
         });
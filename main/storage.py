@@ -0,0 +1,184 @@
+"""
+Content-addressed, deduplicating file storage.
+
+Files are hashed (SHA-256) while they are streamed to disk and every
+distinct file is stored once as a blob under MEDIA_ROOT/blobs:
+
+    blobs/<digest[:2]>/<digest><ext>
+
+The name saved in the file field keeps the original file name, so it is
+still shown to the users and used in downloads:
+
+    <upload_to>/<digest>/<file name>
+
+Each blob has a <Blob> row counting the file fields referring to it.
+Deleting a file releases a reference and the blob is removed only when
+the last reference goes. Names saved before this storage was used (no
+digest folder) are handled like a normal FileSystemStorage.
+
+Same content with a different extension is stored as a different blob, so
+the blobs can be served directly with the correct content type.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+from .models import Blob
+
+BLOB_DIR = 'blobs'
+HASHED_NAME_RE = re.compile(r'^(?:(?P<dir>.*)/)?(?P<digest>[0-9a-f]{64})/(?P<file_name>[^/]+)$')
+
+
+def get_blob_name(digest: str, file_name: str) -> str:
+    ext = os.path.splitext(file_name)[1].lower()[:16]
+    return f"{digest[:2]}/{digest}{ext}"
+
+
+def parse_name(name: str):
+    """
+    :return: Blob name of a name saved by the storage, None for legacy names
+    """
+    match = HASHED_NAME_RE.match(name or '')
+    if match is None:
+        return None
+    return get_blob_name(match['digest'], match['file_name'])
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def _blob_path(self, blob_name) -> str:
+        return super().path(f"{BLOB_DIR}/{blob_name}")
+
+    def path(self, name):
+        blob_name = parse_name(name)
+        if blob_name is None:
+            return super().path(name)
+        return self._blob_path(blob_name)
+
+    def url(self, name):
+        blob_name = parse_name(name)
+        if blob_name is None:
+            return super().url(name)
+        return super().url(f"{BLOB_DIR}/{blob_name}")
+
+    def get_available_name(self, name, max_length=None):
+        """
+        Names do not have to be unique: same name and content refers to the
+        same blob. The file name is shortened if the name would be too long
+        after adding the digest folder.
+        """
+        dir_name, file_name = os.path.split(name)
+        if max_length is not None:
+            excess = len(dir_name) + len(file_name) + 66 - max_length
+            if excess > 0:
+                root, ext = os.path.splitext(file_name)
+                file_name = root[:max(1, len(root) - excess)] + ext
+        return os.path.join(dir_name, file_name)
+
+    def _write_to_temp(self, content):
+        """
+        Copy the content into a temporary file (next to the blobs, so it can
+        be renamed) and hash it at the same time.
+        :return: (digest, size, temporary file path)
+        """
+        tmp_dir = super().path(f"{BLOB_DIR}/tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        sha256 = hashlib.sha256()
+        size = 0
+
+        with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+            try:
+                content.seek(0)
+            except (AttributeError, OSError):
+                pass
+            for chunk in content.chunks():
+                sha256.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        return sha256.hexdigest(), size, tmp.name
+
+    def _hash_file(self, path):
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest(), os.path.getsize(path)
+
+    def _save(self, name, content):
+        dir_name, file_name = os.path.split(name)
+
+        # Uploaded files which are already on the disk are moved, not copied
+        if hasattr(content, 'temporary_file_path'):
+            source = content.temporary_file_path()
+            digest, size = self._hash_file(source)
+            is_temp = False
+        else:
+            digest, size, source = self._write_to_temp(content)
+            is_temp = True
+
+        blob_name = get_blob_name(digest, file_name)
+        blob_path = self._blob_path(blob_name)
+        try:
+            with transaction.atomic():
+                self._add_reference(blob_name, size)
+                if not os.path.exists(blob_path):
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    file_move_safe(source, blob_path, allow_overwrite=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(blob_path, self.file_permissions_mode)
+        finally:
+            if is_temp and os.path.exists(source):
+                os.remove(source)   # Duplicate of an existing blob
+        return os.path.join(dir_name, digest, file_name).replace('\\', '/')
+
+    def _add_reference(self, blob_name, size):
+        if Blob.objects.filter(pk=blob_name).update(ref_count=F('ref_count') + 1):
+            return
+        try:
+            with transaction.atomic():
+                Blob.objects.create(name=blob_name, size=size, ref_count=1)
+        except IntegrityError:
+            # Created by a concurrent upload of the same file
+            Blob.objects.filter(pk=blob_name).update(ref_count=F('ref_count') + 1)
+
+    def delete(self, name):
+        """
+        Release a reference to the blob. The blob is removed from the disk
+        when it is not referred anymore (after the transaction is committed).
+        """
+        blob_name = parse_name(name)
+        if blob_name is None:
+            return super().delete(name)
+
+        with transaction.atomic():
+            Blob.objects.filter(pk=blob_name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+            deleted, _ = Blob.objects.filter(pk=blob_name, ref_count=0).delete()
+        if deleted:
+            transaction.on_commit(lambda: self._remove_blob(blob_name))
+
+    def discard(self, name):
+        """
+        Remove the blob of a name saved in a transaction that was rolled
+        back (the reference to the blob is gone with the rollback). Blobs
+        still referred are kept.
+        """
+        blob_name = parse_name(name)
+        if blob_name is not None:
+            self._remove_blob(blob_name)
+
+    def _remove_blob(self, blob_name):
+        if Blob.objects.filter(pk=blob_name).exists():
+            return  # Uploaded again in the meantime
+        try:
+            os.remove(self._blob_path(blob_name))
+        except FileNotFoundError:
+            pass
+
+
+blob_storage = ContentAddressedStorage()
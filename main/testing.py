@@ -0,0 +1,61 @@
+"""
+Helpers shared by the tests of the apps.
+"""
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from classrooms.models import Classroom
+from main.models import Batch, Department
+from users.models import CustomizedUser, Lecturer, Student
+
+PASSWORD = 'pass'
+
+
+class TempDirsMixin:
+    """
+    Points the settings listed in <temp_dir_settings> (MEDIA_ROOT, ...) to
+    new temporary directories for the test class. The directories and the
+    files written by the tests are removed when the class is done.
+    """
+    temp_dir_settings = ('MEDIA_ROOT',)
+
+    @classmethod
+    def setUpClass(cls):
+        dirs = {name: tempfile.mkdtemp(prefix='lms-test-') for name in cls.temp_dir_settings}
+        for path in dirs.values():
+            cls.addClassCleanup(shutil.rmtree, path, ignore_errors=True)
+
+        temp_settings = override_settings(**dirs)
+        temp_settings.enable()
+        cls.addClassCleanup(temp_settings.disable)
+        super().setUpClass()
+
+
+def create_user(username, gender='Male', **fields) -> CustomizedUser:
+    return CustomizedUser.objects.create_user(
+        username=username, email=f'{username}@example.com', password=PASSWORD, gender=gender, **fields)
+
+
+def create_lecturer(username='lecturer', **user_fields) -> Lecturer:
+    user = create_user(username, gender='Female', **user_fields)
+    return Lecturer.objects.create(user=user, profile_pic='profile-female.svg')
+
+
+def create_student(username, department, first_name='', **fields) -> Student:
+    user = create_user(username, first_name=first_name)
+    fields.setdefault('profile_pic', 'profile-male.svg')
+    return Student.objects.create(user=user, department=department, **fields)
+
+
+class ClassroomTestCase(TestCase):
+    """
+    Classroom 'Mechanics' of the 'Physics' department (batch '2023'),
+    owned and lectured by 'lecturer'. All the users log in with PASSWORD.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(batch=Batch.objects.create(year='2023'), name='Physics')
+        cls.lecturer = create_lecturer()
+        cls.classroom = Classroom.objects.create(owner=cls.lecturer, department=cls.department, name='Mechanics')
+        cls.classroom.lecturers.add(cls.lecturer)
@@ -1 +1,87 @@
-from django.test import TestCase
+import os
+import time
+import unittest
+from datetime import date, datetime, timezone
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from main import timezones
+from main.media_gc import build_reference_index, find_orphans
+from main.models import Batch, Department
+from main.testing import TempDirsMixin, create_student
+
+
+@override_settings(MEDIA_GC_KEEP=['profile-male.svg'])
+class OrphanedMediaTest(TempDirsMixin, TestCase):
+    def write(self, name, age=7200):
+        name = default_storage.save(name, ContentFile(b'data'))
+        past = time.time() - age
+        os.utime(default_storage.path(name), (past, past))
+        return name
+
+    def test_find_orphans(self):
+        department = Department.objects.create(batch=Batch.objects.create(year='2023'), name='Physics')
+        create_student('student', department, profile_pic=self.write('stu_profile_pics/current.jpg'),
+                       thumbnails={'profile_pic': {'64': self.write('thumbs/current-64.jpg')}})
+
+        self.write('profile-male.svg')
+        replaced = self.write('stu_profile_pics/replaced.jpg')
+        deleted = self.write('submission-files/deleted.pdf')
+        self.write('submission-files/uploading.pdf', age=0)    # Row not committed yet
+
+        root = default_storage.location
+        orphans = []
+        stats = find_orphans(root, build_reference_index(root), workers=4,
+                             on_orphan=lambda name, size: orphans.append(name))
+        self.assertEqual(sorted(orphans), sorted([replaced, deleted]))
+        self.assertEqual((stats.files, stats.orphans, stats.deleted), (6, 2, 0))
+        self.assertTrue(default_storage.exists(deleted))    # Dry run
+
+        stats = find_orphans(root, build_reference_index(root), delete=True)
+        self.assertEqual(stats.deleted, 2)
+        self.assertFalse(default_storage.exists(replaced))
+        self.assertFalse(default_storage.exists(deleted))
+        self.assertTrue(default_storage.exists('thumbs/current-64.jpg'))
+
+
+@override_settings(LOCAL_TIME_ZONE='Asia/Colombo')
+class TimezonesTest(SimpleTestCase):
+    def test_local_to_utc(self):
+        local = datetime(2023, 4, 16, 20, 12)
+        expected = datetime(2023, 4, 16, 14, 42, tzinfo=timezone.utc)     # Asia/Colombo is +05:30
+        self.assertEqual(timezones.local_to_utc_aware(local), expected)
+        # Form fields label the local time with UTC: only the wall-clock time is used
+        self.assertEqual(timezones.local_to_utc_aware(local.replace(tzinfo=timezone.utc)), expected)
+        self.assertEqual(timezones.local_to_utc_naive(local), expected.replace(tzinfo=None))
+
+    @unittest.skipUnless(hasattr(time, 'tzset'), "time.tzset is not available")
+    def test_system_time_zone_is_not_used(self):
+        self.addCleanup(time.tzset)
+        with mock.patch.dict(os.environ, {'TZ': 'America/New_York'}):
+            time.tzset()
+            self.assertEqual(timezones.local_to_utc_aware(datetime(2023, 4, 16, 20, 12)),
+                             datetime(2023, 4, 16, 14, 42, tzinfo=timezone.utc))
+
+    def test_utc_to_local(self):
+        utc = datetime(2023, 4, 16, 14, 42)
+        self.assertEqual(timezones.utc_to_local_naive(utc), datetime(2023, 4, 16, 20, 12))
+        self.assertEqual(timezones.utc_to_local_naive(utc.replace(tzinfo=timezone.utc)), datetime(2023, 4, 16, 20, 12))
+        aware = timezones.utc_to_local_aware(utc)
+        self.assertEqual((aware.hour, aware.minute, aware.utcoffset().total_seconds()), (20, 12, 5.5 * 3600))
+
+    def test_local_day_and_month_ranges(self):
+        self.assertEqual(timezones.local_day_range(date(2023, 4, 16)), (
+            datetime(2023, 4, 15, 18, 30, tzinfo=timezone.utc), datetime(2023, 4, 16, 18, 30, tzinfo=timezone.utc)))
+        self.assertEqual(timezones.local_month_range(date(2023, 12, 16)), (
+            datetime(2023, 11, 30, 18, 30, tzinfo=timezone.utc), datetime(2023, 12, 31, 18, 30, tzinfo=timezone.utc)))
+
+    @override_settings(LOCAL_TIME_ZONE='America/New_York')
+    def test_local_time_zone_setting(self):
+        # Daylight saving time is applied by the date
+        self.assertEqual(timezones.local_to_utc_aware(datetime(2023, 1, 1, 12, 0)),
+                         datetime(2023, 1, 1, 17, 0, tzinfo=timezone.utc))
+        self.assertEqual(timezones.local_to_utc_aware(datetime(2023, 7, 1, 12, 0)),
+                         datetime(2023, 7, 1, 16, 0, tzinfo=timezone.utc))
+        self.assertEqual(timezones.local_month_range(date(2023, 3, 5)), (
+            datetime(2023, 3, 1, 5, 0, tzinfo=timezone.utc), datetime(2023, 4, 1, 4, 0, tzinfo=timezone.utc)))
@@ -0,0 +1,115 @@
+"""
+Conversions between UTC (stored in the database) and the local time of
+the deployment (shown to the users).
+
+The local timezone is taken from settings.LOCAL_TIME_ZONE and the
+ZoneInfo object is created once and kept at module level. It is reloaded
+only when the setting changes (eg: override_settings in tests).
+
+Naive datetimes given to the utc_to_* functions are treated as UTC and
+naive datetimes given to the local_to_* functions are treated as local
+time. The local_to_* functions ignore any tzinfo of the input and only use
+its wall-clock time, because form fields return the local time entered by
+the user labeled with the (UTC) current timezone.
+"""
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+UTC = timezone.utc
+DEFAULT_LOCAL_TIME_ZONE = 'Asia/Colombo'
+
+LOCAL_TZ = ZoneInfo(getattr(settings, 'LOCAL_TIME_ZONE', DEFAULT_LOCAL_TIME_ZONE))
+
+
+@receiver(setting_changed)
+def reload_local_tz(*, setting, **kwargs):
+    global LOCAL_TZ
+    if setting == 'LOCAL_TIME_ZONE':
+        LOCAL_TZ = ZoneInfo(getattr(settings, 'LOCAL_TIME_ZONE', DEFAULT_LOCAL_TIME_ZONE))
+
+
+"""===== SINGLE DATETIMES ====="""
+
+
+def utc_to_local_aware(utc_dt: datetime):
+    """
+    Convert UTC datetime object into local timezone.
+    :param utc_dt: UTC datetime object (naive or aware)
+    :return: Aware datetime in local timezone
+    """
+    if utc_dt.tzinfo is None:
+        utc_dt = utc_dt.replace(tzinfo=UTC)
+    return utc_dt.astimezone(LOCAL_TZ)
+
+
+def utc_to_local_naive(utc_dt: datetime):
+    """
+    Convert UTC datetime object into naive local datetime.
+    :param utc_dt: UTC datetime object (naive or aware)
+    :return: Naive datetime in local timezone
+    """
+    if utc_dt.tzinfo is None:
+        utc_dt = utc_dt.replace(tzinfo=UTC)
+    return utc_dt.astimezone(LOCAL_TZ).replace(tzinfo=None)
+
+
+def local_to_utc_aware(local_dt: datetime):
+    """
+    Convert local datetime object into UTC format.
+    :param local_dt: Local datetime object
+    :return: Aware datetime in UTC
+    """
+    return local_dt.replace(tzinfo=LOCAL_TZ).astimezone(UTC)
+
+
+def local_to_utc_naive(local_dt: datetime):
+    return local_dt.replace(tzinfo=LOCAL_TZ).astimezone(UTC).replace(tzinfo=None)
+
+
+def get_naive_dt(dt: datetime):
+    return dt.replace(tzinfo=None)
+
+
+"""===== LOCAL DAYS ====="""
+
+
+def local_now():
+    return datetime.now(LOCAL_TZ)
+
+
+def local_today():
+    """
+    Today's date in the local timezone.
+    """
+    return datetime.now(LOCAL_TZ).date()
+
+
+def local_day_range(day=None):
+    """
+    Returns the (start, end) UTC aware datetimes of a local day,
+    so the day can be filtered in the database as [start, end).
+    :param day: Local date. Defaults to today.
+    :return:
+    """
+    day = day or local_today()
+    start = datetime.combine(day, time.min, tzinfo=LOCAL_TZ)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=LOCAL_TZ)
+    return start.astimezone(UTC), end.astimezone(UTC)
+
+
+def local_month_range(day=None):
+    """
+    Returns the (start, end) UTC aware datetimes of the local month
+    that contains the given day.
+    :param day: Local date. Defaults to today.
+    :return:
+    """
+    day = day or local_today()
+    first = day.replace(day=1)
+    next_first = (first + timedelta(days=32)).replace(day=1)
+    start = datetime.combine(first, time.min, tzinfo=LOCAL_TZ)
+    end = datetime.combine(next_first, time.min, tzinfo=LOCAL_TZ)
+    return start.astimezone(UTC), end.astimezone(UTC)
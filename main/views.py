@@ -5,18 +5,16 @@ from users.models import Student, Lecturer
 def home(request):
     if request.user.is_authenticated:
         profile = request.user.profile
+        summary = profile.dashboard_summary()
 
-        # Generating this month data for the dashboard chart
-        assignments = profile.this_month_assignments()
-        meetings = profile.this_month_meetings()
-        quizzes = profile.this_month_quizzes()
-
+        # This month data for the dashboard chart comes with the summary
         context = {
             'profile': profile,
+            'summary': summary,
             'today_events': profile.today_events()[:8],
-            'assignments': len(assignments),
-            'quizzes': len(quizzes),
-            'meetings': len(meetings),
+            'assignments': summary.month_assignments,
+            'quizzes': summary.month_quizzes,
+            'meetings': summary.month_meetings,
         }
         return render(request, "main/home.html", context=context)
 
@@ -0,0 +1,20 @@
+from django.contrib.auth.backends import ModelBackend
+from .models import CustomizedUser
+
+
+class ProfileBackend(ModelBackend):
+    """
+    <ModelBackend> loading the user of a session together with the student
+    and lecturer profiles (see <ProfileMiddleware>), so the user is read
+    with a single query per request.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = CustomizedUser._default_manager.select_related(
+                'student__department__batch',
+                'lecturer',
+            ).get(pk=user_id)
+        except CustomizedUser.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,41 @@
+from django.db import models
+
+
+def count_subquery(queryset):
+    """
+    Wrap a queryset into a scalar 'SELECT COUNT(*)' subquery, so that
+    several counters can be selected together in a single query.
+    :param queryset: Any queryset
+    :return:
+    """
+    count = models.Func(models.F('pk'), function='COUNT')
+    return models.Subquery(
+        queryset.order_by().annotate(_count=count).values('_count'),
+        output_field=models.IntegerField(),
+    )
+
+
+class DashboardSummary:
+    """
+    All the dashboard counters of a profile (<Student> or <Lecturer>).
+
+    Every counter is the count of one of the profile helper querysets,
+    so the numbers always match the list pages. All of them are fetched
+    with a single query, each counter being a COUNT subquery.
+
+    Counters are accessible as attributes, ex: summary.pending_assignments
+    """
+
+    def __init__(self, profile, counters: dict):
+        """
+        :param profile: <Student> or <Lecturer> instance
+        :param counters: Mapping of counter name to queryset
+        """
+        subqueries = {name: count_subquery(qs) for name, qs in counters.items()}
+        row = type(profile).objects.filter(pk=profile.pk)\
+            .annotate(**subqueries).values(*counters).get()
+        self.counters = row
+        self.__dict__.update(row)
+
+    def __repr__(self):
+        return f"<DashboardSummary: {self.counters}>"
@@ -0,0 +1,155 @@
+"""
+Background thumbnail generation for profile and ID pictures.
+
+When a profile is saved with a new image, resizing is scheduled on a
+background thread (after the transaction commits) instead of being done
+inside the request. Each image gets a JPEG/PNG and a WebP version for
+every size in THUMBNAIL_SIZES. Paths of the generated files are stored
+in the 'thumbnails' JSON field of the profile:
+
+    {'profile_pic': {'64': 'thumbs/...-64.jpg', '64.webp': 'thumbs/...-64.webp', ...}}
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from PIL import Image
+from PIL import UnidentifiedImageError
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from main.caching import bump_version
+
+# name -> max width and height in pixels
+THUMBNAIL_SIZES = {
+    'small': 64,    # lists (people, submissions, navbar)
+    'medium': 250,  # profile page
+}
+
+# Single worker: thumbnails of a profile are never written concurrently.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnails')
+
+
+class Thumbnail:
+    def __init__(self, url, webp_url=None):
+        self.url = url
+        self.webp_url = webp_url
+
+
+class ThumbnailsMixin:
+    """
+    Used by the profile models (<Student>, <Lecturer>) that have a
+    'thumbnails' JSON field. Keeps track of the image field values loaded
+    from the database, to detect the images that actually changed.
+    """
+    image_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_images = {
+            f: getattr(instance, f).name for f in cls.image_fields if f in field_names}
+        return instance
+
+    def save(self, *args, **kwargs):
+        changed = self.get_changed_images()
+        super().save(*args, **kwargs)
+
+        self._loaded_images = {f: getattr(self, f).name for f in self.image_fields}
+        if changed:
+            self.schedule_thumbnails(changed)
+
+    def get_changed_images(self) -> list:
+        loaded = getattr(self, '_loaded_images', {})
+        deferred = self.get_deferred_fields()
+        return [f for f in self.image_fields if f not in deferred
+                and getattr(self, f).name and getattr(self, f).name != loaded.get(f)]
+
+    def get_thumbnail(self, field, size) -> Thumbnail:
+        """
+        Thumbnail of an image field, falls back to the original
+        image if the thumbnail is not (yet) available.
+        """
+        image = getattr(self, field)
+        paths = (self.thumbnails or {}).get(field, {})
+        px = str(THUMBNAIL_SIZES[size])
+
+        if px not in paths:
+            return Thumbnail(image.url if image else '')
+        webp = paths.get(f"{px}.webp")
+        return Thumbnail(image.storage.url(paths[px]),
+                         image.storage.url(webp) if webp else None)
+
+    @classmethod
+    def get_referenced_files(cls):
+        """
+        Names of the thumbnails of all the profiles. Used by the orphaned
+        media collector (main/media_gc.py), since they are not file fields.
+        """
+        for thumbnails in cls._base_manager.values_list('thumbnails', flat=True).iterator():
+            for paths in (thumbnails or {}).values():
+                yield from paths.values()
+
+    def schedule_thumbnails(self, fields):
+        """
+        Generate thumbnails of the given image fields in the background,
+        once the current transaction is committed.
+        """
+        model, pk = type(self), self.pk
+        transaction.on_commit(lambda: _executor.submit(_run, model, pk, list(fields)))
+
+
+def _run(model, pk, fields):
+    try:
+        generate_thumbnails(model, pk, fields)
+    except Exception as e:
+        print(f"Error when generating thumbnails: {e}")
+    finally:
+        connection.close()  # Connection of this worker thread
+
+
+def _resize(im: Image.Image, px: int, fmt: str) -> ContentFile:
+    thumb = im.copy()
+    thumb.thumbnail((px, px))
+    if fmt == 'JPEG' and thumb.mode not in ('RGB', 'L'):
+        thumb = thumb.convert('RGB')
+    buffer = BytesIO()
+    thumb.save(buffer, format=fmt)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_thumbnails(model, pk, fields):
+    """
+    Create all the thumbnails of the given image fields of a profile
+    and store their paths. Previous thumbnails of the fields are deleted.
+    """
+    profile = model.objects.filter(pk=pk).first()
+    if profile is None:
+        return
+
+    thumbnails = dict(profile.thumbnails or {})
+    for field in fields:
+        image = getattr(profile, field)
+        try:
+            with image.open('rb') as f:
+                im = Image.open(f)
+                im.load()
+        except (ValueError, FileNotFoundError):  # No file associated
+            continue
+        except UnidentifiedImageError:
+            print("Unidentified Image. Probably someone is trying to sign in with svg")
+            continue
+
+        name, ext = os.path.splitext(image.name)
+        fmt = 'PNG' if ext.lower() == '.png' else 'JPEG'
+        paths = {}
+        for px in THUMBNAIL_SIZES.values():
+            base = f"thumbs/{name}-{px}"
+            paths[str(px)] = image.storage.save(
+                f"{base}{'.png' if fmt == 'PNG' else '.jpg'}", _resize(im, px, fmt))
+            paths[f"{px}.webp"] = image.storage.save(f"{base}.webp", _resize(im, px, 'WEBP'))
+
+        for old in thumbnails.get(field, {}).values():
+            image.storage.delete(old)
+        thumbnails[field] = paths
+
+    model.objects.filter(pk=pk).update(thumbnails=thumbnails)
+    bump_version('people')  # Cached people lists show the thumbnails
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from users.images import generate_thumbnails
+from users.models import Student, Lecturer
+
+
+class Command(BaseCommand):
+    help = "Generate the profile and ID picture thumbnails of all the profiles. " \
+           "Use for images uploaded before thumbnails were introduced."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true',
+                            help="Only the profiles without thumbnails")
+
+    def handle(self, *args, **options):
+        for model in (Student, Lecturer):
+            profiles = model.objects.all()
+            if options['missing']:
+                profiles = profiles.filter(thumbnails={})
+
+            count = 0
+            for pk in profiles.values_list('pk', flat=True).iterator():
+                generate_thumbnails(model, pk, model.image_fields)
+                count += 1
+            self.stdout.write(self.style.SUCCESS(
+                f"Processed {count} {model.__name__.lower()} profiles"))
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from users.stats import BATCH_SIZE, rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Compute the statistics of all the students and lecturers again. " \
+           "Run once after the first migration, the statistics are updated automatically afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help="Profiles computed per query")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        students, lecturers = rebuild_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed the statistics of {students} students and {lecturers} lecturers "
+            f"in {time.perf_counter() - started:.1f}s"))
@@ -0,0 +1,31 @@
+from django.contrib import auth
+from django.utils.functional import SimpleLazyObject
+
+
+def get_user(request):
+    """
+    Same as the one used by django's <AuthenticationMiddleware>, but the
+    role and the profile are resolved once. The user is loaded together
+    with the student and lecturer profiles by <ProfileBackend>, so the role
+    and profile checks done by views and templates do not hit the database
+    again.
+    """
+    if not hasattr(request, '_cached_user'):
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            user.resolve_profile()
+        request._cached_user = user
+    return request._cached_user
+
+
+class ProfileMiddleware:
+    """
+    Resolve the role and the profile of the requesting user once per request.
+    Must be placed after <AuthenticationMiddleware>.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        return self.get_response(request)
@@ -0,0 +1,44 @@
+# Generated by Django 4.1.7 on 2026-10-18 02:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_profile_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturerStats',
+            fields=[
+                ('lecturer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='users.lecturer')),
+                ('assignments', models.PositiveIntegerField(default=0)),
+                ('submissions', models.PositiveIntegerField(default=0)),
+                ('late_submissions', models.PositiveIntegerField(default=0)),
+                ('graded_submissions', models.PositiveIntegerField(default=0)),
+                ('quizzes', models.PositiveIntegerField(default=0)),
+                ('quiz_responses', models.PositiveIntegerField(default=0)),
+                ('quiz_average', models.FloatField(null=True)),
+                ('trend', models.JSONField(default=dict)),
+                ('_date_updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StudentStats',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='users.student')),
+                ('assignments', models.PositiveIntegerField(default=0)),
+                ('submissions', models.PositiveIntegerField(default=0)),
+                ('late_submissions', models.PositiveIntegerField(default=0)),
+                ('graded_submissions', models.PositiveIntegerField(default=0)),
+                ('quizzes', models.PositiveIntegerField(default=0)),
+                ('quiz_responses', models.PositiveIntegerField(default=0)),
+                ('quiz_average', models.FloatField(null=True)),
+                ('trend', models.JSONField(default=dict)),
+                ('_date_updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
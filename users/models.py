@@ -1,33 +1,32 @@
 
-from datetime import datetime
-from PIL import Image
-from PIL import UnidentifiedImageError
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from main.models import Batch, Department
-from main.funcs import (utc_to_local_naive,
-                        utc_to_local_aware,
-                        local_to_utc_naive,
-                        local_to_utc_aware,
-                        get_naive_dt)
+from .dashboard import DashboardSummary
+from .images import ThumbnailsMixin
+from main.timezones import (utc_to_local_naive,
+                            utc_to_local_aware,
+                            local_to_utc_naive,
+                            local_to_utc_aware,
+                            get_naive_dt,
+                            local_day_range)
 
 
 class CustomizedUser(AbstractUser):
     email = models.EmailField(unique=True, null=False)
     gender = models.CharField(max_length=6)
 
+    # (role, profile) tuple, filled by <resolve_profile>
+    _resolved_profile = None
+
     def __str__(self):
         username = "Administrator" if self.is_superuser else self.username
         return f"{username} [ {self.email} ]"
 
     @property
     def role(self):
-        if self.is_superuser:
-            return 'superuser'
-        elif Student.objects.filter(user=self).count() != 0:
-            return 'student'
-        elif Lecturer.objects.filter(user=self).count() != 0:
-            return 'lecturer'
+        return self.resolve_profile()[0]
 
     @property
     def is_lecturer(self):
@@ -48,49 +47,62 @@ class CustomizedUser(AbstractUser):
         Profile can only be <Student> or <Lecturer> instance.
         :return:
         """
-        profile = None
-        if self.role == 'student':
-            profile = Student.objects.get(user=self)
-        elif self.role == 'lecturer':
-            profile = Lecturer.objects.get(user=self)
-        else:
-            # This should never happen
-            print("Undetected Role")
-        return profile
-
-
-class Student(models.Model):
+        return self.resolve_profile()[1]
+
+    def resolve_profile(self):
+        """
+        Work out the role and the profile of the user only once and keep
+        them on the instance. Reverse one-to-one relations are used, so if
+        the user was loaded with select_related('student', 'lecturer')
+        (see <ProfileMiddleware>) no further queries are made.
+        :return: (role, profile) tuple
+        """
+        if self._resolved_profile is None:
+            role, profile = None, None
+            if self.is_superuser:
+                role = 'superuser'
+            else:
+                try:
+                    profile = self.student
+                    role = 'student'
+                except Student.DoesNotExist:
+                    try:
+                        profile = self.lecturer
+                        role = 'lecturer'
+                    except Lecturer.DoesNotExist:
+                        pass
+
+            if profile is None:
+                # This should never happen
+                print("Undetected Role")
+            self._resolved_profile = (role, profile)
+        return self._resolved_profile
+
+    def refresh_from_db(self, using=None, fields=None):
+        self._resolved_profile = None
+        super().refresh_from_db(using=using, fields=fields)
+
+
+class Student(ThumbnailsMixin, models.Model):
     user = models.OneToOneField(CustomizedUser, on_delete=models.CASCADE, related_name='student')
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
     profile_pic = models.ImageField(null=True, upload_to="stu_profile_pics")
     id_pic = models.ImageField(null=True, blank=True, upload_to="stu_id_pics")
     reg_no = models.CharField(max_length=13, default="")
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False)
+
+    image_fields = ('profile_pic', 'id_pic')
 
     def __str__(self):
         return f"Student: {self.user.username} [{self.department.name}]"
 
-    def save(self,
-             force_insert=False,
-             force_update=False,
-             using=None,
-             update_fields=None):
-        super().save()
-
-        images = [self.profile_pic, self.id_pic]
-
-        output_size = (250, 250)
-        for img in images:
-            try:
-                im = Image.open(img.path)
-
-                if im.height > 250 or im.width > 250:
-                    im.thumbnail(output_size)
-                    im.save(img.path)
-            except ValueError:  # No file associated
-                continue
-            except UnidentifiedImageError:
-                print("Unidentified Image. Probably someone is trying to sign in with svg")
-                continue
+    @property
+    def profile_pic_small(self):
+        return self.get_thumbnail('profile_pic', 'small')
+
+    @property
+    def profile_pic_medium(self):
+        return self.get_thumbnail('profile_pic', 'medium')
 
     """
     =============================
@@ -98,60 +110,50 @@ class Student(models.Model):
     =============================
     """
 
-    def __get_all_not_completed_assignments(self) -> set:
+    def __get_all_not_completed_assignments(self):
         """
         Returns all the not done assignments including,
-        both pending and missing assignments
+        both pending and missing assignments.
+        Anti-joined against the student's submissions in the database.
         :return:
         """
-        _all_ass = self.__get_all_assignments()
-        _all_sub = set(ass for ass in self.get_all_completed_assignments())
-        not_done = set(ass for ass in _all_ass if ass not in _all_sub)
-        return not_done
+        return self.__get_all_assignments().not_submitted_by(self)
 
-    def get_pending_assignments(self) -> set:
+    def get_pending_assignments(self):
         """
         Returns all the assignments that due date is not exceeded.
         :return:
         """
         not_complete = self.__get_all_not_completed_assignments()
-        now = datetime.now()
-        pending = set(ass for ass in not_complete if ass.date_due > now)
-        return pending
+        return not_complete.ongoing().order_by('_date_due')
 
     def get_no_of_pending_assignments(self):
-        return len(self.get_pending_assignments())
+        return self.get_pending_assignments().count()
 
     def today_assignments(self):
-        today = set()
-        for a in self.get_pending_assignments():
-            if a.date_due.date() == datetime.today().date():
-                today.add(a)
-        return today
+        start, end = local_day_range()
+        return self.get_pending_assignments().filter(_date_due__lt=end)
 
     def get_all_completed_assignments(self):
         """
-        Get all the assignment submissions done by the student
+        Get all the assignments submitted by the student
         for all the available classes.
-        Note that this returns <Submission> queryset
+        Note that this returns <Assignment> queryset
         :return:
         """
-        submissions = [sub.assignment for sub in self.submission_set.all()]
-        return submissions
+        return self.__get_all_assignments().submitted_by(self).order_by('-_date_due')
 
-    def get_missing_assignments(self) -> set:
+    def get_missing_assignments(self):
         """
         Returns all the assignments that didn't completed and also
         due date is exceeded.
         :return:
         """
         not_complete = self.__get_all_not_completed_assignments()
-        now = datetime.now()
-        missing = set(ass for ass in not_complete if ass.date_due < now)
-        return missing
+        return not_complete.expired().order_by('-_date_due')
 
     def get_no_of_missing_assignments(self):
-        return len(self.get_missing_assignments())
+        return self.get_missing_assignments().count()
 
     def __get_all_assignments(self):
         """
@@ -159,14 +161,8 @@ class Student(models.Model):
         available for the student.
         :return:
         """
-        classes = self.get_classrooms()
-        assignments = set()
-
-        for cls in classes:
-            _all_ass = [ass for ass in cls.assignment_set.all()]
-            for ass in _all_ass:
-                assignments.add(ass)
-        return assignments
+        from classrooms.models import Assignment
+        return Assignment.objects.for_department(self.department_id)
 
     """
     =============================
@@ -196,52 +192,28 @@ class Student(models.Model):
         Returns all the meetings ever for the student.
         :return:
         """
-        classes = self.get_classrooms()
-        _all = set()
-
-        for cls in classes:
-            meets = cls.meeting_set.all()
-            for meet in meets:
-                _all.add(meet)
-        return _all
+        from classrooms.models import Meeting
+        return Meeting.objects.for_department(self.department_id)
 
     def get_today_meetings(self):
         """
         Get all the today meetings.
         :return:
         """
-        _all = self.get_all_meetings()
-        today = set()
-
-        for meet in _all:
-            if meet.is_today:
-                today.add(meet)
-        return today
+        return self.get_all_meetings().today().order_by('_start')
 
     def get_no_of_today_meetings(self):
-        return len(self.get_today_meetings())
+        return self.get_today_meetings().count()
 
     def get_upcoming_meetings(self):
         """
         Get all the upcoming meetings except today
         :return:
         """
-        _all = self.get_all_meetings()
-        upcoming = set()
-
-        for meet in _all:
-            if meet.start.date() > datetime.now().date():
-                upcoming.add(meet)
-        return upcoming
+        return self.get_all_meetings().upcoming().order_by('_start')
 
     def get_prev_meetings(self):
-        _all = self.get_all_meetings()
-        prev = set()
-
-        for meet in _all:
-            if meet.is_expired:
-                prev.add(meet)
-        return prev
+        return self.get_all_meetings().previous().order_by('-_start')
 
     """
     =============================
@@ -255,64 +227,28 @@ class Student(models.Model):
         available for the student.
         :return:
         """
-        classes = self.get_classrooms()
-        quizzes = set()
-
-        for cls in classes:
-            _all_ass = [q for q in cls.quiz_set.all()]
-            for ass in _all_ass:
-                quizzes.add(ass)
-        return quizzes
+        from classrooms.models import Quiz
+        return Quiz.objects.for_department(self.department_id)
 
     def get_today_quizzes(self):
-        today = set()
-
-        for q in self._get_all_quizzes():
-            if q.start.date() == datetime.today().date():
-                today.add(q)
-        return today
+        return self._get_all_quizzes().today().order_by('_start')
 
     def get_no_of_today_quizzes(self):
-        return len(self.get_today_quizzes())
+        return self.get_today_quizzes().count()
 
     def get_upcoming_quizzes(self):
-        upcoming = set()
-
-        for q in self._get_all_quizzes():
-            if q.start.date() > datetime.today().date():
-                upcoming.add(q)
-        return upcoming
+        return self._get_all_quizzes().upcoming().order_by('_start')
 
     def expired_quizzes(self):
-        expired = set()
-        for q in self._get_all_quizzes():
-            if q.expired:
-                expired.add(q)
-        return expired
+        return self._get_all_quizzes().expired()
 
     def get_missing_quizzes(self):
-        missing = set()
-        for q in self.expired_quizzes():
-            # check if a response has been made for the quiz or not
-            from classrooms.models import QuizStudentResponse
-            response = QuizStudentResponse.objects.filter(
-                quiz=q,
-                owner=self).first()
-            if not response:
-                missing.add(q)
-        return missing
+        # check if a response has been made for the quiz or not
+        return self.expired_quizzes().not_responded_by(self).order_by('-_start')
 
     def get_completed_quizzes(self):
-        done = set()
-        for q in self.expired_quizzes():
-            # check if a response has been made for the quiz or not
-            from classrooms.models import QuizStudentResponse
-            response = QuizStudentResponse.objects.filter(
-                quiz=q,
-                owner=self).first()
-            if response:
-                done.add(q)
-        return done
+        # check if a response has been made for the quiz or not
+        return self.expired_quizzes().responded_by(self).order_by('-_start')
 
     """
     =============================
@@ -324,77 +260,67 @@ class Student(models.Model):
         """
         Get a list of most recent events for a student
         """
-        events = set()
-        events.update(self.today_assignments())
-        events.update(self.get_today_meetings())
-        events.update(self.get_today_quizzes())
-        return list(events)
+        events = list(self.today_assignments())
+        events.extend(self.get_today_meetings())
+        events.extend(self.get_today_quizzes())
+        return events
+
+    def dashboard_summary(self) -> DashboardSummary:
+        """
+        All the dashboard counters computed with a single query.
+        """
+        return DashboardSummary(self, {
+            'classes': self.get_classrooms(),
+            'pending_assignments': self.get_pending_assignments(),
+            'missing_assignments': self.get_missing_assignments(),
+            'today_quizzes': self.get_today_quizzes(),
+            'missing_quizzes': self.get_missing_quizzes(),
+            'today_meetings': self.get_today_meetings(),
+            'month_assignments': self.this_month_assignments(),
+            'month_quizzes': self.this_month_quizzes(),
+            'month_meetings': self.this_month_meetings(),
+        })
 
     def this_month_assignments(self):
         """
         Current month's assignments are taken based on the
         due_date instead of created data
         """
-        today = datetime.today().date()
-        assignments = set()
-        for ass in self.__get_all_assignments():
-            if ass.date_due.date().year == today.year \
-                    and ass.date_due.date().month == today.month:
-                assignments.add(ass)
-        return assignments
+        return self.__get_all_assignments().in_month()
 
     def this_month_quizzes(self):
         """
         Current month's quizzes are taken based on the
         start date instead of created data
         """
-        today = datetime.today().date()
-        quizzes = set()
-        for quiz in self._get_all_quizzes():
-            if quiz.start.date().year == today.year \
-                    and quiz.start.date().month == today.month:
-                quizzes.add(quiz)
-        return quizzes
+        return self._get_all_quizzes().in_month()
 
     def this_month_meetings(self):
         """
         Current month's assignments are taken based on the
         start date instead of created data
         """
-        today = datetime.today().date()
-        meetings = set()
-        for meet in self.get_all_meetings():
-            if meet.start.date().year == today.year \
-                    and meet.start.date().month == today.month:
-                meetings.add(meet)
-        return meetings
+        return self.get_all_meetings().in_month()
 
 
-class Lecturer(models.Model):
+class Lecturer(ThumbnailsMixin, models.Model):
     user = models.OneToOneField(CustomizedUser, on_delete=models.CASCADE, related_name='lecturer')
     departments = models.ManyToManyField(Department, blank=True)
     profile_pic = models.ImageField(null=True, blank=True, upload_to="lec_profile_pics")
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False)
+
+    image_fields = ('profile_pic',)
 
     def __str__(self):
         return f"Lecturer: {self.user.username}"
 
-    def save(self,
-             force_insert=False,
-             force_update=False,
-             using=None,
-             update_fields=None):
-        super().save()
-
-        output_size = (250, 250)
-        try:
-            img = Image.open(self.profile_pic.path)
-            if img.height > 250 or img.width > 250:
-                img.thumbnail(output_size)
-                img.save(self.profile_pic.path)
-        except ValueError:  # No file associated
-            pass
-        except UnidentifiedImageError:
-            print("Unidentified Image. Probably someone is trying to sign in with svg")
+    @property
+    def profile_pic_small(self):
+        return self.get_thumbnail('profile_pic', 'small')
+
+    @property
+    def profile_pic_medium(self):
+        return self.get_thumbnail('profile_pic', 'medium')
 
     """
     =============================
@@ -442,12 +368,8 @@ class Lecturer(models.Model):
         Get all the assignments that due date has not exceeded.
         :return:
         """
-        ongoing = set()
-        for a in self.get_all_assignments():
-            if a.date_due >= datetime.now() \
-                    and not a.review_complete:
-                ongoing.add(a)
-        return ongoing
+        return self.get_all_assignments().ongoing().filter(
+            review_complete=False).order_by('_date_due')
 
     def get_no_of_ongoing_assignments(self):
         return self.get_ongoing_assignments().count()
@@ -459,21 +381,17 @@ class Lecturer(models.Model):
         by using <Assignment> model's boolean attribute 'review_complete'.
         :return:
         """
-        _all = self.get_all_assignments()
-        pending_review = set(ass for ass in _all
-                             if not ass.review_complete
-                             and ass.date_due < datetime.now())
-        return pending_review
+        return self.get_all_assignments().pending_review().order_by('-_date_due')
 
     def get_no_of_pending_review_assignments(self):
-        return len(self.get_pending_review_assignments())
+        return self.get_pending_review_assignments().count()
 
     def get_reviewed_assignments(self):
         """
         Returns all the review completed assignments
         :return:
         """
-        return set(ass for ass in self.get_all_assignments() if ass.review_complete)
+        return self.get_all_assignments().reviewed().order_by('-_date_due')
 
     def get_recent_activities(self):
         pass
@@ -496,38 +414,20 @@ class Lecturer(models.Model):
         Get all the today meetings.
         :return:
         """
-        _all = self.get_all_meetings()
-        today = set()
-
-        for meet in _all:
-            if meet.is_today:
-                today.add(meet)
-        return today
+        return self.get_all_meetings().today().order_by('_start')
 
     def get_no_of_today_meetings(self):
-        return len(self.get_today_meetings())
+        return self.get_today_meetings().count()
 
     def get_upcoming_meetings(self):
         """
         Get all the upcoming meetings except today
         :return:
         """
-        _all = self.get_all_meetings()
-        upcoming = set()
-
-        for meet in _all:
-            if meet.start.date() > datetime.today().date():
-                upcoming.add(meet)
-        return upcoming
+        return self.get_all_meetings().upcoming().order_by('_start')
 
     def get_prev_meetings(self):
-        _all = self.get_all_meetings()
-        prev = set()
-
-        for meet in _all:
-            if meet.start.date() < datetime.today().date():
-                prev.add(meet)
-        return prev
+        return self.get_all_meetings().previous().order_by('-_start')
 
     """
     =============================
@@ -540,30 +440,16 @@ class Lecturer(models.Model):
         return quizzes
 
     def get_today_quizzes(self):
-        today = set()
-
-        for q in self._get_all_quizzes():
-            if q.start.date() == datetime.today().date():
-                today.add(q)
-        return today
+        return self._get_all_quizzes().today().order_by('_start')
 
     def get_no_of_today_quizzes(self):
-        return len(self.get_today_quizzes())
+        return self.get_today_quizzes().count()
 
     def get_upcoming_quizzes(self):
-        upcoming = set()
-
-        for q in self._get_all_quizzes():
-            if q.start.date() > datetime.today().date():
-                upcoming.add(q)
-        return upcoming
+        return self._get_all_quizzes().upcoming().order_by('_start')
 
     def get_previous_quizzes(self):
-        done = set()
-        for q in self._get_all_quizzes():
-            if q.expired:
-                done.add(q)
-        return done
+        return self._get_all_quizzes().expired().order_by('-_start')
 
     """
     =============================
@@ -575,34 +461,111 @@ class Lecturer(models.Model):
         """
         Get a list of most recent events for a lecturer
         """
-        events = set()
-        events.update(self.get_today_meetings())
-        events.update(self.get_today_quizzes())
-        return list(events)
+        events = list(self.get_today_meetings())
+        events.extend(self.get_today_quizzes())
+        return events
+
+    def dashboard_summary(self) -> DashboardSummary:
+        """
+        All the dashboard counters computed with a single query.
+        """
+        return DashboardSummary(self, {
+            'classes': self.get_classrooms(),
+            'pending_review_assignments': self.get_pending_review_assignments(),
+            'today_quizzes': self.get_today_quizzes(),
+            'today_meetings': self.get_today_meetings(),
+            'month_assignments': self.this_month_assignments(),
+            'month_quizzes': self.this_month_quizzes(),
+            'month_meetings': self.this_month_meetings(),
+        })
 
     def this_month_assignments(self):
-        today = datetime.today().date()
-        return self.assignment_set.filter(
-            _date_due__year=today.year,
-            _date_due__month=today.month,
-        )
+        return self.assignment_set.in_month()
 
     def this_month_quizzes(self):
         """
         Current month's quizzes are taken based on the
         start date instead of created data
         """
-        today = datetime.today().date()
-        return self.quiz_set.filter(
-            _start__year=today.year,
-            _start__month=today.month,)
+        return self.quiz_set.in_month()
 
     def this_month_meetings(self):
         """
         Current month's assignments are taken based on the
         start date instead of created data
         """
-        today = datetime.today().date()
-        return self.meeting_set.filter(
-            _start__year=today.year,
-            _start__month=today.month,)
+        return self.meeting_set.in_month()
+
+
+"""
+=============================
+STATISTICS
+=============================
+"""
+
+
+class StudentStats(models.Model):
+    """
+    Statistics of a student, kept up to date by users/stats.py when the
+    submissions, grades and quiz responses change.
+    """
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    assignments = models.PositiveIntegerField(default=0)    # Assignments of the department
+    submissions = models.PositiveIntegerField(default=0)
+    late_submissions = models.PositiveIntegerField(default=0)
+    graded_submissions = models.PositiveIntegerField(default=0)
+    quizzes = models.PositiveIntegerField(default=0)        # Quizzes of the department
+    quiz_responses = models.PositiveIntegerField(default=0)
+    quiz_average = models.FloatField(null=True)
+    trend = models.JSONField(default=dict)      # Monthly values, see stats.get_trends
+    _date_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Statistics of {self.student}"
+
+    @property
+    def completion_rate(self):
+        return _percentage(self.submissions, self.assignments)
+
+    @property
+    def late_rate(self):
+        return _percentage(self.late_submissions, self.submissions)
+
+    @property
+    def quiz_response_rate(self):
+        return _percentage(self.quiz_responses, self.quizzes)
+
+
+class LecturerStats(models.Model):
+    """
+    Statistics of the assignments and quizzes created by a lecturer.
+    """
+    lecturer = models.OneToOneField(Lecturer, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    assignments = models.PositiveIntegerField(default=0)
+    submissions = models.PositiveIntegerField(default=0)
+    late_submissions = models.PositiveIntegerField(default=0)
+    graded_submissions = models.PositiveIntegerField(default=0)
+    quizzes = models.PositiveIntegerField(default=0)
+    quiz_responses = models.PositiveIntegerField(default=0)
+    quiz_average = models.FloatField(null=True)
+    trend = models.JSONField(default=dict)
+    _date_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Statistics of {self.lecturer}"
+
+    @property
+    def late_rate(self):
+        return _percentage(self.late_submissions, self.submissions)
+
+    @property
+    def graded_rate(self):
+        return _percentage(self.graded_submissions, self.submissions)
+
+    @property
+    def not_graded_submissions(self):
+        return self.submissions - self.graded_submissions
+
+
+def _percentage(part, total):
+    return round(part / total * 100, 1) if total else None
@@ -1,7 +1,10 @@
-from django.db.models.signals import post_delete, pre_delete
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from typing import Union
-from .models import Lecturer, Student
+from classrooms.models import Assignment, Classroom, Quiz, QuizStudentResponse, Submission
+from main.caching import bump_version
+from .models import CustomizedUser, Lecturer, Student
+from .stats import schedule_refresh
 
 
 @receiver(post_delete, sender=Lecturer)
@@ -20,3 +23,67 @@ def delete_user(sender, instance, **kwargs):
             print(f"Error when deleting Lecturer's <User> instance: {e}")
 
 
+@receiver(post_save, sender=CustomizedUser)
+@receiver(post_delete, sender=CustomizedUser)
+@receiver(post_save, sender=Lecturer)
+@receiver(post_delete, sender=Lecturer)
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def profile_changed(sender, instance, **kwargs):
+    """
+    Names and pictures are shown in the cached people lists of
+    the classrooms. Logins (last_login updates) are ignored.
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_version('people')
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Assignments and quizzes of the student depend on the department.
+    Rows of new students are computed when they are first read.
+    """
+    if not created and (not update_fields or 'department' in update_fields):
+        schedule_refresh(students=[instance.pk])
+
+
+@receiver(post_save, sender=Submission)
+@receiver(post_delete, sender=Submission)
+def submission_changed(sender, instance, **kwargs):
+    """
+    Submitted, graded or unsubmitted. Statistics of the student and
+    the owner of the assignment are refreshed after the commit.
+    """
+    schedule_refresh(students=[instance.owner_id], assignments=[instance.assignment_id])
+
+
+@receiver(post_save, sender=QuizStudentResponse)
+@receiver(post_delete, sender=QuizStudentResponse)
+def quiz_response_changed(sender, instance, **kwargs):
+    schedule_refresh(students=[instance.owner_id], quizzes=[instance.quiz_id])
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def class_work_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    No of assignments and quizzes of all the students in the department.
+    Late submissions are counted again when an assignment is edited (due
+    date). Editing a quiz does not change the statistics.
+    """
+    if kwargs['signal'] is post_save and not created:
+        if sender is Quiz or (update_fields and '_date_due' not in update_fields):
+            return
+    schedule_refresh(classrooms=[instance.classroom_id], lecturers=[instance.owner_id])
+
+
+@receiver(post_delete, sender=Classroom)
+def classroom_deleted(sender, instance, **kwargs):
+    # The assignments and the quizzes are deleted with the classroom
+    schedule_refresh(departments=[instance.department_id])
+
@@ -0,0 +1,281 @@
+"""
+Statistics of the students and the lecturers (<StudentStats>, <LecturerStats>).
+
+Rates, averages and monthly trends are computed from the submissions and
+the quiz responses, which is too slow to do on every visit of the
+statistics page. Instead, the rows of the affected profiles are computed
+again when the data changes:
+
+    Submission saved/deleted (also grades)  -> student, assignment owner
+    QuizStudentResponse saved/deleted       -> student, quiz owner
+    Assignment/Quiz created/deleted         -> students of the department, owner
+    Classroom deleted                       -> students of the department
+
+The signal handlers only collect the ids with schedule_refresh (no
+queries) and the rows are refreshed once, after the transaction is
+committed, so a cascade delete refreshes each profile once. Rows of many
+profiles are computed with a single query (COUNT/AVG subqueries per
+profile) and written with a single upsert.
+
+Bulk operations (bulk_update of grades and scores) send no signals and
+call schedule_refresh by themselves. Use the 'rebuild_stats' command to
+compute all the rows again.
+
+Trends are saved by month ('YYYY-MM') and the months of the chart are
+chosen when it is read, so a row that is not updated for a while still
+shows the last TREND_MONTHS months.
+"""
+import logging
+from datetime import datetime, timedelta
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Avg, Count, F, FloatField, Func, OuterRef, Q, Subquery
+from django.db.models.functions import TruncMonth
+from main import timezones
+from .dashboard import count_subquery
+from .models import Lecturer, LecturerStats, Student, StudentStats
+
+TREND_MONTHS = 6
+BATCH_SIZE = 500      # Profiles computed per query
+CHART_TIMEOUT = 60 * 60 * 24
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingRefresh:
+    """
+    Ids collected during a transaction, refreshed on commit.
+    """
+
+    def __init__(self):
+        self.ids = {key: set() for key in ('students', 'lecturers', 'departments', 'classrooms', 'assignments', 'quizzes')}
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        refresh(**self.ids)
+
+
+def schedule_refresh(**ids):
+    """
+    Refresh the statistics after the current transaction is committed
+    (immediately if there is no transaction).
+    :param ids: students, lecturers, departments and classrooms (all the
+                students), assignments and quizzes (owners) -> iterables of ids
+    """
+    conn = transaction.get_connection()
+    pending = getattr(conn, '_pending_stats_refresh', None)
+    # A new one is needed after the last one was run or discarded by a rollback
+    registered = pending is not None and not pending.done and \
+        any(entry[1] is pending for entry in conn.run_on_commit)
+    if not registered:
+        pending = conn._pending_stats_refresh = _PendingRefresh()
+
+    for key, values in ids.items():
+        pending.ids[key].update(value for value in values if value is not None)
+    if not registered:
+        transaction.on_commit(pending)
+
+
+def refresh(students=(), lecturers=(), departments=(), classrooms=(), assignments=(), quizzes=()):
+    from classrooms.models import Assignment, Classroom, Quiz
+
+    students, lecturers, departments = set(students), set(lecturers), set(departments)
+    if classrooms:
+        departments.update(Classroom.objects.filter(pk__in=classrooms).values_list('department_id', flat=True))
+    if departments:
+        students.update(Student.objects.filter(department_id__in=departments).values_list('pk', flat=True))
+    if assignments:
+        lecturers.update(Assignment.objects.filter(pk__in=assignments).values_list('owner_id', flat=True))
+    if quizzes:
+        lecturers.update(Quiz.objects.filter(pk__in=quizzes).values_list('owner_id', flat=True))
+
+    try:
+        for batch in _batches(students):
+            refresh_student_stats(batch)
+        for batch in _batches(lecturers):
+            refresh_lecturer_stats(batch)
+    except DatabaseError:
+        # Statistics must not break the request. They are fixed by the next change or by 'rebuild_stats'
+        logger.exception("Error when refreshing statistics")
+
+
+def _batches(ids, size=BATCH_SIZE):
+    ids = sorted(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def rebuild_all(batch_size=BATCH_SIZE) -> tuple:
+    """
+    Compute the statistics of all the profiles again.
+    :return: (no of students, no of lecturers)
+    """
+    students = list(Student.objects.values_list('pk', flat=True))
+    lecturers = list(Lecturer.objects.values_list('pk', flat=True))
+    for batch in _batches(students, batch_size):
+        refresh_student_stats(batch)
+    for batch in _batches(lecturers, batch_size):
+        refresh_lecturer_stats(batch)
+    return len(students), len(lecturers)
+
+
+"""===== COMPUTING ====="""
+
+
+def avg_subquery(queryset, field):
+    """
+    Scalar 'SELECT AVG(field)' subquery, like <count_subquery>.
+    """
+    avg = Func(F(field), function='AVG', output_field=FloatField())
+    return Subquery(queryset.order_by().annotate(_avg=avg).values('_avg'), output_field=FloatField())
+
+
+def _trend_months():
+    """
+    :return: (UTC start of the first month, 'YYYY-MM' of the last TREND_MONTHS months)
+    """
+    first = timezones.local_today().replace(day=1)
+    months = [first]
+    for _ in range(TREND_MONTHS - 1):
+        months.insert(0, (months[0] - timedelta(days=1)).replace(day=1))
+    start, _ = timezones.local_month_range(months[0])
+    return start, [month.strftime('%Y-%m') for month in months]
+
+
+def get_trends(submissions, responses) -> dict:
+    """
+    Monthly no of submissions and quiz score average of many profiles,
+    with a single query for each.
+    :param submissions: <Submission> queryset, annotated with the profile id as 'profile'
+    :param responses: <QuizStudentResponse> queryset, annotated the same way
+    :return: {profile id: {'submissions': {'YYYY-MM': n}, 'quiz_average': {'YYYY-MM': average}}},
+             months without data are left out
+    """
+    start, _ = _trend_months()
+    month = TruncMonth('_date_created', tzinfo=timezones.LOCAL_TZ)
+    trends = {}
+
+    rows = submissions.filter(_date_created__gte=start).annotate(month=month)\
+        .values('profile', 'month').annotate(value=Count('pk')).order_by()
+    for row in rows:
+        trend = trends.setdefault(row['profile'], {'submissions': {}, 'quiz_average': {}})
+        trend['submissions'][row['month'].strftime('%Y-%m')] = row['value']
+
+    rows = responses.filter(_date_created__gte=start).annotate(month=month)\
+        .values('profile', 'month').annotate(value=Avg('score')).order_by()
+    for row in rows:
+        trend = trends.setdefault(row['profile'], {'submissions': {}, 'quiz_average': {}})
+        trend['quiz_average'][row['month'].strftime('%Y-%m')] = round(row['value'], 1)
+    return trends
+
+
+def _save_rows(model, profile_field, rows, trends):
+    """
+    Insert or update the statistics rows with a single query.
+    """
+    if not rows:
+        return
+    objects = []
+    for row in rows:
+        pk = row.pop('pk')
+        objects.append(model(**{f"{profile_field}_id": pk}, trend=trends.get(pk, {}), **row))
+
+    # unique_fields is required by SQLite and PostgreSQL, but not supported by MySQL
+    unique_fields = [profile_field] if connection.features.supports_update_conflicts_with_target else None
+    update_fields = [f.name for f in model._meta.concrete_fields if not f.primary_key]
+    model.objects.bulk_create(objects, update_conflicts=True, unique_fields=unique_fields,
+                              update_fields=update_fields)
+
+
+def refresh_student_stats(student_ids):
+    from classrooms.models import Assignment, Quiz, QuizStudentResponse, Submission
+
+    if not student_ids:
+        return
+    submissions = Submission.objects.filter(owner=OuterRef('pk'))
+    responses = QuizStudentResponse.objects.filter(owner=OuterRef('pk'))
+    rows = list(Student.objects.filter(pk__in=student_ids).annotate(
+        assignments=count_subquery(Assignment.objects.filter(classroom__department=OuterRef('department'))),
+        submissions=count_subquery(submissions),
+        late_submissions=count_subquery(submissions.late()),
+        graded_submissions=count_subquery(submissions.exclude(Q(grade__isnull=True) | Q(grade=''))),
+        quizzes=count_subquery(Quiz.objects.filter(classroom__department=OuterRef('department'))),
+        quiz_responses=count_subquery(responses),
+        quiz_average=avg_subquery(responses, 'score'),
+    ).values('pk', 'assignments', 'submissions', 'late_submissions', 'graded_submissions',
+             'quizzes', 'quiz_responses', 'quiz_average'))
+
+    trends = get_trends(
+        Submission.objects.filter(owner_id__in=student_ids).annotate(profile=F('owner_id')),
+        QuizStudentResponse.objects.filter(owner_id__in=student_ids).annotate(profile=F('owner_id')))
+    _save_rows(StudentStats, 'student', rows, trends)
+
+
+def refresh_lecturer_stats(lecturer_ids):
+    from classrooms.models import Assignment, Quiz, QuizStudentResponse, Submission
+
+    if not lecturer_ids:
+        return
+    submissions = Submission.objects.filter(assignment__owner=OuterRef('pk'))
+    responses = QuizStudentResponse.objects.filter(quiz__owner=OuterRef('pk'))
+    rows = list(Lecturer.objects.filter(pk__in=lecturer_ids).annotate(
+        assignments=count_subquery(Assignment.objects.filter(owner=OuterRef('pk'))),
+        submissions=count_subquery(submissions),
+        late_submissions=count_subquery(submissions.late()),
+        graded_submissions=count_subquery(submissions.exclude(Q(grade__isnull=True) | Q(grade=''))),
+        quizzes=count_subquery(Quiz.objects.filter(owner=OuterRef('pk'))),
+        quiz_responses=count_subquery(responses),
+        quiz_average=avg_subquery(responses, 'score'),
+    ).values('pk', 'assignments', 'submissions', 'late_submissions', 'graded_submissions',
+             'quizzes', 'quiz_responses', 'quiz_average'))
+
+    trends = get_trends(
+        Submission.objects.filter(assignment__owner_id__in=lecturer_ids).annotate(profile=F('assignment__owner_id')),
+        QuizStudentResponse.objects.filter(quiz__owner_id__in=lecturer_ids).annotate(profile=F('quiz__owner_id')))
+    _save_rows(LecturerStats, 'lecturer', rows, trends)
+
+
+"""===== READING ====="""
+
+
+def get_stats(profile):
+    """
+    Statistics row of a <Student> or a <Lecturer> (primary key lookup).
+    Computed now if the profile has no row yet.
+    """
+    model, refresh_stats = (StudentStats, refresh_student_stats) if isinstance(profile, Student) \
+        else (LecturerStats, refresh_lecturer_stats)
+    stats = model.objects.filter(pk=profile.pk).first()
+    if stats is None:
+        refresh_stats([profile.pk])
+        stats = model.objects.get(pk=profile.pk)
+    return stats
+
+
+def _by_month(trend, name) -> dict:
+    values = trend.get(name) or {}
+    if isinstance(values, list):
+        # Saved before the trends were saved by month
+        return dict(zip(trend.get('months', []), values))
+    return values
+
+
+def get_chart_data(stats) -> dict:
+    """
+    Chart.js data of the trend in the last TREND_MONTHS months.
+    Cached until the row is updated or the month changes.
+    """
+    _, months = _trend_months()
+    key = f"stats-chart:{stats._meta.model_name}:{stats.pk}:{stats._date_updated.timestamp()}:{months[-1]}"
+    data = cache.get(key)
+    if data is None:
+        trend = stats.trend or {}
+        submissions, quiz_average = _by_month(trend, 'submissions'), _by_month(trend, 'quiz_average')
+        data = {
+            'labels': [datetime.strptime(month, '%Y-%m').strftime('%b %Y') for month in months],
+            'submissions': [submissions.get(month, 0) for month in months],
+            'quiz_average': [quiz_average.get(month) for month in months],
+        }
+        cache.set(key, data, CHART_TIMEOUT)
+    return data
@@ -1,3 +1,365 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from main import timezones
+from main.models import Batch, Department
+from main.testing import ClassroomTestCase, TempDirsMixin, create_lecturer, create_student
+from classrooms.grading import apply_grades
+from classrooms.models import Assignment, Classroom, Meeting, Quiz, QuizStudentResponse, Submission
+from .models import CustomizedUser, Student, Lecturer, StudentStats, LecturerStats
+from . import images
+from .stats import get_chart_data, rebuild_all
 
-# Create your tests here.
+
+class ProfileResolutionTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        create_student('student', cls.department)
+        cls.lecturer.departments.add(cls.department)
+
+    def test_role_is_resolved_once(self):
+        user = CustomizedUser.objects.get(username='lecturer')
+        with self.assertNumQueries(2):
+            self.assertEqual(user.role, 'lecturer')
+        with self.assertNumQueries(0):
+            self.assertTrue(user.is_lecturer)
+            self.assertFalse(user.is_student)
+            self.assertIsInstance(user.profile, Lecturer)
+
+    def test_home_page_query_count_student(self):
+        self.client.login(username='student', password='pass')
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_is_loaded_once_per_request(self):
+        self.client.login(username='student', password='pass')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        user_queries = [q['sql'] for q in queries if 'FROM "users_customizeduser"' in q['sql']]
+        self.assertEqual(len(user_queries), 1)
+        self.assertIn('"users_student"', user_queries[0])
+        self.assertEqual(response.wsgi_request.user.role, 'student')
+
+    def test_student_queries_do_not_grow_with_classrooms(self):
+        student = Student.objects.get(user__username='student')
+        lecturer = Lecturer.objects.get(user__username='lecturer')
+        for i in range(5):
+            Classroom.objects.create(owner=lecturer, department=self.department, name=f'Class {i}')
+
+        with self.assertNumQueries(1):
+            list(student.get_pending_assignments())
+        with self.assertNumQueries(1):
+            list(student.get_missing_quizzes())
+        with self.assertNumQueries(3):
+            student.today_events()
+
+
+class PeopleViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.departments = [Department.objects.create(batch=Batch.objects.create(year=f'202{i}'), name='Physics')
+                           for i in range(3)]
+
+        create_lecturer().departments.add(*cls.departments)
+
+        for i, dept in enumerate(cls.departments):
+            for j in range(20):
+                create_student(f'student{i}-{j}', dept)
+
+    def setUp(self):
+        self.client.login(username='lecturer', password='pass')
+
+    def test_lecturer_in_many_departments(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('people'))
+        self.assertEqual([lec.user.username for lec in response.context['lecturers']], ['lecturer'])
+        self.assertEqual(len(response.context['students']), 30)
+
+        # Rest of the students with the json variant
+        loaded = len(response.context['students'])
+        cursor = response.context['students_cursor']
+        while cursor:
+            data = self.client.get(reverse('people'), {'role': 'student', 'cursor': cursor, 'format': 'json'}).json()
+            loaded += data['html'].count('Single user item')
+            cursor = data['cursor']
+        self.assertEqual(loaded, 60)
+
+    def test_filters(self):
+        response = self.client.get(reverse('people'), {'department': self.departments[0].pk})
+        self.assertEqual({s.department_id for s in response.context['students']}, {self.departments[0].pk})
+        self.assertIsNone(response.context['students_cursor'])
+
+        response = self.client.get(reverse('people'), {'batch': self.departments[1].batch_id})
+        self.assertEqual({s.department_id for s in response.context['students']}, {self.departments[1].pk})
+
+
+class StatisticsTest(ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student = create_student('student', cls.department)
+
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.assignments = [Assignment.objects.create(
+                classroom=cls.classroom, owner=cls.lecturer, title=f'Assignment {i}',
+                _date_due=timezone.now() + timedelta(days=2 * i - 1), content='content') for i in range(4)]
+            cls.quiz = Quiz.objects.create(
+                classroom=cls.classroom, owner=cls.lecturer, title='Quiz', _start=timezone.now(), duration=60)
+
+    def test_updated_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            # Due date of the first assignment is passed: late submission
+            for assignment in self.assignments[:2]:
+                Submission.objects.create(assignment=assignment, owner=self.student)
+            QuizStudentResponse.objects.create(quiz=self.quiz, owner=self.student, score=80)
+
+        stats = StudentStats.objects.get(student=self.student)
+        self.assertEqual((stats.assignments, stats.submissions, stats.late_submissions), (4, 2, 1))
+        self.assertEqual((stats.completion_rate, stats.late_rate), (50.0, 50.0))
+        self.assertEqual((stats.quizzes, stats.quiz_responses, stats.quiz_average), (1, 1, 80))
+        self.assertEqual(get_chart_data(stats)['submissions'][-1], 2)
+
+        # Bulk grading sends no signals, but refreshes the statistics too
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_grades(self.assignments[0], [{'student_id': self.student.pk, 'grade': 'A'}])
+        self.assertEqual(LecturerStats.objects.get(lecturer=self.lecturer).graded_submissions, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assignments[3].delete()
+        self.assertEqual(StudentStats.objects.get(student=self.student).assignments, 3)
+        self.assertEqual(LecturerStats.objects.get(lecturer=self.lecturer).assignments, 3)
+
+    def test_page_is_a_single_read(self):
+        rebuild_all()
+        self.client.login(username='student', password='pass')
+        self.client.get(reverse('statistics'))
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('statistics'))
+        self.assertEqual(response.context['stats'].assignments, 4)
+        self.assertEqual(len(response.context['chart_data']['labels']), 6)
+
+    def test_chart_months_follow_the_date(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Submission.objects.create(assignment=self.assignments[0], owner=self.student)
+        stats = StudentStats.objects.get(student=self.student)
+        this_month = timezones.local_today()
+        self.assertEqual(get_chart_data(stats)['submissions'], [0, 0, 0, 0, 0, 1])
+
+        # Next month, the row is not updated but the chart still ends in the current month
+        next_month = (this_month.replace(day=1) + timedelta(days=32)).replace(day=1)
+        with mock.patch('main.timezones.local_today', return_value=next_month):
+            data = get_chart_data(stats)
+        self.assertEqual(data['labels'][-1], next_month.strftime('%b %Y'))
+        self.assertEqual(data['submissions'], [0, 0, 0, 0, 1, 0])
+
+
+@override_settings(LOCAL_TIME_ZONE='Asia/Colombo')
+class DashboardSummaryTest(ClassroomTestCase):
+    """
+    Now is 2024-03-15 10:00 in Colombo (04:30 UTC), so the local day is
+    [03-14 18:30, 03-15 18:30) UTC and the local month ends at 03-31 18:30 UTC.
+    """
+    NOW = datetime(2024, 3, 15, 4, 30, tzinfo=dt_timezone.utc)
+    DAY_START = datetime(2024, 3, 14, 18, 30, tzinfo=dt_timezone.utc)
+    DAY_END = datetime(2024, 3, 15, 18, 30, tzinfo=dt_timezone.utc)
+    MONTH_END = datetime(2024, 3, 31, 18, 30, tzinfo=dt_timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student = create_student('student', cls.department)
+        second = timedelta(seconds=1)
+
+        def assignment(title, due, submitted=False, review_complete=False, classroom=cls.classroom):
+            obj = Assignment.objects.create(classroom=classroom, owner=cls.lecturer, title=title,
+                                            _date_due=due, review_complete=review_complete)
+            if submitted:
+                Submission.objects.create(assignment=obj, owner=cls.student)
+
+        assignment('Expired today', cls.NOW - second)
+        assignment('Due at the day start', cls.DAY_START)
+        assignment('Due yesterday', cls.DAY_START - second, review_complete=True)
+        assignment('Submitted and expired', cls.NOW - timedelta(hours=1), submitted=True)
+        assignment('Due at the day end', cls.DAY_END - second)
+        assignment('Due tomorrow', cls.DAY_END)
+        assignment('Submitted and pending', cls.DAY_END, submitted=True)
+        assignment('Due next month', cls.MONTH_END)
+        other = Classroom.objects.create(owner=cls.lecturer, name='Optics', department=Department.objects.create(
+            batch=cls.department.batch, name='Chemistry'))
+        assignment('Other department', cls.DAY_END, classroom=other)
+
+        def quiz(title, start, duration, responded=False):
+            obj = Quiz.objects.create(classroom=cls.classroom, owner=cls.lecturer, title=title,
+                                      _start=start, duration=duration)
+            if responded:
+                QuizStudentResponse.objects.create(quiz=obj, owner=cls.student)
+
+        quiz('Ended today', cls.NOW - timedelta(hours=2), 60)
+        quiz('Ends now', cls.NOW - timedelta(hours=1), 60)
+        quiz('Ended yesterday', cls.DAY_START - timedelta(minutes=30), 10)
+        quiz('Answered yesterday', cls.DAY_START - timedelta(hours=1), 10, responded=True)
+        quiz('Starts tomorrow', cls.DAY_END, 10)
+
+        for topic, start in [('Day start', cls.DAY_START), ('Yesterday', cls.DAY_START - second),
+                             ('Day end', cls.DAY_END - second), ('Tomorrow', cls.DAY_END)]:
+            Meeting.objects.create(classroom=cls.classroom, owner=cls.lecturer, topic=topic, _start=start)
+
+    def setUp(self):
+        patches = [
+            mock.patch('django.utils.timezone.now', return_value=self.NOW),
+            mock.patch('main.timezones.local_today', return_value=date(2024, 3, 15)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_student_counters(self):
+        with self.assertNumQueries(1):
+            summary = self.student.dashboard_summary()
+        self.assertEqual(summary.counters, {
+            'classes': 1,
+            'pending_assignments': 3,   # day end, tomorrow and next month
+            'missing_assignments': 3,   # expired today, at the day start and yesterday
+            'today_quizzes': 2,
+            'missing_quizzes': 2,       # the quiz ending now is not expired yet
+            'today_meetings': 2,
+            'month_assignments': 7,
+            'month_quizzes': 5,
+            'month_meetings': 4,
+        })
+
+    def test_lecturer_counters(self):
+        with self.assertNumQueries(1):
+            summary = self.lecturer.dashboard_summary()
+        self.assertEqual(summary.counters, {
+            'classes': 1,
+            'pending_review_assignments': 3,
+            'today_quizzes': 2,
+            'today_meetings': 2,
+            'month_assignments': 8,
+            'month_quizzes': 5,
+            'month_meetings': 4,
+        })
+
+    def test_counters_match_the_lists(self):
+        summary = self.student.dashboard_summary()
+        self.assertEqual(summary.pending_assignments, len(self.student.get_pending_assignments()))
+        self.assertEqual(summary.missing_assignments, len(self.student.get_missing_assignments()))
+        self.assertEqual(summary.missing_quizzes, len(self.student.get_missing_quizzes()))
+        self.assertEqual(summary.today_meetings, len(self.student.get_today_meetings()))
+
+
+class ThumbnailsTest(TempDirsMixin, ClassroomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student = create_student('student', cls.department)
+
+    def setUp(self):
+        # Thumbnails are generated right away (instead of the worker thread),
+        # using the connection of the test.
+        patches = [
+            mock.patch.object(images._executor, 'submit', side_effect=lambda fn, *args: fn(*args)),
+            mock.patch.object(images, 'connection'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.student = Student.objects.get(pk=self.student.pk)
+
+    @staticmethod
+    def image(name, size=(500, 300), fmt='JPEG'):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, format=fmt)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def upload(self, profile, name='pic.jpg', field='profile_pic', **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            setattr(profile, field, self.image(name, **kwargs))
+            profile.save()
+        profile.refresh_from_db()
+
+    def open_thumbnail(self, path):
+        with default_storage.open(path) as f:
+            im = Image.open(f)
+            im.load()
+        return im
+
+    def test_only_changed_images_are_processed(self):
+        self.assertEqual(self.student.get_changed_images(), [])
+        self.student.id_pic = self.image('id.jpg')
+        self.assertEqual(self.student.get_changed_images(), ['id_pic'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.save()
+        self.assertEqual(images._executor.submit.call_count, 1)
+        self.assertEqual(self.student.get_changed_images(), [])
+
+        # Saving other fields does not schedule anything
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.reg_no = 'REG1'
+            self.student.save()
+        self.assertEqual(images._executor.submit.call_count, 1)
+
+    def test_sizes_and_formats(self):
+        self.upload(self.student)
+        paths = self.student.thumbnails['profile_pic']
+        self.assertEqual(set(paths), {'64', '64.webp', '250', '250.webp'})
+
+        for px, height in [(64, 38), (250, 150)]:
+            thumb = self.open_thumbnail(paths[str(px)])
+            self.assertEqual((thumb.format, thumb.size), ('JPEG', (px, height)))
+            self.assertTrue(paths[str(px)].endswith('.jpg'))
+            webp = self.open_thumbnail(paths[f'{px}.webp'])
+            self.assertEqual((webp.format, webp.size), ('WEBP', (px, height)))
+
+        small = self.student.profile_pic_small
+        self.assertEqual(small.url, default_storage.url(paths['64']))
+        self.assertEqual(small.webp_url, default_storage.url(paths['64.webp']))
+
+    def test_png_keeps_its_format(self):
+        self.upload(self.student, 'pic.png', fmt='PNG', size=(100, 100))
+        paths = self.student.thumbnails['profile_pic']
+        self.assertEqual(self.open_thumbnail(paths['64']).format, 'PNG')
+        # Smaller than the medium size, never enlarged
+        self.assertEqual(self.open_thumbnail(paths['250']).size, (100, 100))
+
+    def test_new_image_replaces_the_thumbnails(self):
+        self.upload(self.student)
+        old = self.student.thumbnails['profile_pic']
+        self.upload(self.student, 'new.jpg')
+        new = self.student.thumbnails['profile_pic']
+        self.assertTrue(all(default_storage.exists(path) for path in new.values()))
+        self.assertFalse(any(default_storage.exists(path) for path in old.values()))
+
+    def test_missing_thumbnail_falls_back_to_the_image(self):
+        self.assertEqual(self.student.profile_pic_medium.url, self.student.profile_pic.url)
+        self.assertIsNone(self.student.profile_pic_medium.webp_url)
+
+    def test_generate_thumbnails_command(self):
+        self.upload(self.student)
+        Student.objects.filter(pk=self.student.pk).update(thumbnails={})
+        lecturer = Lecturer.objects.get(pk=self.lecturer.pk)
+        self.upload(lecturer)
+
+        out = StringIO()
+        call_command('generate_thumbnails', '--missing', stdout=out)
+        self.assertIn('Processed 1 student profiles', out.getvalue())
+        self.assertIn('Processed 0 lecturer profiles', out.getvalue())
+
+        self.student.refresh_from_db()
+        self.assertEqual(set(self.student.thumbnails['profile_pic']), {'64', '64.webp', '250', '250.webp'})
+        self.assertNotIn('id_pic', self.student.thumbnails)   # No id picture
@@ -1,12 +1,18 @@
 import os.path
 
+from django.db.models import Exists, OuterRef
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from .forms import (UserRegisterForm, LecturerCreationForm, StudentCreationForm,
                     StudentUpdateForm, LecturerUpdateForm, UserUpdateForm)
 from django.views.generic import ListView
 from django.contrib import messages
 from main.models import Batch, Department
+from .models import Lecturer, Student
+from .stats import get_chart_data, get_stats
+from classrooms.pagination import KeysetPaginator
 
 HOME = os.path.expanduser('~')
 
@@ -160,33 +166,95 @@ def department_leave(request, dept_pk, **kwargs):
 
 @login_required
 def statistics_view(request):
-    return render(request, "users/statistics.html")
-
-
-@login_required
-def people_view(request):
-    prof = request.user.profile
-    lecturers = set()
-    students = set()
+    """
+    Statistics are read from the <StudentStats>/<LecturerStats> row of the
+    profile (see users/stats.py), not computed from the submissions.
+    """
+    profile = request.user.profile
+    if profile is None:
+        # Administrator
+        return render(request, "users/statistics.html")
+
+    stats = get_stats(profile)
+    return render(request, "users/statistics.html", {
+        'stats': stats,
+        'chart_data': get_chart_data(stats),
+    })
+
+
+PEOPLE_PAGE_SIZE = 30
+PEOPLE_ROLES = {'lecturer': 'lecturers', 'student': 'students'}
+
+
+def _get_people_departments(user):
+    """
+    Departments whose people are shown to the user.
+    Students: own department, Lecturers: enrolled departments
+    """
+    if user.is_student:
+        return Department.objects.filter(pk=user.profile.department_id)
+    elif user.is_lecturer:
+        return user.profile.departments.all()
+    return Department.objects.none()
+
+
+def _filter_departments(departments, params):
+    """
+    Filter the departments by the 'department' and 'batch' GET parameters (pk).
+    """
+    for field, param in (('pk', 'department'), ('batch_id', 'batch')):
+        if params.get(param):
+            try:
+                departments = departments.filter(**{field: int(params[param])})
+            except ValueError:
+                return departments.none()
+    return departments
 
-    if request.user.is_student:
-        lecturers = prof.department.lecturer_set.all()
-        students = prof.department.student_set.all()
-    elif request.user.is_lecturer:
-        enrolled = prof.departments.all()
 
-        for dept in enrolled:
-            _lecs = dept.lecturer_set.all()
-            for lec in _lecs:
-                lecturers.add(lec)
+def get_people(role, departments):
+    """
+    Lecturers or students of the given departments (queryset) as a single
+    query. A lecturer enrolled in several of the departments appears once.
+    """
+    if role == 'lecturer':
+        enrolled = Lecturer.departments.through.objects.filter(
+            lecturer=OuterRef('pk'), department__in=departments)
+        return Lecturer.objects.filter(Exists(enrolled)).select_related('user').order_by('pk')
+    return Student.objects.filter(department__in=departments)\
+        .select_related('user', 'department__batch').order_by('pk')
 
-            _students = dept.student_set.all()
-            for stu in _students:
-                students.add(stu)
 
+@login_required
+def people_view(request):
+    """
+    First page of the lecturers and the students of the user's departments.
+    GET parameters:
+        department, batch: Show the people of a single department/batch only
+        role, cursor, format=json: Next page of a single list (lecturer or student)
+                                   as {'html': <items>, 'cursor': <next cursor>}
+    """
+    allowed = _get_people_departments(request.user)
+    departments = _filter_departments(allowed, request.GET)
+
+    if request.GET.get('format') == 'json':
+        role = request.GET.get('role')
+        if role not in PEOPLE_ROLES:
+            return JsonResponse({'error': "Unknown role"}, status=400)
+        people, cursor = KeysetPaginator(get_people(role, departments), PEOPLE_PAGE_SIZE)\
+            .page(request.GET.get('cursor'))
+        html = render_to_string('users/template-parts/people-items.html', {'people': people}, request=request)
+        return JsonResponse({'html': html, 'cursor': cursor})
+
+    allowed = list(allowed.select_related('batch'))
     context = {
-        'students': students,
-        'lecturers': lecturers,
+        'departments': allowed,
+        'batches': sorted({dept.batch for dept in allowed}, key=lambda batch: batch.year),
+        'selected_department': request.GET.get('department', ''),
+        'selected_batch': request.GET.get('batch', ''),
     }
+    for role, name in PEOPLE_ROLES.items():
+        people, cursor = KeysetPaginator(get_people(role, departments), PEOPLE_PAGE_SIZE).page()
+        context[name] = people
+        context[f'{name}_cursor'] = cursor
     return render(request, "users/people.html", context=context)
 